@@ -1,9 +1,36 @@
-from fastapi import FastAPI
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.restaurant_routes import router as restaurant_router
+from routes.health_routes import router as health_router
+from routes.metrics_routes import router as metrics_router
+from utils.registry import models, WARMUP_MODELS
+from utils.uploads import UploadSizeLimitMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.imagesearch import close_image_search_client
+from utils.enrich_worker import EnrichWorker, ENRICH_WORKER
+from database.db import dispose_async_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models and run one dummy inference in the background so the worker starts
+    # serving (auth, /healthz) right away; /readyz flips to 200 once this finishes.
+    threading.Thread(target=models.warm_up, args=(WARMUP_MODELS,), daemon=True, name="warm-up").start()
+    # Optional in-process image enrichment; dedicated `python -m utils.enrich_worker` processes also work
+    worker = EnrichWorker() if ENRICH_WORKER else None
+    worker_task = asyncio.create_task(worker.run()) if worker else None
+    yield
+    if worker:
+        worker.stop()
+        await worker_task
+    await close_image_search_client()
+    await dispose_async_engine()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -14,4 +41,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(restaurant_router)
\ No newline at end of file
+app.add_middleware(UploadSizeLimitMiddleware)
+# Outermost, so request latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(restaurant_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
@@ -0,0 +1,127 @@
+"""
+Per-object vs bulk ingestion of a parsed menu.
+
+"per-object" is the old create_restaurant_with_menu: create_object (add, commit,
+refresh) for the restaurant, menu, every category and every item. "bulk" is the
+current one. Counts the statements sent and commits issued, and times each for
+small, medium and huge menus. Also re-parses one restaurant to exercise the upsert.
+
+    python -m benchmarks.bulk_ingest --sizes 10 50 500 --repeat 5
+    python -m benchmarks.bulk_ingest --database-url postgresql://localhost/prevu_bench
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def synthetic_menu(items: int, tag: str, per_category: int = 10) -> dict:
+    menu = []
+    for c in range((items + per_category - 1) // per_category):
+        menu.append({
+            "category": f"Section {c}",
+            "description": None,
+            "priority": c + 1,
+            "items": [
+                {
+                    "name": f"Dish {c}-{i}",
+                    "slug": f"dish-{tag}-{c}-{i}",
+                    "description": "Fresh tomatoes, basil, olive oil and parmesan",
+                    "price": 9.5 + i,
+                    "tags": ["vegetarian"],
+                    "image_prompt": None,
+                    "images": [],
+                }
+                for i in range(min(per_category, items - c * per_category))
+            ],
+        })
+    return {"restaurant_name": f"Trattoria {tag}", "location": "Austin, TX", "currency": "USD",
+            "description": None, "last_updated": "2025-01-01T00:00:00Z", "menu": menu}
+
+
+def legacy_create_restaurant_with_menu(db, parsed_data: dict):
+    from database.models import Category, Menu, MenuItem, Restaurant
+    from utils.crud import _parse_datetime, create_object
+
+    restaurant = create_object(db, Restaurant, {
+        "name": parsed_data["restaurant_name"],
+        "location": parsed_data.get("location"),
+        "description": parsed_data.get("description"),
+        "currency": parsed_data.get("currency"),
+        "last_updated": _parse_datetime(parsed_data.get("last_updated")),
+        "restaurant_image": parsed_data.get("restaurant_image"),
+    })
+    menu = create_object(db, Menu, {"restaurant_id": restaurant.id, "title": "Menu"})
+    for category_data in parsed_data.get("menu", []):
+        category = create_object(db, Category, {
+            "restaurant_id": restaurant.id,
+            "menu_id": menu.id,
+            "category": category_data["category"],
+            "description": category_data.get("description"),
+            "priority": category_data.get("priority", 0),
+        })
+        for item_data in category_data.get("items", []):
+            create_object(db, MenuItem, {**item_data, "category_id": category.id})
+    return restaurant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ.setdefault("METRICS_ENABLED", "false")
+
+    from sqlalchemy import event
+
+    from database.db import Base, SessionLocal, engine
+    from database.models import Restaurant
+    from utils.crud import create_restaurant_with_menu, refresh_restaurant_menu
+
+    Base.metadata.create_all(bind=engine)
+    counts = {"statements": 0, "commits": 0}
+    event.listen(engine, "before_cursor_execute", lambda *a: counts.__setitem__("statements", counts["statements"] + 1))
+    event.listen(engine, "commit", lambda *a: counts.__setitem__("commits", counts["commits"] + 1))
+
+    def measure(fn, parsed: dict):
+        db = SessionLocal()
+        counts.update(statements=0, commits=0)
+        start = time.perf_counter()
+        try:
+            fn(db, parsed)
+        finally:
+            db.close()
+        return time.perf_counter() - start, counts["statements"], counts["commits"]
+
+    print(f"{'items':>6} {'path':<12} {'statements':>10} {'commits':>8} {'median ms':>10} {'items/s':>9}")
+    run = 0
+    for size in args.sizes:
+        for name, fn in (("per-object", legacy_create_restaurant_with_menu), ("bulk", create_restaurant_with_menu)):
+            timings = []
+            for _ in range(args.repeat):
+                run += 1
+                seconds, statements, commits = measure(fn, synthetic_menu(size, f"r{run}"))
+                timings.append(seconds)
+            median = statistics.median(timings)
+            print(f"{size:>6} {name:<12} {statements:>10} {commits:>8} {median * 1000:>10.1f} {size / median:>9.0f}")
+
+        # The same restaurant re-parsed: every item takes the ON CONFLICT (slug) DO UPDATE path
+        parsed = synthetic_menu(size, f"upsert{size}")
+        db = SessionLocal()
+        try:
+            restaurant_id = create_restaurant_with_menu(db, parsed).id
+        finally:
+            db.close()
+        seconds, statements, commits = measure(
+            lambda db, parsed: refresh_restaurant_menu(db, db.get(Restaurant, restaurant_id), parsed), parsed
+        )
+        print(f"{size:>6} {'bulk upsert':<12} {statements:>10} {commits:>8} {seconds * 1000:>10.1f} {size / seconds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Offline comparison of one-shot vs chunked, concurrent menu parsing.
+
+A stub stands in for the Vertex call: it "generates" JSON for the items in its
+chunk and sleeps in proportion to the text it was given, the way completion
+latency grows with output length. Checks that every item survives the merge.
+
+    python -m benchmarks.chunked_parse --sections 12 --items 10 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+from utils.menu_chunker import (
+    extract_menu_data_chunked, is_price_line, is_section_header, split_menu_sections
+)
+
+SECTIONS = ["APPETIZERS", "SALADS", "SOUPS", "PASTA", "PIZZA", "MAIN COURSES", "SIDES",
+            "DESSERTS", "BEVERAGES", "SPECIALS", "KIDS MENU", "BRUNCH"]
+
+
+def synthetic_menu(sections: int, items: int) -> list:
+    lines = [{"text": "TRATTORIA ESEMPIO", "accuracy": 0.99}, {"text": "12 Via Roma, Austin TX", "accuracy": 0.98}]
+    for s in range(sections):
+        lines.append({"text": SECTIONS[s % len(SECTIONS)] + ("" if s < len(SECTIONS) else " II"), "accuracy": 0.99})
+        for i in range(items):
+            lines.append({"text": f"Dish {s}-{i} della casa", "accuracy": 0.97})
+            lines.append({"text": "Fresh tomatoes, basil, olive oil and parmesan", "accuracy": 0.95})
+            lines.append({"text": f"${8 + i}.95", "accuracy": 0.99})
+    return lines
+
+
+def make_stub(seconds_per_kchar: float, base_seconds: float):
+    def stub_extract(raw_text: str) -> dict:
+        time.sleep(base_seconds + seconds_per_kchar * len(raw_text) / 1000)
+        lines = raw_text.split("\n")
+        menu, category = [], None
+        for index, line in enumerate(lines[2:], start=2):
+            if is_section_header(line):
+                category = {"category": line.title(), "description": None, "priority": 1, "items": []}
+                menu.append(category)
+            elif category is not None and line.startswith("Dish"):
+                price = next((l for l in lines[index:index + 3] if is_price_line(l)), None)
+                category["items"].append({"name": line.title(), "price": price, "tags": [], "images": []})
+        return {"restaurant_name": lines[0].title(), "location": lines[1], "currency": "USD", "menu": menu}
+    return stub_extract
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ms-per-kchar", type=float, default=400, help="stub generation cost")
+    parser.add_argument("--base-ms", type=float, default=300, help="stub per-call overhead")
+    args = parser.parse_args()
+
+    lines = synthetic_menu(args.sections, args.items)
+    expected = args.sections * args.items
+    stub = make_stub(args.ms_per_kchar / 1000, args.base_ms / 1000)
+    chunks = split_menu_sections(lines, max_chars=args.chunk_chars)
+    print(f"{len(lines)} OCR lines, {expected} items, {len(chunks)} chunks of <= {args.chunk_chars} chars")
+
+    start = time.perf_counter()
+    single = stub("\n".join(line["text"] for line in lines))
+    one_shot = time.perf_counter() - start
+    single_items = sum(len(c["items"]) for c in single["menu"])
+    print(f"  one-shot        : {one_shot:6.2f}s  items {single_items}")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        merged = extract_menu_data_chunked(lines, extract_fn=stub, max_chars=args.chunk_chars, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        items = sum(len(c["items"]) for c in merged["menu"])
+        ids = [item["id"] for c in merged["menu"] for item in c["items"]]
+        status = "ok" if items == expected and len(set(ids)) == len(ids) else "MISMATCH"
+        print(f"  chunked x{workers:<2}     : {elapsed:6.2f}s  items {items}  speedup {one_shot / elapsed:4.1f}x  {status}")
+
+
+if __name__ == "__main__":
+    main()
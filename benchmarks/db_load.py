@@ -0,0 +1,110 @@
+"""
+Load test of the DB-bound read paths with sync sessions vs DB_ASYNC=true.
+
+Each mode runs in its own process (DB_ASYNC is read at import) against its own
+copy of the data: one user and one restaurant with a menu of --items dishes.
+Drives GET /profile and GET /restaurants/{id}/menu through the ASGI app at the
+given concurrency and reports req/s and latency percentiles for both.
+
+    python -m benchmarks.db_load --requests 2000 --concurrency 64
+    python -m benchmarks.db_load --database-url postgresql://localhost/prevu_bench
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_mode(args) -> dict:
+    import httpx
+
+    from app import app
+    from database.db import Base, SessionLocal, engine
+    from benchmarks.bulk_ingest import synthetic_menu
+    from benchmarks.pipeline import summarize
+    from utils import crud
+    from utils.auth import create_access_token
+
+    Base.metadata.create_all(bind=engine)
+    tag = f"{args.mode}{int(time.time() * 1000)}"
+    db = SessionLocal()
+    try:
+        email = f"load-{tag}@example.com"
+        crud.create_user(db, email, "not-a-real-hash")
+        restaurant_id = crud.create_restaurant_with_menu(db, synthetic_menu(args.items, tag)).id
+    finally:
+        db.close()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    async def drive(path: str, **kwargs) -> dict:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(path, **kwargs)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            await client.get(path, **kwargs)  # warm the pool and the route
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            return summarize(latencies, time.perf_counter() - start)
+
+    async def main():
+        from database.db import dispose_async_engine
+        try:
+            return {
+                "GET /profile": await drive("/profile", headers=headers),
+                "GET /restaurants/{id}/menu": await drive(f"/restaurants/{restaurant_id}/menu"),
+            }
+        finally:
+            await dispose_async_engine()
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--items", type=int, default=50, help="dishes on the benchmark menu")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file per mode")
+    parser.add_argument("--mode", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args)))
+        return
+
+    results = {}
+    for mode in ("sync", "async"):
+        env = {
+            **os.environ,
+            "DB_ASYNC": "true" if mode == "async" else "false",
+            "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}",
+            "WARMUP_MODELS": "",
+            "REQUEST_TIMING_LOG": "false",
+        }
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.db_load", "--mode", mode, "--requests", str(args.requests),
+             "--concurrency", str(args.concurrency), "--items", str(args.items)],
+            env=env, text=True,
+        )
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'endpoint':<28} {'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint in results["sync"]:
+        for mode in ("sync", "async"):
+            s = results[mode][endpoint]
+            print(f"{endpoint:<28} {mode:<6} {s['rps']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Microbenchmark of per-user dish filtering: string checks vs precomputed bitsets.
+
+"strings" is what filtering without the bitsets would do on every request:
+tokenize each dish's name and description and check its tags and words against
+the user's restrictions. "bitsets" is utils.dietary.evaluate over tag_bits
+built at ingest (unpacking the stored bytes into the NumPy array is included).
+Both use the same synthetic dishes and constraints (two allergens, one disliked
+ingredient, a diet and a preferred cuisine) and must agree on which are safe.
+
+    python -m benchmarks.dietary_filter --sizes 50 200 1000 100000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+RESTRICTIONS = ["nuts", "dairy"]
+DISLIKED = "mushroom"
+DIET = "vegetarian"
+PREFER = "italian"
+
+
+def string_filter(items: list) -> list:
+    from utils.dietary import AVOID_TERMS, DIETS, item_terms, tag_term
+
+    safe = []
+    for item in items:
+        terms = item_terms(item["name"], item["description"], item["tags"])
+        if not terms & DIETS[DIET]:
+            continue
+        if any(terms & AVOID_TERMS[r] and tag_term(f"{r}-free") not in terms
+               and tag_term(f"{r.rstrip('s')}-free") not in terms for r in RESTRICTIONS) or DISLIKED in terms:
+            continue
+        safe.append(item["slug"])
+    return safe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 200, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from benchmarks.item_search import synthetic_items
+    from utils.dietary import (
+        AVOID_TERMS, DIETS, DietaryConstraints, bit_matrix, encode_bits, evaluate, item_terms, tag_term
+    )
+
+    vocabulary = {}
+    intern = lambda term: vocabulary.setdefault(term, len(vocabulary) + 1)
+    items = list(synthetic_items(max(args.sizes)))
+    for item in items:
+        item["tags"] = item["tags"] + (["vegetarian"] if item["slug"][-1] in "02468" else [])
+        item["tag_bits"] = encode_bits(intern(t) for t in item_terms(item["name"], item["description"], item["tags"]))
+
+    ids = lambda names: {vocabulary[n] for n in names if n in vocabulary}
+    constraints = DietaryConstraints(
+        require=[ids(DIETS[DIET])],
+        avoid=[(ids(AVOID_TERMS[r]), ids({tag_term(f"{r}-free"), tag_term(f"{r.rstrip('s')}-free")})) for r in RESTRICTIONS]
+              + [(ids({DISLIKED}), set())],
+        prefer=ids({PREFER}),
+    )
+
+    print(f"{len(vocabulary)} interned terms; avg bitset {np.mean([len(i['tag_bits']) for i in items]):.0f} bytes")
+    print(f"{'dishes':>8} {'strings ms':>11} {'bitsets ms':>11} {'speedup':>8} {'safe':>7}")
+    for size in args.sizes:
+        subset = items[:size]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = string_filter(subset)
+        strings = (time.perf_counter() - start) / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            bitsets = [item["tag_bits"] for item in subset]
+            safe, _ = evaluate(bit_matrix(bitsets), np.ones(len(bitsets), dtype=bool), constraints)
+        vectorised = (time.perf_counter() - start) / args.repeat
+
+        got = [item["slug"] for item, ok in zip(subset, safe.tolist()) if ok]
+        assert got == expected, f"bitset filter disagrees with string filter at {size} dishes"
+        print(f"{size:>8} {strings * 1000:>11.3f} {vectorised * 1000:>11.3f} {strings / vectorised:>7.1f}x {len(got):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Image enrichment of a large menu against a local Custom Search stand-in.
+
+The mock server adds per-request latency and can throttle a fraction of requests
+with 429s. Reports wall time next to the floor the quota allows,
+(requests - burst) / rate, and checks every dish came back with images. A second
+pass re-enriches the same menu, which image_cache should answer without any requests.
+
+    python -m benchmarks.enrich_images --items 60 --qpm 600 --latency-ms 300 --throttle 0.05
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+import tempfile
+import time
+
+from benchmarks.fakes import FakeSearchServer, load_sample_menus
+
+
+def large_menu(items: int) -> dict:
+    menu = copy.deepcopy(load_sample_menus()[0])
+    dishes = [item for category in menu["menu"] for item in category["items"]]
+    category = {"category": "Everything", "description": None, "priority": 1, "items": []}
+    for i in range(items):
+        dish = copy.deepcopy(dishes[i % len(dishes)])
+        dish["name"] = f"{dish['name']} {i}"
+        dish["slug"] = f"{dish.get('slug') or 'item'}-{i}"
+        category["items"].append(dish)
+    menu["menu"] = [category]
+    return menu
+
+
+async def enrich(menu: dict, args):
+    from utils.imagesearch import ImageSearchClient
+
+    async with ImageSearchClient(
+        queries_per_minute=args.qpm, burst=args.burst, concurrency=args.concurrency,
+        timeout=args.timeout, max_retries=args.retries, backoff=args.backoff,
+    ) as client:
+        start = time.perf_counter()
+        result = await client.enrich_menu(menu)
+        return result, time.perf_counter() - start, client.requests, client.retries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=60)
+    parser.add_argument("--qpm", type=float, default=600, help="quota, queries per minute")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=5)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--throttle", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    # A fresh cache, so the first pass really goes out to the server
+    os.environ["IMAGE_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-"), "image_search.sqlite3")
+
+    with FakeSearchServer(latency=args.latency_ms / 1000, throttle_rate=args.throttle) as server:
+        import utils.imagesearch
+        utils.imagesearch.CSE_ENDPOINT = server.url
+        utils.imagesearch.CSE_ID = utils.imagesearch.API_KEY = os.getenv("CSE_ID", "offline-benchmark")
+
+        menu = large_menu(args.items)
+        result, seconds, sent, retries = asyncio.run(enrich(menu, args))
+        _, rerun_seconds, rerun_sent, _ = asyncio.run(enrich(copy.deepcopy(result), args))
+
+    lookups = args.items + 1  # every dish plus the restaurant photo
+    rate = args.qpm / 60
+    quota_floor = max(0.0, (sent - args.burst) / rate)
+    concurrency_floor = lookups / args.concurrency * args.latency_ms / 1000
+    serial_estimate = lookups * args.latency_ms / 1000 + args.items  # old loop: one at a time plus sleep(1)
+    missing = [item["slug"] for item in result["menu"][0]["items"] if not item.get("images")]
+
+    print(f"lookups               {lookups} ({sent} requests, {retries} retries)")
+    print(f"wall time             {seconds:.2f}s  ({lookups / seconds:.1f} lookups/s)")
+    print(f"quota floor           {quota_floor:.2f}s  at {rate:.1f} req/s, burst {args.burst}")
+    print(f"concurrency floor     {concurrency_floor:.2f}s  at {args.concurrency} in flight")
+    print(f"serial loop (est.)    {serial_estimate:.2f}s")
+    print(f"restaurant image      {'yes' if result.get('restaurant_image') else 'no'}")
+    print(f"re-enrich             {rerun_seconds:.2f}s, {rerun_sent} requests")
+    print(f"dishes without images {len(missing)}" + (f": {', '.join(missing[:5])}" if missing else ""))
+
+
+if __name__ == "__main__":
+    main()
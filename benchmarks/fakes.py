@@ -0,0 +1,186 @@
+"""
+Offline stand-ins for the services the pipeline normally calls.
+
+- FakeLLM: replays the menus in saved/ and output_menu.json through the same
+  generate_content(contents, stream=...) interface as Vertex's GenerativeModel.
+- FakeOCR: answers PaddleOCR's ocr() calls with text lines taken from those menus.
+- FakeSearchServer: a local HTTP server shaped like the Custom Search JSON API;
+  point CSE_ENDPOINT at its url.
+
+install_fakes() swaps the first two into utils.registry so nothing needs patching.
+"""
+
+import copy
+import glob
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from utils.registry import models
+
+SAMPLE_MENU_PATHS = ["output_menu.json"] + sorted(glob.glob("saved/*.json"))
+
+
+def load_sample_menus(paths: list = None) -> list:
+    menus = []
+    for path in paths or SAMPLE_MENU_PATHS:
+        with open(path, encoding="utf-8") as f:
+            menus.append(json.load(f))
+    return menus
+
+
+def menu_to_ocr_lines(menu: dict) -> list:
+    """Roughly what OCR would read off the printed menu: name, headers, dishes, prices."""
+    lines = [(menu.get("restaurant_name") or "").upper()]
+    for category in menu.get("menu", []):
+        lines.append(category.get("category", "").upper())
+        for item in category.get("items", []):
+            lines.append(item.get("name", ""))
+            if item.get("description"):
+                lines.append(item["description"])
+            if item.get("price") is not None:
+                lines.append(f"${item['price']}")
+    return [line for line in lines if line]
+
+
+def _sleep(seconds: float, jitter: float) -> None:
+    if seconds > 0:
+        time.sleep(max(0.0, random.gauss(seconds, seconds * jitter)))
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLLM:
+    """
+    Args:
+        menus (list): Parsed menus to replay, round-robin.
+        latency (float): Seconds per completion (spread across chunks when streaming).
+        jitter (float): Relative standard deviation applied to latency.
+        unique (bool): Give every reply its own restaurant name and slugs, so each
+            parse creates a new restaurant instead of hitting the name dedupe.
+        chunk_chars (int): Characters per streamed chunk.
+    """
+
+    def __init__(self, menus: list = None, latency: float = 1.5, jitter: float = 0.1,
+                 unique: bool = True, chunk_chars: int = 24):
+        self.menus = menus or load_sample_menus()
+        self.latency = latency
+        self.jitter = jitter
+        self.unique = unique
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _next_menu(self) -> dict:
+        with self._lock:
+            self.calls += 1
+            n = next(self._counter)
+        menu = copy.deepcopy(self.menus[n % len(self.menus)])
+        if self.unique:
+            menu["restaurant_name"] = f"{menu.get('restaurant_name') or 'Restaurant'} #{n}"
+            for category in menu.get("menu", []):
+                for item in category.get("items", []):
+                    item["slug"] = f"{item.get('slug') or 'item'}-{n}"
+        return menu
+
+    def generate_content(self, contents, stream: bool = False):
+        text = "```json\n" + json.dumps(self._next_menu(), indent=2) + "\n```"
+        if not stream:
+            _sleep(self.latency, self.jitter)
+            return _Response(text)
+        return self._stream(text)
+
+    def _stream(self, text: str):
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        for piece in pieces:
+            _sleep(self.latency / len(pieces), self.jitter)
+            yield _Response(piece)
+
+
+class FakeOCR:
+    """Mimics the PaddleOCR.ocr() result shapes used by utils/ocr_extractor.py."""
+
+    def __init__(self, lines: list = None, latency: float = 0.4, jitter: float = 0.1):
+        self.lines = lines or menu_to_ocr_lines(load_sample_menus()[0])
+        self.latency = latency
+        self.jitter = jitter
+
+    def _boxes(self) -> list:
+        return [[[10, 30 * i], [300, 30 * i], [300, 30 * i + 24], [10, 30 * i + 24]] for i in range(len(self.lines))]
+
+    def ocr(self, img, det: bool = True, rec: bool = True, cls: bool = True):
+        _sleep(self.latency, self.jitter)
+        if det and not rec:
+            return [self._boxes()]
+        if rec and not det:
+            crops = img[0] if isinstance(img, list) else [img]
+            return [[(self.lines[i % len(self.lines)], 0.97) for i in range(len(crops))]]
+        return [[[box, (text, 0.97)] for box, text in zip(self._boxes(), self.lines)]]
+
+
+def install_fakes(llm: FakeLLM = None, ocr: FakeOCR = None) -> None:
+    """Registers the fakes as the "llm" and "ocr" backends; pass None to keep a real one."""
+    if llm is not None:
+        models.register("llm", lambda: llm)
+    if ocr is not None:
+        models.register("ocr", lambda: ocr)
+
+
+class FakeSearchServer:
+    """
+    Local Custom Search stand-in. Replies after `latency` seconds with `num` image links
+    derived from the query, and answers 429 for a `throttle_rate` fraction of requests.
+    """
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.1, throttle_rate: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                _sleep(server.latency, server.jitter)
+                if random.random() < server.throttle_rate:
+                    self._reply(429, {"error": {"code": 429, "message": "Rate limit exceeded"}})
+                    return
+                params = parse_qs(urlparse(self.path).query)
+                query = params.get("q", [""])[0]
+                num = int(params.get("num", ["6"])[0])
+                digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+                self._reply(200, {"items": [{"link": f"https://images.example.test/{digest}/{i}.jpg"} for i in range(num)]})
+
+            def _reply(self, status: int, body: dict):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}/customsearch/v1"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,76 @@
+"""
+Import-time budget check for the API process.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter, prints the
+slowest modules, and exits non-zero if the total exceeds the budget or if any
+heavy backend (PaddleOCR, Vertex AI, matplotlib) got imported eagerly.
+
+    python -m benchmarks.import_time --budget-ms 2500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# These must only load on first use through utils.registry
+FORBIDDEN = ("paddleocr", "paddle", "vertexai", "matplotlib")
+
+
+def measure(module: str) -> list:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),  # the repo root, wherever this runs from
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def summarize(rows: list, module: str) -> tuple:
+    """(total import ms for module, heavy backends it pulled in eagerly)."""
+    total_ms = next(cum for name, _, cum in rows if name.strip() == module) / 1000
+    eager = sorted({name.strip() for name, _, _ in rows if name.strip().split(".")[0] in FORBIDDEN})
+    return total_ms, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "2500")))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms, eager = summarize(rows, args.module)
+
+    print(f"Slowest modules (self time) importing '{args.module}':")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cum_us / 1000:8.1f} ms cumulative  {name.strip()}")
+
+    print(f"\nTotal: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if eager:
+        print(f"❌ Heavy backends imported at startup: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("❌ Import time over budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
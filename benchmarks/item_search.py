@@ -0,0 +1,137 @@
+"""
+Latency of GET /search/items' ranking at catalogue scale.
+
+Generates --items synthetic dishes (names, descriptions and tags drawn from a
+food vocabulary) and runs a mix of queries: one and two words, with a tag
+filter, with max_price, and a deep page. Without --database-url it times the
+in-process index SQLite deployments use, loaded straight from the generated
+rows. With a Postgres --database-url it ingests the dishes (1000 per restaurant,
+through create_restaurant_with_menu) and times search_menu_items end to end
+against the tsvector/GIN indexes.
+
+    python -m benchmarks.item_search --items 1000000 --queries 500
+    python -m benchmarks.item_search --items 1000000 --database-url postgresql://localhost/prevu_bench
+"""
+
+import argparse
+import os
+import random
+import time
+
+INGREDIENTS = """
+tomato basil mozzarella parmesan garlic onion pepper chili lemon lime ginger soy sesame coconut curry
+mushroom spinach kale arugula avocado corn bean lentil chickpea rice noodle potato cheddar feta ricotta
+chicken beef pork lamb duck shrimp salmon tuna cod crab lobster tofu egg bacon sausage chorizo ham
+olive caper anchovy pesto truffle honey maple cinnamon vanilla chocolate caramel almond walnut pistachio
+mango pineapple strawberry blueberry raspberry apple pear peach cherry banana yogurt cream butter
+cilantro mint parsley thyme rosemary oregano dill cumin paprika saffron turmeric miso kimchi seaweed
+""".split()
+DISHES = """
+pizza pasta lasagna ravioli risotto gnocchi salad soup burger sandwich taco burrito quesadilla enchilada
+curry ramen pho udon sushi sashimi dumpling bao bibimbap stew chili omelette pancake waffle crepe
+tart pie cake brownie cookie gelato sorbet pudding skewer kebab falafel shawarma gyro wrap bowl platter
+""".split()
+STYLES = "grilled roasted fried smoked braised steamed crispy spicy creamy classic house fresh wild".split()
+TAGS = """
+vegetarian vegan gluten-free dairy-free spicy italian mexican thai japanese indian chinese korean
+french american mediterranean dessert starter main side breakfast seafood
+""".split()
+
+
+def synthetic_items(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(count):
+        name = f"{rng.choice(STYLES)} {rng.choice(INGREDIENTS)} {rng.choice(DISHES)}".title()
+        yield {
+            "name": name,
+            "slug": f"item-{i}",
+            "description": " ".join(rng.sample(INGREDIENTS, rng.randint(3, 7))),
+            "price": round(rng.uniform(3, 60), 2),
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+            "image_prompt": None,
+            "images": [],
+        }
+
+
+def query_mix(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    shapes = [
+        lambda: {"q": rng.choice(DISHES)},
+        lambda: {"q": f"{rng.choice(INGREDIENTS)} {rng.choice(DISHES)}"},
+        lambda: {"q": rng.choice(INGREDIENTS), "tags": [rng.choice(TAGS)]},
+        lambda: {"q": rng.choice(DISHES), "max_price": 15.0},
+        lambda: {"q": rng.choice(DISHES), "offset": 200},
+        lambda: {"tags": [rng.choice(TAGS), rng.choice(TAGS)]},
+    ]
+    return [rng.choice(shapes)() for _ in range(count)]
+
+
+def ingest(items: int, per_restaurant: int = 1000) -> None:
+    from database.db import SessionLocal
+    from utils.crud import create_restaurant_with_menu
+
+    generated = synthetic_items(items)
+    db = SessionLocal()
+    try:
+        for r in range((items + per_restaurant - 1) // per_restaurant):
+            batch = [next(generated) for _ in range(min(per_restaurant, items - r * per_restaurant))]
+            menu = [{"category": f"Section {c}", "priority": c, "items": batch[c * 50:(c + 1) * 50]}
+                    for c in range((len(batch) + 49) // 50)]
+            create_restaurant_with_menu(db, {"restaurant_name": f"Search Bench {r}", "menu": menu})
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--database-url", help="Postgres URL to benchmark the tsvector/GIN path")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ["WARMUP_MODELS"] = ""
+
+    from benchmarks.pipeline import percentile
+
+    queries = query_mix(args.queries)
+    if args.database_url:
+        from database.db import Base, SessionLocal, engine
+        from utils.item_search import search_menu_items
+
+        Base.metadata.create_all(bind=engine)
+        start = time.perf_counter()
+        ingest(args.items)
+        print(f"Ingested {args.items} items in {time.perf_counter() - start:.1f}s")
+        db = SessionLocal()
+        run = lambda query: search_menu_items(db, limit=args.limit, **query)
+    else:
+        from utils.item_search import ItemSearchIndex
+
+        index = ItemSearchIndex()
+        start = time.perf_counter()
+        index.load(synthetic_items(args.items))
+        print(f"Indexed {len(index)} items in {time.perf_counter() - start:.1f}s")
+        run = lambda query: index.search(query.get("q"), query.get("tags", ()), query.get("max_price"),
+                                         query.get("offset", 0), args.limit)
+
+    for query in queries[:20]:  # warm postings caches / Postgres buffers
+        run(query)
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        page, _ = run(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(page)
+
+    ms = lambda pct: percentile(latencies, pct) * 1000
+    print(f"{len(queries)} queries, {hits / len(queries):.1f} results/page")
+    print(f"p50 {ms(50):.1f}ms  p95 {ms(95):.1f}ms  p99 {ms(99):.1f}ms  max {max(latencies) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
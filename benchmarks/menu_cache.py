@@ -0,0 +1,98 @@
+"""
+GET /restaurants/{id}/menu with and without the response cache, and as a 304.
+
+Ingests one restaurant of --items dishes and requests its menu --requests times
+through the ASGI app in three modes:
+
+  uncached     every request loads menus -> categories -> items and re-serialises
+  cached       a version query, then the stored body (utils.response_cache)
+  revalidated  If-None-Match with the current ETag: a version query and an empty 304
+
+Reports latency, DB queries and response bytes per request. Then writes images to
+one dish (the enrichment path) and checks the next request sees them under a new ETag.
+
+    python -m benchmarks.menu_cache --items 1000 --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--per-category", type=int, default=25)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ["WARMUP_MODELS"] = ""
+    os.environ["REQUEST_TIMING_LOG"] = "false"
+    os.environ["RESPONSE_CACHE_SHARED_PATH"] = ""
+
+    import httpx
+    from sqlalchemy import event
+
+    from app import app
+    from benchmarks.bulk_ingest import synthetic_menu
+    from benchmarks.pipeline import percentile
+    from database.db import Base, SessionLocal, engine
+    from utils.crud import create_restaurant_with_menu, get_restaurant_menu_items, set_menu_item_images
+    from utils.response_cache import menu_cache
+
+    Base.metadata.create_all(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+
+    db = SessionLocal()
+    try:
+        restaurant_id = create_restaurant_with_menu(db, synthetic_menu(args.items, "cache", args.per_category)).id
+    finally:
+        db.close()
+    url = f"/restaurants/{restaurant_id}/menu"
+    max_bytes = menu_cache.max_bytes
+
+    async def run(mode: str) -> tuple:
+        menu_cache.max_bytes = 0 if mode == "uncached" else max_bytes
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            etag = (await client.get(url)).headers["etag"]
+            headers = {"If-None-Match": etag} if mode == "revalidated" else {}
+            latencies, sent = [], 0
+            statements.clear()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == (304 if mode == "revalidated" else 200)
+                sent += len(response.content)
+            return latencies, len(statements) / args.requests, sent / args.requests
+
+    print(f"{args.items} dishes, {args.requests} requests per mode")
+    print(f"{'mode':>12} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'bytes':>9}")
+    for mode in ("uncached", "cached", "revalidated"):
+        latencies, queries, sent = asyncio.run(run(mode))
+        ms = lambda pct: percentile(latencies, pct) * 1000
+        print(f"{mode:>12} {ms(50):>8.2f} {ms(95):>8.2f} {queries:>8.1f} {sent:>9.0f}")
+
+    async def fetch() -> httpx.Response:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            return await client.get(url)
+
+    before = asyncio.run(fetch())
+    db = SessionLocal()
+    try:
+        dish = get_restaurant_menu_items(db, restaurant_id)[0]
+        set_menu_item_images(db, {dish.id: ["https://example.com/bench.jpg"]})
+    finally:
+        db.close()
+    after = asyncio.run(fetch())
+    assert after.headers["etag"] != before.headers["etag"] and "bench.jpg" in after.text, "image write not reflected"
+    print(f"✅ Image write invalidated the cached menu; hit rate {menu_cache.stats()['hit_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
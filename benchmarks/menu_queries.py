@@ -0,0 +1,81 @@
+"""
+Checks that GET /restaurants/{id}/menu issues a fixed number of queries.
+
+Ingests restaurants of growing size, calls the endpoint through the ASGI app and
+counts the statements it sends (on the async engine too when DB_ASYNC=true). With
+selectinload the count is the same for one dish or a thousand; a lazy-load
+regression shows up as a count that grows with the menu, and the script exits 1.
+
+    python -m benchmarks.menu_queries --sizes 1x1 5x10 40x25
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1x1", "5x10", "40x25"], help="CATEGORIESxITEMS")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ["WARMUP_MODELS"] = ""
+    os.environ["REQUEST_TIMING_LOG"] = "false"
+
+    import httpx
+    from sqlalchemy import event
+
+    from app import app
+    import database.db
+    from database.db import DB_ASYNC, Base, SessionLocal, engine, get_async_sessionmaker
+    from benchmarks.bulk_ingest import synthetic_menu
+    from utils.crud import create_restaurant_with_menu
+
+    Base.metadata.create_all(bind=engine)
+    statements = []
+    engines = [engine]
+    if DB_ASYNC:
+        get_async_sessionmaker()
+        engines.append(database.db._async_engine.sync_engine)
+    for counted in engines:
+        event.listen(counted, "before_cursor_execute", lambda conn, cursor, statement, *a: statements.append(statement))
+
+    async def fetch(restaurant_id) -> tuple:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            statements.clear()
+            start = time.perf_counter()
+            response = await client.get(f"/restaurants/{restaurant_id}/menu")
+            response.raise_for_status()
+            return response.json(), len(statements), time.perf_counter() - start
+
+    counts = set()
+    print(f"{'categories':>10} {'items':>6} {'queries':>8} {'ms':>8}")
+    for size in args.sizes:
+        categories, per_category = (int(n) for n in size.lower().split("x"))
+        db = SessionLocal()
+        try:
+            restaurant_id = create_restaurant_with_menu(
+                db, synthetic_menu(categories * per_category, f"q{size}", per_category)
+            ).id
+        finally:
+            db.close()
+
+        body, queries, seconds = asyncio.run(fetch(restaurant_id))
+        returned = sum(len(c["items"]) for m in body["menus"] for c in m["categories"])
+        assert returned == categories * per_category, f"expected {categories * per_category} items, got {returned}"
+        counts.add(queries)
+        print(f"{categories:>10} {returned:>6} {queries:>8} {seconds * 1000:>8.1f}")
+
+    if len(counts) > 1:
+        print(f"❌ Query count varies with menu size: {sorted(counts)}")
+        sys.exit(1)
+    print(f"✅ {counts.pop()} queries regardless of menu size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-call cost of the @timed stage decorator and the DB query hook, enabled vs disabled.
+
+Times a trivial function bare, wrapped by a disabled Metrics, and wrapped by an
+enabled one (with and without a request context), plus SELECT 1 on an in-memory
+SQLite engine with and without the query counter. The disabled numbers should
+match the bare ones to within noise; --check fails if they don't.
+
+    python -m benchmarks.metrics_overhead --calls 500000 --check
+"""
+
+import argparse
+import sys
+import timeit
+
+from sqlalchemy import create_engine, text
+
+from utils.metrics import Metrics, _request
+
+
+def noop(x):
+    return x
+
+
+def per_call_ns(fn, calls: int, repeat: int) -> float:
+    return min(timeit.repeat(lambda: fn(1), number=calls, repeat=repeat)) / calls * 1e9
+
+
+def query_ns(engine, calls: int, repeat: int) -> float:
+    with engine.connect() as conn:
+        statement = text("SELECT 1")
+        return min(timeit.repeat(lambda: conn.execute(statement), number=calls, repeat=repeat)) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="exit 1 if disabled overhead exceeds --max-ns")
+    parser.add_argument("--max-ns", type=float, default=20.0, help="allowed disabled overhead per call")
+    args = parser.parse_args()
+
+    disabled, enabled = Metrics(enabled=False), Metrics(enabled=True)
+    bare = per_call_ns(noop, args.calls, args.repeat)
+    off = per_call_ns(disabled.timed("bench")(noop), args.calls, args.repeat)
+    on = per_call_ns(enabled.timed("bench")(noop), args.calls, args.repeat)
+    token = _request.set({"queries": 0, "stages": {}})
+    try:
+        on_request = per_call_ns(enabled.timed("bench")(noop), args.calls, args.repeat)
+    finally:
+        _request.reset(token)
+
+    plain_engine, counted_engine = create_engine("sqlite://"), create_engine("sqlite://")
+    disabled.instrument_engine(plain_engine)
+    enabled.instrument_engine(counted_engine)
+    query_off = query_ns(plain_engine, args.queries, args.repeat)
+    query_on = query_ns(counted_engine, args.queries, args.repeat)
+
+    print(f"{'case':<34} {'ns/call':>10} {'overhead':>10}")
+    print(f"{'bare function':<34} {bare:>10.1f} {'':>10}")
+    print(f"{'@timed, metrics disabled':<34} {off:>10.1f} {off - bare:>+10.1f}")
+    print(f"{'@timed, metrics enabled':<34} {on:>10.1f} {on - bare:>+10.1f}")
+    print(f"{'@timed, enabled + request context':<34} {on_request:>10.1f} {on_request - bare:>+10.1f}")
+    print(f"{'SELECT 1, no query hook':<34} {query_off:>10.1f} {'':>10}")
+    print(f"{'SELECT 1, query hook installed':<34} {query_on:>10.1f} {query_on - query_off:>+10.1f}")
+
+    if args.check and off - bare > args.max_ns:
+        print(f"❌ Disabled overhead {off - bare:.1f} ns/call exceeds {args.max_ns} ns")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares page-at-a-time OCR with cross-page batched recognition (run_ocr_pages)
+on CPU and reports pages/sec for each.
+
+    python -m benchmarks.ocr_throughput --pages 8 temp/image_0.png
+"""
+
+import argparse
+import glob
+import time
+
+import cv2
+
+from utils.ocr_extractor import get_ocr, run_ocr_pages
+
+
+def load_pages(paths: list, count: int) -> list:
+    images = [cv2.imread(path) for path in paths]
+    images = [img for img in images if img is not None]
+    if not images:
+        raise SystemExit("No readable images given")
+    return [images[i % len(images)] for i in range(count)]
+
+
+def page_at_a_time(images: list) -> None:
+    ocr = get_ocr()
+    for img in images:
+        ocr.ocr(img, cls=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="*", default=sorted(glob.glob("temp/*.png")))
+    parser.add_argument("--pages", type=int, default=8, help="pages per run (images are cycled)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_pages(args.images, args.pages)
+    run_ocr_pages(images[:1])  # warm up the predictors before timing
+
+    for label, fn in (("sequential", page_at_a_time), ("batched", run_ocr_pages)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn(images)
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:>10}: {len(images)} pages in {best:.2f}s -> {len(images) / best:.2f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Page latency by depth: OFFSET vs keyset pagination for GET /restaurants.
+
+Inserts --restaurants rows (spread over a year of last_updated values, with
+ties) and fetches one --limit page at each --depths offset, newest first:
+
+  offset orm   db.query(Restaurant).order_by(...).offset(d).limit(n), hydrated
+  offset rows  the same OFFSET query selecting the listing's columns as plain rows
+  keyset       utils.pagination.keyset_page resuming from the cursor at that depth
+
+OFFSET reads and discards every row before the page, so it grows with depth;
+keyset seeks the (last_updated, id) index and should stay flat. Each keyset page
+is checked against the OFFSET one.
+
+    python -m benchmarks.pagination --restaurants 200000 --depths 0 1000 10000 100000 199000
+    python -m benchmarks.pagination --database-url postgresql://localhost/prevu_bench
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=200000)
+    parser.add_argument("--depths", nargs="+", type=int, default=[0, 1000, 10000, 100000, 199000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ["WARMUP_MODELS"] = ""
+
+    from sqlalchemy import select
+
+    from database.db import Base, SessionLocal, engine
+    from database.models import Restaurant
+    from utils.pagination import LISTINGS, encode_cursor, keyset_page
+
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    start_date = datetime(2024, 1, 1)
+    db = SessionLocal()
+    for offset in range(0, args.restaurants, 10000):
+        db.execute(Restaurant.__table__.insert(), [
+            {
+                "id": uuid.uuid4(),
+                "name": f"Restaurant {i}",
+                "location": f"{rng.randint(1, 999)} Main St",
+                "description": "A neighbourhood place " * 4,
+                "currency": "USD",
+                "last_updated": start_date + timedelta(minutes=rng.randint(0, 60 * 24 * 365 // 4)),
+                "restaurant_image": None,
+            }
+            for i in range(offset, min(offset + 10000, args.restaurants))
+        ])
+    db.commit()
+
+    listing = LISTINGS["restaurants"]
+    table = Restaurant.__table__
+    order = (table.c.last_updated.desc(), table.c.id.desc())
+    columns = [table.c[field] for field in listing.default_fields]
+
+    def timed(run) -> tuple:
+        result = run()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            run()
+        return result, (time.perf_counter() - start) / args.repeat * 1000
+
+    print(f"{args.restaurants} restaurants, {args.limit} per page")
+    print(f"{'depth':>8} {'offset orm ms':>14} {'offset rows ms':>15} {'keyset ms':>10}")
+    for depth in args.depths:
+        _, orm_ms = timed(lambda: db.query(Restaurant).order_by(*order).offset(depth).limit(args.limit).all())
+        expected, rows_ms = timed(lambda: db.execute(
+            select(*columns).order_by(*order).offset(depth).limit(args.limit)).mappings().all())
+        # The cursor a client holding the previous page would send
+        cursor = None
+        if depth:
+            previous = db.execute(select(table.c.last_updated, table.c.id).order_by(*order).offset(depth - 1).limit(1)).one()
+            cursor = encode_cursor("recent", previous)
+        (page, _), keyset_ms = timed(lambda: keyset_page(db, listing, "recent", (), cursor, args.limit))
+        assert [row["id"] for row in page] == [row["id"] for row in expected], f"keyset page differs at depth {depth}"
+        print(f"{depth:>8} {orm_ms:>14.2f} {rows_ms:>15.2f} {keyset_ms:>10.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
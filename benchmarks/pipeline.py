@@ -0,0 +1,268 @@
+"""
+Offline end-to-end benchmark of the API, driven through the ASGI app in-process.
+
+Vertex, PaddleOCR and Custom Search are replaced by benchmarks.fakes with
+configurable latency, and the database is a throwaway SQLite file unless
+--database-url points at a local Postgres. Reports p50/p95/p99 latency and
+requests/sec per endpoint, plus per-stage timings from the parse jobs.
+
+    python -m benchmarks.pipeline --requests 50 --concurrency 8
+    python -m benchmarks.pipeline --compare HEAD~5 HEAD
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies: list, wall_seconds: float) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+
+def _configure_environment(args, workdir: str) -> None:
+    # Must happen before the app (and its module-level config) is imported
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["PARSE_CACHE_PATH"] = os.path.join(workdir, "parse_results.sqlite3")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_responses.sqlite3")
+    os.environ["IMAGE_CACHE_PATH"] = os.path.join(workdir, "image_search.sqlite3")
+    os.environ["WARMUP_MODELS"] = ""
+    os.environ["CSE_ID"] = os.environ["API_KEY"] = "offline-benchmark"
+    if not args.warm_cache:
+        # Zero-byte caches evict every entry on write, so each request does the full work
+        for name in ("PARSE_CACHE_MAX_MB", "LLM_CACHE_MAX_MB", "IMAGE_CACHE_MAX_MB"):
+            os.environ[name] = "0"
+
+
+def _menu_image() -> bytes:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (320, 240), "white")
+    draw = ImageDraw.Draw(img)
+    draw.text((10, 10), f"MENU {random.random():.8f}", fill="black")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _run_phase(name: str, count: int, concurrency: int, fn, results: dict) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures, outputs = [], 0, []
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                outputs.append(await fn(i))
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                failures += 1
+                if failures <= 3:
+                    print(f"  ⚠️ {name} #{i} failed: {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    results[name] = {**summarize(latencies, time.perf_counter() - start), "failures": failures}
+    return outputs
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+
+    from app import app
+    from database.db import Base, engine
+    import database.models  # noqa: F401  (registers the tables)
+    from benchmarks.fakes import FakeLLM, FakeOCR, FakeSearchServer, install_fakes, load_sample_menus
+
+    engine.echo = False  # per-statement logging would dominate the timings
+    Base.metadata.create_all(bind=engine)
+    install_fakes(
+        llm=FakeLLM(latency=args.llm_ms / 1000),
+        ocr=None if args.real_ocr else FakeOCR(latency=args.ocr_ms / 1000),
+    )
+
+    endpoints, stages = {}, {}
+    sample_menu = load_sample_menus()[0]
+    slugs = [item["slug"] for c in sample_menu["menu"] for item in c["items"]]
+
+    with FakeSearchServer(latency=args.search_ms / 1000) as search:
+        import utils.imagesearch
+        utils.imagesearch.CSE_ENDPOINT = search.url
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            n, c = args.requests, args.concurrency
+            run_id = f"{int(time.time())}{random.randint(0, 9999)}"
+
+            async def signup(i):
+                r = await client.post("/signup", json={"email": f"u{run_id}-{i}@example.com", "password": "pw"})
+                r.raise_for_status()
+
+            async def login(i):
+                r = await client.post("/token", data={"username": f"u{run_id}-{i}@example.com", "password": "pw"})
+                r.raise_for_status()
+                return r.json()["access_token"]
+
+            await _run_phase("POST /signup", n, c, signup, endpoints)
+            tokens = await _run_phase("POST /token", n, c, login, endpoints)
+
+            async def profile(i):
+                r = await client.get("/profile", headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"})
+                r.raise_for_status()
+
+            await _run_phase("GET /profile", n, c, profile, endpoints)
+
+            async def parse_sync(i):
+                files = {"file": (f"menu_{i}.png", _menu_image(), "image/png")}
+                r = await client.post("/parse_menu/?sync=true", files=files)
+                r.raise_for_status()
+
+            async def parse_job(i):
+                files = {"file": (f"menu_{i}.png", _menu_image(), "image/png")}
+                r = await client.post("/parse_menu/", files=files)
+                r.raise_for_status()
+                job_id = r.json()["id"]
+                while True:
+                    job = (await client.get(f"/jobs/{job_id}")).json()
+                    if job["status"] in ("done", "failed"):
+                        break
+                    await asyncio.sleep(0.01)
+                if job["status"] == "failed":
+                    raise RuntimeError(job["error"])
+                for stage, seconds in job["timings"].items():
+                    stages.setdefault(stage, []).append(seconds)
+
+            parse_n = args.parse_requests or max(1, n // 5)
+            await _run_phase("POST /parse_menu/?sync=true", parse_n, c, parse_sync, endpoints)
+            await _run_phase("POST /parse_menu/ (job)", parse_n, c, parse_job, endpoints)
+
+            async def enrich(i):
+                r = await client.post(
+                    "/enrich_menu/", params={"slug": slugs[i % len(slugs)]}, json=sample_menu
+                )
+                r.raise_for_status()
+
+            await _run_phase("POST /enrich_menu/", n, c, enrich, endpoints)
+
+    return {
+        "endpoints": endpoints,
+        "stages": {stage: summarize(values, 0) for stage, values in stages.items()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "json")},
+    }
+
+
+def print_report(results: dict) -> None:
+    print(f"\n{'endpoint':<30} {'n':>5} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, s in results["endpoints"].items():
+        print(f"{name:<30} {s['count']:>5} {s['failures']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['rps']:>8.1f}")
+    if results["stages"]:
+        print(f"\n{'parse stage':<30} {'n':>5} {'':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, s in results["stages"].items():
+            print(f"{name:<30} {s['count']:>5} {'':>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f}")
+
+
+def compare_revisions(args, passthrough: list) -> None:
+    """Runs this same harness against two git revisions in temporary worktrees."""
+    harness = os.path.dirname(os.path.abspath(__file__))
+    root = subprocess.check_output(["git", "rev-parse", "--show-toplevel"], text=True).strip()
+    runs = []
+
+    for rev in args.compare:
+        worktree = tempfile.mkdtemp(prefix="bench-")
+        out = os.path.join(worktree, "bench_result.json")
+        subprocess.check_call(["git", "-C", root, "worktree", "add", "--detach", "--force", worktree, rev],
+                              stdout=subprocess.DEVNULL)
+        try:
+            shutil.copytree(harness, os.path.join(worktree, "benchmarks"), dirs_exist_ok=True)
+            for name in ("saved", "output_menu.json"):
+                source = os.path.join(root, name)
+                if os.path.exists(source) and not os.path.exists(os.path.join(worktree, name)):
+                    (shutil.copytree if os.path.isdir(source) else shutil.copy)(source, os.path.join(worktree, name))
+            print(f"▶️  {rev}")
+            subprocess.check_call(
+                [sys.executable, "-m", "benchmarks.pipeline", "--json", out, *passthrough],
+                cwd=worktree, env={**os.environ, "PYTHONPATH": worktree},
+            )
+            with open(out) as f:
+                runs.append(json.load(f))
+        finally:
+            subprocess.call(["git", "-C", root, "worktree", "remove", "--force", worktree])
+
+    base, head = args.compare
+    before_run, after_run = runs
+    print(f"\n{'endpoint / stage':<30} {'p50 ' + base:>16} {'p50 ' + head:>16} {'Δ p50':>8} {'Δ p95':>8} {'Δ req/s':>8}")
+    for section in ("endpoints", "stages"):
+        for name, before in before_run[section].items():
+            after = after_run[section].get(name)
+            if not after:
+                continue
+
+            def delta(key):
+                return f"{(after[key] - before[key]) / before[key] * 100:+.0f}%" if before.get(key) else "n/a"
+
+            print(f"{name:<30} {before['p50_ms']:>16.1f} {after['p50_ms']:>16.1f} "
+                  f"{delta('p50_ms'):>8} {delta('p95_ms'):>8} {delta('rps') if section == 'endpoints' else '':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40, help="requests per endpoint")
+    parser.add_argument("--parse-requests", type=int, default=0, help="requests per parse mode (default requests/5)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-ms", type=float, default=1500)
+    parser.add_argument("--ocr-ms", type=float, default=400)
+    parser.add_argument("--search-ms", type=float, default=300)
+    parser.add_argument("--real-ocr", action="store_true", help="use PaddleOCR instead of FakeOCR")
+    parser.add_argument("--warm-cache", action="store_true", help="leave the parse, LLM and image caches enabled")
+    parser.add_argument("--database-url", help="e.g. a local Postgres; defaults to a temp SQLite file")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE_REV", "HEAD_REV"))
+    args, _ = parser.parse_known_args()
+
+    if args.compare:
+        passthrough, skip = [], False
+        for token in sys.argv[1:]:
+            if skip:
+                skip -= 1
+                continue
+            if token == "--compare":
+                skip = 2
+                continue
+            passthrough.append(token)
+        compare_revisions(args, passthrough)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        _configure_environment(args, workdir)
+        results = asyncio.run(run_benchmark(args))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Measures what the preprocessing stage buys: OCR latency and text recall on the
+sample images at several downscale targets, against the untouched full-resolution
+decode as the recall reference.
+
+    python -m benchmarks.preprocess_ocr --sizes 2400 1600 1200 960 temp/*.png temp/*.webp
+"""
+
+import argparse
+import glob
+import re
+import time
+from collections import Counter
+
+import cv2
+
+from utils.ocr_extractor import run_ocr
+from utils.preprocess import preprocess_image
+
+
+def tokens(lines: list) -> Counter:
+    return Counter(re.findall(r"[a-z0-9]+", " ".join(line["text"] for line in lines).lower()))
+
+
+def recall(reference: Counter, candidate: Counter) -> float:
+    total = sum(reference.values())
+    return sum((reference & candidate).values()) / total if total else 1.0
+
+
+def timed(fn, *args, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="*", default=sorted(glob.glob("temp/*.png") + glob.glob("temp/*.webp")))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2400, 1600, 1200, 960])
+    parser.add_argument("--deskew", action="store_true")
+    parser.add_argument("--crop", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run_ocr(cv2.imread(args.images[0]))  # warm up the predictors before timing
+
+    for path in args.images:
+        data = open(path, "rb").read()
+        base_time, base_lines = timed(lambda: run_ocr(cv2.imread(path)), repeat=args.repeat)
+        reference = tokens(base_lines)
+        print(f"\n{path}")
+        print(f"  {'baseline':>10}: decode+ocr {base_time * 1000:8.1f} ms  recall 1.000  ({sum(reference.values())} tokens)")
+
+        for size in args.sizes:
+            decode_time, img = timed(
+                preprocess_image, data, size, True, args.deskew, args.crop, repeat=args.repeat
+            )
+            ocr_time, lines = timed(run_ocr, img, repeat=args.repeat)
+            total = decode_time + ocr_time
+            print(
+                f"  {'max ' + str(size):>10}: decode+ocr {total * 1000:8.1f} ms  "
+                f"recall {recall(reference, tokens(lines)):.3f}  "
+                f"({img.shape[1]}x{img.shape[0]}, {base_time / total:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Latency of GET /recommendations' scoring, and incremental vs full index updates.
+
+Builds the recommendation index in memory over --items synthetic dishes (spread
+over restaurants of ~100 dishes, each with ~10 terms from a Zipf-distributed
+vocabulary) and --users users with Zipf-popular views and favourites, then
+times dish and restaurant recommendations for random users. Finally adds a
+batch of new dishes and interactions incrementally and compares that with
+rebuilding the whole index.
+
+    python -m benchmarks.recommendations --items 100000 --users 20000
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+import numpy as np
+
+
+def synthetic_index(index, items: int, users: int, interactions: int, vocabulary: int, seed: int = 0) -> tuple:
+    from utils.dietary import encode_bits
+
+    rng = np.random.default_rng(seed)
+    item_ids = [uuid.uuid4() for _ in range(items)]
+    restaurant_ids = [uuid.uuid4() for _ in range(max(1, items // 100))]
+    terms = np.minimum(rng.zipf(1.3, size=(items, 10)), vocabulary)
+    index.add_items(
+        (item_ids[i], restaurant_ids[i % len(restaurant_ids)], encode_bits(set(terms[i].tolist())))
+        for i in range(items)
+    )
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    picks = np.minimum(rng.zipf(1.2, size=(users, interactions)), items) - 1
+    rows = []
+    for u, user_id in enumerate(user_ids):
+        for n, item in enumerate(picks[u].tolist()):
+            kind = "favorite" if n % 4 == 0 else "view"
+            rows.append((user_id, kind, "item", item_ids[item]))
+            if n % 5 == 0:
+                rows.append((user_id, kind, "restaurant", restaurant_ids[item % len(restaurant_ids)]))
+    index.add_interactions(rows)
+    return item_ids, restaurant_ids, user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--interactions", type=int, default=30, help="views and favourites per user")
+    parser.add_argument("--vocabulary", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from benchmarks.pipeline import percentile
+    from utils.recommender import RecommendationIndex
+
+    index = RecommendationIndex()
+    start = time.perf_counter()
+    item_ids, restaurant_ids, user_ids = synthetic_index(index, args.items, args.users, args.interactions, args.vocabulary)
+    build = time.perf_counter() - start
+    print(f"Built index: {len(index)} dishes, {len(restaurant_ids)} restaurants, {len(user_ids)} users in {build:.1f}s")
+
+    rng = np.random.default_rng(1)
+    for label, recommend in (("dishes", index.recommend_dishes), ("restaurants", index.recommend_restaurants)):
+        recommend(user_ids[0], k=args.k)  # first call copies postings to numpy
+        latencies = []
+        for u in rng.integers(0, len(user_ids), args.queries).tolist():
+            start = time.perf_counter()
+            recommend(user_ids[u], preferred_terms=[1, 2], k=args.k)
+            latencies.append(time.perf_counter() - start)
+        ms = lambda pct: percentile(latencies, pct) * 1000
+        print(f"{label:<12} p50 {ms(50):6.2f}ms  p95 {ms(95):6.2f}ms  p99 {ms(99):6.2f}ms")
+
+    from utils.dietary import encode_bits
+    new_items = [(uuid.uuid4(), restaurant_ids[0], encode_bits([1, 5, 9])) for _ in range(1000)]
+    start = time.perf_counter()
+    index.add_items(new_items)
+    index.add_interactions((user_ids[n % len(user_ids)], "favorite", "item", new_items[n % 1000][0]) for n in range(5000))
+    index.recommend_dishes(user_ids[0], k=args.k)
+    incremental = time.perf_counter() - start
+    print(f"Incremental add of 1000 dishes + 5000 favourites (incl. next query): {incremental * 1000:.0f}ms vs {build:.1f}s rebuild")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Lookup latency and accuracy of the fuzzy restaurant index used on ingest.
+
+Builds the index over --restaurants synthetic names ("Bella Roma Trattoria",
+"Golden Dragon Kitchen", ...) with cities, then queries variants of stored names
+the way a second upload of the same menu tends to differ: a suffix added or
+dropped, "&" vs "and", a typo, different case. Reports per-lookup percentiles,
+how often the right restaurant comes back above the match threshold, and how
+often an unrelated name is wrongly matched. Brute-force rapidfuzz over every name
+is timed for comparison.
+
+    python -m benchmarks.restaurant_match --restaurants 50000 --queries 2000
+"""
+
+import argparse
+import random
+import time
+
+from rapidfuzz import fuzz, process
+
+from benchmarks.pipeline import percentile
+from utils.restaurant_index import RestaurantIndex, core_name, normalize_name
+
+FIRST = [
+    "Bella", "Golden", "Little", "Blue", "Red", "Old", "Royal", "Happy", "Lucky", "Green", "Silver", "Sunny",
+    "Casa", "Spice", "Saffron", "Urban", "Rustic", "Corner", "Harbor", "Olive", "Mama", "Papa", "Big", "Jade",
+]
+SECOND = [
+    "Roma", "Dragon", "Lotus", "Garden", "Taco", "Noodle", "Pho", "Sushi", "Curry", "Burger", "Bistro", "Oven",
+    "Table", "Fork", "Ladle", "Pepper", "Basil", "Mango", "Tandoor", "Wok", "Pita", "Crepe", "Ramen", "Grove",
+]
+SURNAMES = [
+    "Rossi", "Nguyen", "Patel", "Garcia", "Kim", "Chen", "Lopez", "Silva", "Tanaka", "Murphy", "Haddad", "Kowalski",
+    "Okafor", "Novak", "Ibrahim", "Moreau", "Santos", "Yamamoto", "Petrov", "Costa", "Ali", "Schmidt", "Singh", "Park",
+]
+SUFFIXES = ["", "Restaurant", "Kitchen", "Grill", "Cafe", "Bar", "Bistro", "Trattoria", "Eatery", "& Bar"]
+CITIES = [f"{street} St, {city}" for street in ("Main", "Oak", "Pine", "Market", "Elm") for city in (
+    "Austin, TX", "Portland, OR", "Denver, CO", "Boston, MA", "Chicago, IL", "Seattle, WA", "Miami, FL", "Dallas, TX",
+)]
+
+
+def synthetic_restaurants(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    seen, rows = set(), []
+    while len(rows) < count:
+        name = f"{rng.choice(FIRST)} {rng.choice(SECOND)}"
+        if rng.random() < 0.6:
+            name = f"{rng.choice(SURNAMES)}'s {name}" if rng.random() < 0.5 else f"{name} {rng.choice(SURNAMES)}"
+        name = f"{name} {rng.randint(1, 999)}" if rng.random() < 0.7 else name
+        name = f"{name} {rng.choice(SUFFIXES)}".strip()
+        if core_name(normalize_name(name)) in seen:
+            continue
+        seen.add(core_name(normalize_name(name)))
+        rows.append((len(rows), name, rng.choice(CITIES)))
+    return rows
+
+
+def variant(name: str, rng: random.Random) -> str:
+    kind = rng.choice(["suffix", "ampersand", "typo", "case"])
+    if kind == "suffix":
+        return f"{name} & Bar" if not name.endswith("Bar") else name[:-len("Bar")].rstrip(" &")
+    if kind == "ampersand":
+        return f"The {name}".replace(" & ", " and ")
+    if kind == "typo":
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name.upper()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--brute-force", type=int, default=200, help="queries to time against a full rapidfuzz scan")
+    args = parser.parse_args()
+
+    rows = synthetic_restaurants(args.restaurants)
+    index = RestaurantIndex()
+    start = time.perf_counter()
+    index.load(rows)
+    print(f"Indexed {len(index)} restaurants in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(1)
+    latencies, hits = [], 0
+    for _ in range(args.queries):
+        restaurant_id, name, location = rng.choice(rows)
+        query = variant(name, rng)
+        start = time.perf_counter()
+        match = index.best_match(query, location)
+        latencies.append(time.perf_counter() - start)
+        hits += match is not None and match.restaurant_id == restaurant_id
+
+    unrelated = RestaurantIndex()
+    unrelated.load(rows[: len(rows) // 2])
+    false_matches = sum(
+        unrelated.best_match(name, location) is not None for _, name, location in rows[len(rows) // 2:][:args.queries]
+    )
+
+    names = [normalize_name(name) for _, name, _ in rows]
+    brute = []
+    for _ in range(args.brute_force):
+        _, name, _ = rng.choice(rows)
+        start = time.perf_counter()
+        process.extractOne(normalize_name(variant(name, rng)), names, scorer=fuzz.token_sort_ratio)
+        brute.append(time.perf_counter() - start)
+
+    to_us = lambda values, pct: percentile(values, pct) * 1e6
+    print(f"index lookup   p50 {to_us(latencies, 50):>8.0f}µs  p95 {to_us(latencies, 95):>8.0f}µs  p99 {to_us(latencies, 99):>8.0f}µs")
+    print(f"full scan      p50 {to_us(brute, 50):>8.0f}µs  p95 {to_us(brute, 95):>8.0f}µs  p99 {to_us(brute, 99):>8.0f}µs")
+    print(f"variants matched to the right restaurant: {hits}/{args.queries} ({hits / args.queries:.1%})")
+    print(f"unseen names matched to something: {false_matches}/{min(args.queries, len(rows) - len(rows) // 2)}")
+
+
+if __name__ == "__main__":
+    main()
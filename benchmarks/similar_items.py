@@ -0,0 +1,91 @@
+"""
+Latency of GET /items/{id}/similar's top-k cosine search over the memory-mapped index.
+
+Vectorises --items synthetic dishes (benchmarks.item_search's generator, 1000 per
+restaurant) the way `python -m utils.similar_items build` does, writes the index
+files to a temporary directory and times SimilarItemsIndex.similar for random
+dishes, excluding their own restaurant. Then appends --append more dishes the way
+ingest does and times the first query after (the remap) and the steady state.
+
+    python -m benchmarks.similar_items --items 100000 --queries 500
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--append", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    import numpy as np
+    from benchmarks.item_search import synthetic_items
+    from benchmarks.pipeline import percentile
+    from utils.similar_items import (
+        SimilarItemsIndex, _records, document_frequencies, index_similar_items, inverse_frequencies, vectorize,
+    )
+
+    restaurants = [uuid.uuid4() for _ in range((args.items + args.append) // 1000 + 1)]
+    items = list(synthetic_items(args.items + args.append))
+    for i, item in enumerate(items):
+        item["id"] = uuid.uuid4()
+        item["restaurant_id"] = restaurants[i // 1000]
+    built, appended = items[:args.items], items[args.items:]
+
+    path = os.path.join(tempfile.mkdtemp(), "similar")
+    os.makedirs(path)
+    start = time.perf_counter()
+    idf = inverse_frequencies(*document_frequencies(built))
+    idf.tofile(os.path.join(path, "idf.f32"))
+    with open(os.path.join(path, "records.bin"), "wb") as handle:
+        handle.write(_records((item["id"], item["restaurant_id"]) for item in built))
+    with open(os.path.join(path, "vectors.f32"), "wb") as handle:
+        for offset in range(0, len(built), 10000):
+            handle.write(vectorize(built[offset:offset + 10000], idf, args.dim).tobytes())
+    with open(os.path.join(path, "meta.json"), "w") as handle:
+        json.dump({"dim": args.dim, "items": len(built)}, handle)
+    size = os.path.getsize(os.path.join(path, "vectors.f32")) / 1024 / 1024
+    print(f"Built {len(built)} vectors ({size:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+    index = SimilarItemsIndex(path)
+    rng = random.Random(2)
+    queries = [rng.choice(built) for _ in range(args.queries)]
+    run = lambda item: index.similar(item, args.limit, item["restaurant_id"])
+    for item in queries[:20]:  # fault the mapped pages in
+        run(item)
+    latencies, hits = [], 0
+    for item in queries:
+        start = time.perf_counter()
+        hits += len(run(item))
+        latencies.append(time.perf_counter() - start)
+
+    ms = lambda pct: percentile(latencies, pct) * 1000
+    print(f"{len(queries)} queries, {hits / len(queries):.1f} results each")
+    print(f"p50 {ms(50):.1f}ms  p95 {ms(95):.1f}ms  p99 {ms(99):.1f}ms  max {max(latencies) * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    for offset in range(0, len(appended), 100):
+        batch = appended[offset:offset + 100]
+        index_similar_items(batch[0]["restaurant_id"], batch, path)
+    print(f"Appended {len(appended)} dishes in {(time.perf_counter() - start) * 1000:.0f}ms (batches of 100)")
+    start = time.perf_counter()
+    run(appended[0])
+    first = time.perf_counter() - start
+    # A copy of an appended dish under a new id must find the appended row
+    probes = [{**item, "id": uuid.uuid4()} for item in appended[:50]]
+    found = sum(any(s.id == item["id"] for s in index.similar(probe, 5)) for probe, item in zip(probes, appended))
+    print(f"First query after append {first * 1000:.1f}ms over {len(index)} rows; {found}/{len(probes)} appended dishes found")
+
+if __name__ == "__main__":
+    main()
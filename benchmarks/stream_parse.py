@@ -0,0 +1,72 @@
+"""
+Time-to-first-item vs total parse time for the streaming menu parser.
+
+benchmarks.fakes.FakeLLM replays a saved menu JSON (output_menu.json by default)
+in small pieces at a fixed rate, the way Vertex streams a completion, so this runs
+offline. It compares waiting for the full completion with emitting events as
+MenuStreamParser completes them.
+
+    python -m benchmarks.stream_parse --chars-per-chunk 24 --chunk-ms 15
+"""
+
+import argparse
+import copy
+import json
+import time
+
+from utils.grammar_ocr_food_parser import extract_menu_data, stream_menu_text
+from utils.menu_stream import parse_menu_stream
+from benchmarks.fakes import FakeLLM, install_fakes
+
+
+def long_menu(path: str, copies: int) -> dict:
+    sample = json.load(open(path, encoding="utf-8"))
+    menu = []
+    for copy_no in range(copies):
+        for category in sample.get("menu", []):
+            category = copy.deepcopy(category)
+            if copy_no:
+                category["category"] = f"{category['category']} {copy_no + 1}"
+                for item in category.get("items", []):
+                    item["name"] = f"{item['name']} {copy_no + 1}"
+            menu.append(category)
+    return {**sample, "menu": menu}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--menu", default="output_menu.json")
+    parser.add_argument("--chars-per-chunk", type=int, default=24)
+    parser.add_argument("--chunk-ms", type=float, default=15)
+    parser.add_argument("--copies", type=int, default=8, help="repeat the sample's categories to make a long menu")
+    args = parser.parse_args()
+
+    menu = long_menu(args.menu, args.copies)
+    chunks = -(-len("```json\n" + json.dumps(menu, indent=2) + "\n```") // args.chars_per_chunk)
+    install_fakes(llm=FakeLLM(
+        [menu], latency=chunks * args.chunk_ms / 1000, jitter=0.0, unique=False, chunk_chars=args.chars_per_chunk
+    ))
+
+    start = time.perf_counter()
+    blocking = extract_menu_data("offline benchmark")
+    blocking_total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first, counts, menu = {}, {}, None
+    for event, data in parse_menu_stream(stream_menu_text("offline benchmark")):
+        first.setdefault(event, time.perf_counter() - start)
+        counts[event] = counts.get(event, 0) + 1
+        if event == "menu":
+            menu = data
+    streaming_total = time.perf_counter() - start
+
+    assert menu == blocking, "streamed menu differs from the blocking parse"
+    print(f"blocking parse       : {blocking_total * 1000:7.1f} ms until anything is returned")
+    for event in ("restaurant", "category", "item"):
+        print(f"first {event:<15}: {first[event] * 1000:7.1f} ms  ({counts[event]} total)")
+    print(f"streaming total      : {streaming_total * 1000:7.1f} ms")
+    print(f"time-to-first-item is {first['item'] / streaming_total:.0%} of total parse time")
+
+
+if __name__ == "__main__":
+    main()
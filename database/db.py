@@ -2,14 +2,90 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
+from utils.metrics import metrics
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Defaults to DATABASE_URL with an async driver (asyncpg for Postgres, aiosqlite for SQLite)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+# DB_ASYNC=true serves the hot read paths (/profile, /restaurants/{id}/menu) from AsyncSession
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
 
+# DB_ECHO=true logs every statement; the per-request query counts in /metrics are usually enough
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle before the server or a proxy (PgBouncer, RDS) drops idle connections
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
 
-engine = create_engine(DATABASE_URL, echo=True)
+
+def _engine_options(url: str) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if not url.startswith("sqlite"):  # SQLite pools are per-file/per-thread; sizing doesn't apply
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
+
+
+def _async_url(url: str) -> str:
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+metrics.instrument_engine(engine)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 Base = declarative_base()
+
+
+def get_db():
+    """The one sync session dependency; routes, auth and scripts all use this."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_async_engine = None
+_async_sessionmaker = None
+
+
+def get_async_sessionmaker():
+    # Built on first use, so the async driver is only imported when DB_ASYNC is on
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = ASYNC_DATABASE_URL or _async_url(DATABASE_URL)
+        _async_engine = create_async_engine(url, **_engine_options(url))
+        metrics.instrument_engine(_async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    """AsyncSession dependency; queries must be awaited and relationships eager-loaded."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
@@ -2,19 +2,37 @@ from datetime import datetime
 import uuid
 
 from sqlalchemy import (
-    Column, String, Integer, Float, Text, ForeignKey, Table, DateTime
+    Column, String, Integer, Float, Text, ForeignKey, Table, DateTime, JSON, Index, LargeBinary, func, literal_column
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import ARRAY, UUID as SQLAlchemyUUID
 from database.db import Base  # Your SQLAlchemy Base
 
+# Postgres arrays, stored as JSON lists on SQLite (offline benchmarks and local runs)
+StringArray = ARRAY(String).with_variant(JSON(), "sqlite")
 
-# Association tables for many-to-many relationships
+
+def menu_item_search_document(name, description):
+    """
+    Weighted tsvector over an item's name (A) and description (B).
+
+    Search queries must build it exactly like the index does for Postgres to use the
+    GIN index, hence literals rather than bound parameters.
+    """
+    english = literal_column("'english'")
+    return func.setweight(func.to_tsvector(english, func.coalesce(name, literal_column("''"))), literal_column("'A'")).op("||")(
+        func.setweight(func.to_tsvector(english, func.coalesce(description, literal_column("''"))), literal_column("'B'"))
+    )
+
+
+# Association tables for many-to-many relationships; created_at lets the recommender
+# (utils/recommender.py) read only the interactions since its last refresh
 user_viewed_restaurants = Table(
     "user_viewed_restaurants",
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
     Column("restaurant_id", ForeignKey("restaurants.id"), primary_key=True),
+    Column("created_at", DateTime, default=datetime.utcnow, index=True),
 )
 
 user_viewed_menu_items = Table(
@@ -22,6 +40,7 @@ user_viewed_menu_items = Table(
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
     Column("menu_item_id", ForeignKey("menu_items.id"), primary_key=True),
+    Column("created_at", DateTime, default=datetime.utcnow, index=True),
 )
 
 user_favorite_restaurants = Table(
@@ -29,6 +48,7 @@ user_favorite_restaurants = Table(
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
     Column("restaurant_id", ForeignKey("restaurants.id"), primary_key=True),
+    Column("created_at", DateTime, default=datetime.utcnow, index=True),
 )
 
 user_favorite_menu_items = Table(
@@ -36,6 +56,7 @@ user_favorite_menu_items = Table(
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
     Column("menu_item_id", ForeignKey("menu_items.id"), primary_key=True),
+    Column("created_at", DateTime, default=datetime.utcnow, index=True),
 )
 
 
@@ -63,6 +84,12 @@ class Restaurant(Base):
         cascade="all, delete-orphan"
     )
 
+    # Keyset pagination orders (utils/pagination.py); the id breaks ties
+    __table_args__ = (
+        Index("ix_restaurants_last_updated_id", last_updated, id),
+        Index("ix_restaurants_name_id", name, id),
+    )
+
 
 class Menu(Base):
     __tablename__ = "menus"
@@ -78,15 +105,20 @@ class Menu(Base):
     title = Column(String, nullable=False)  # e.g., "Dinner Menu", "Fall Specials"
     description = Column(Text, nullable=True)
     last_parsed = Column(DateTime, default=datetime.utcnow)
-    enriched = Column(String, default="pending")  # or a boolean or enum
+    enriched = Column(String, default="pending", index=True)  # pending -> in_progress -> done / failed
+    enrich_claimed_at = Column(DateTime, nullable=True)  # set by the enrichment worker, refreshed per batch
+    # Bumped by writes that change the menu response without a re-parse (images, enrichment
+    # status); part of the cached response's version, never shown to clients
+    cache_version = Column(Integer, default=0, server_default="0", nullable=False)
 
-    restaurant_id = Column(Integer, ForeignKey("restaurants.id"), nullable=False)
+    restaurant_id = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("restaurants.id"), nullable=False)
     restaurant = relationship("Restaurant", back_populates="menus")
 
     categories = relationship(
         "Category",
         back_populates="menu",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        order_by="Category.priority",
     )
 
 
@@ -105,10 +137,10 @@ class Category(Base):
     description = Column(Text, nullable=True)
     priority = Column(Integer, nullable=True)
 
-    restaurant_id = Column(Integer, ForeignKey("restaurants.id"), nullable=False)
+    restaurant_id = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("restaurants.id"), nullable=False)
     restaurant = relationship("Restaurant")  # Keep this if you still want a direct link
 
-    menu_id = Column(Integer, ForeignKey("menus.id"), nullable=False)
+    menu_id = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("menus.id"), nullable=False)
     menu = relationship("Menu", back_populates="categories")
 
     items = relationship(
@@ -117,6 +149,11 @@ class Category(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        Index("ix_categories_category_id", category, id),
+        Index("ix_categories_restaurant_category_id", restaurant_id, category, id),
+    )
+
 
 
 class MenuItem(Base):
@@ -134,13 +171,33 @@ class MenuItem(Base):
     slug = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
-    tags = Column(ARRAY(String), nullable=True)
+    tags = Column(StringArray, nullable=True)
     image_prompt = Column(Text, nullable=True)
-    images = Column(ARRAY(String), nullable=True)  # URLs of images
+    images = Column(StringArray, nullable=True)  # URLs of images
+    tag_bits = Column(LargeBinary, nullable=True)  # bitset of Term ids for tags and ingredients (utils/dietary.py)
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)  # insert, re-parse or tag_bits backfill
 
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    category_id = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("categories.id"), nullable=False)
     category = relationship("Category", back_populates="items")
 
+    # Postgres-only search indexes (utils/item_search.py), other databases search in-process;
+    # then keyset pagination orders (utils/pagination.py)
+    __table_args__ = (
+        Index("ix_menu_items_search", menu_item_search_document(name, description), postgresql_using="gin")
+        .ddl_if(dialect="postgresql"),
+        Index("ix_menu_items_tags", tags, postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_menu_items_name_id", name, id),
+        Index("ix_menu_items_category_name_id", category_id, name, id),
+    )
+
+
+class Term(Base):
+    """An interned tag or ingredient; its id is its bit position in MenuItem.tag_bits."""
+    __tablename__ = "terms"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, unique=True, nullable=False)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -157,9 +214,9 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
 
-    cuisine_preferences = Column(ARRAY(String), nullable=True)  # e.g., ['burgers', 'pizza']
-    dietary_restrictions = Column(ARRAY(String), nullable=True)  # e.g., ['gluten', 'nuts']
-    disliked_ingredients = Column(ARRAY(String), nullable=True)  # e.g., ['onion', 'garlic']
+    cuisine_preferences = Column(StringArray, nullable=True)  # e.g., ['burgers', 'pizza']
+    dietary_restrictions = Column(StringArray, nullable=True)  # e.g., ['gluten', 'nuts']
+    disliked_ingredients = Column(StringArray, nullable=True)  # e.g., ['onion', 'garlic']
 
     viewed_restaurants = relationship(
         "Restaurant",
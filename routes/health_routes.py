@@ -0,0 +1,22 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from utils.registry import models, WARMUP_MODELS
+
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+def healthz():
+    # Liveness only: the process is up and serving, whether or not models are loaded yet
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+def readyz():
+    ready = all(models.is_ready(name) for name in WARMUP_MODELS)
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": ready, "models": models.status()},
+    )
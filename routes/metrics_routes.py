@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import metrics
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format, scraped by the monitoring stack
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
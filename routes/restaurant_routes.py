@@ -1,84 +1,444 @@
 # Standard library
 import json
+import os
 import shutil
+import uuid
 from datetime import datetime
 from os import makedirs
-from typing import Any, Dict
+from typing import Any, Dict, List, Literal
 
 # Third-party packages
 from fastapi import (
     APIRouter, Depends, HTTPException, FastAPI, File, UploadFile, Body, Query
 )
-from fastapi.testclient import TestClient
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from fastapi.responses import JSONResponse
-from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi import Request, Response
 
 # Local modules
-from database.db import SessionLocal, Base, engine
+from database.db import SessionLocal, Base, engine, get_db, get_async_db, DB_ASYNC
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi import status
-from utils.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from utils.auth import verify_password, get_password_hash, create_access_token, authenticated_user
 from database.models import MenuItem, Restaurant, User, Menu, Category  # ORM models
-from schemas.menu_item import MenuItemCreate, MenuItemOut
-from schemas.restaurant import RestaurantCreate, RestaurantOut  # Pydantic schemas
+from schemas.menu_item import MenuItemCreate, MenuItemOut, MenuItemHitOut, ItemSearchOut
+from schemas.restaurant import RestaurantCreate, RestaurantOut, RestaurantMenuOut, RestaurantMatchOut  # Pydantic schemas
+from schemas.recommendation import RecommendationsOut
+from schemas.page import PageOut
 from utils import crud  # Add CRUD functions for User model
-from utils.ocr_extractor import run_ocr
 from schemas.user import UserCreate, UserOut
-from utils.grammar_ocr_food_parser import extract_menu_data
-from utils.imagesearch import enrich_menu_with_images, fetch_image_links
-from utils.parser import handle_parse_menu
-from utils.enricher import enrich_menu_item
+from schemas.job import JobOut
+from utils.parser import (
+    handle_parse_menu, parse_cache, parse_menu_pages, run_parse_menu_job, run_parse_menu_pages_job,
+    stream_parse_menu
+)
+from utils.helpers import expand_menu_pages
+from utils.uploads import read_upload, MAX_MENU_PAGES, MAX_MENU_PAGES_BYTES, MAX_UPLOAD_BYTES, UploadRoute
+from utils.jobs import job_queue
+from utils.llm_cache import llm_cache
+from utils.image_cache import image_cache
+from utils.enricher import (
+    enrich_menu_item, enrich_menu_items, enrich_restaurant_events, load_restaurant_items
+)
+from utils.menu_stream import sse_event
+from utils.restaurant_index import ensure_loaded
+from utils.item_search import SEARCH_MAX_PAGE_SIZE, SEARCH_PAGE_SIZE, search_menu_items
+from utils.dietary import compile_constraints, filter_menu, split_avoid
+from utils.recommender import get_recommendation_index, record_interaction
+from utils.similar_items import SIMILAR_LIMIT, SIMILAR_MAX_LIMIT, similar_items_index
+from utils.pagination import LISTINGS, MAX_PAGE_SIZE, PAGE_SIZE, keyset_page
+from utils.response_cache import cache_saved_bytes, etag_matches, menu_cache
+from schemas.enrich import MenuEnrichRequest, RestaurantEnrichRequest
 import traceback
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Set PARSE_MENU_SYNC=true to make /parse_menu/ block until the restaurant is stored
+PARSE_MENU_SYNC = os.getenv("PARSE_MENU_SYNC", "false").lower() == "true"
+
 
 router = APIRouter()
+# Upload endpoints keep files under MAX_UPLOAD_BYTES in memory instead of spooling them to disk
+upload_router = APIRouter(route_class=UploadRoute)
 
-# DB dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
-@router.post("/parse_menu/", response_model=RestaurantOut)
-async def parse_menu(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@upload_router.post("/parse_menu/", response_model=RestaurantOut, responses={202: {"model": JobOut}})
+async def parse_menu(
+    file: UploadFile = File(...),
+    sync: bool = Query(PARSE_MENU_SYNC),
+    db: Session = Depends(get_db)
+):
+    # Default: queue OCR + LLM + DB insert on the job pool and hand back a job id to poll
+    if not sync:
+        job = job_queue.submit("parse_menu", run_parse_menu_job, await read_upload(file), file.filename)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+
     # Step 1: Parse uploaded file to get restaurant + menu data dict
-    parsed_data = await handle_parse_menu(file)
-    restaurant_name = parsed_data.get("restaurant_name")
+    try:
+        parsed_data = await handle_parse_menu(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Step 2 + 3: Reuse the restaurant if it already exists by name, else create it with its menu
+    try:
+        restaurant = await run_in_threadpool(crud.save_parsed_restaurant, db, parsed_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"DB insert failed: {str(e)}")
+
+    # Step 4: Return the created restaurant object
+    return restaurant
+
+@upload_router.post("/parse_menu/stream/")
+async def parse_menu_stream(file: UploadFile = File(...)):
+    # Same pipeline as /parse_menu/, but dishes arrive as server-sent events while the model writes them
+    image_bytes = await read_upload(file)
+    return StreamingResponse(
+        stream_parse_menu(image_bytes, file.filename),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    if not restaurant_name:
-        raise HTTPException(status_code=400, detail="Missing restaurant name in parsed data")
+@upload_router.post("/parse_menu/pages/", response_model=RestaurantOut, responses={202: {"model": JobOut}})
+async def parse_menu_pages_route(
+    files: List[UploadFile] = File(...),
+    sync: bool = Query(PARSE_MENU_SYNC),
+    db: Session = Depends(get_db)
+):
+    # Several page images (or zip archives of them) for one restaurant, OCR'd together
+    try:
+        pages = expand_menu_pages(
+            [(await read_upload(f), f.filename) for f in files], max_page_bytes=MAX_UPLOAD_BYTES,
+            max_pages=MAX_MENU_PAGES, max_total_bytes=MAX_MENU_PAGES_BYTES,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not pages:
+        raise HTTPException(status_code=400, detail="No menu page images uploaded")
 
-    # Step 2: Check if restaurant already exists by name
-    existing_restaurant = db.query(Restaurant).filter(Restaurant.name == restaurant_name).first()
-    if existing_restaurant:
-        return existing_restaurant
+    if not sync:
+        job = job_queue.submit("parse_menu_pages", run_parse_menu_pages_job, pages)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job.to_dict())
+
+    try:
+        parsed_data = await run_in_threadpool(parse_menu_pages, pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Step 3: Create restaurant with menu in DB
     try:
-        restaurant = crud.create_restaurant_with_menu(db, parsed_data)
+        restaurant = await run_in_threadpool(crud.save_parsed_restaurant, db, parsed_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"DB insert failed: {str(e)}")
 
-    # Step 4: Return the created restaurant object
     return restaurant
 
+router.include_router(upload_router)
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 @router.post("/enrich_menu/")
 async def enrich_menu(
     parsed_menu: Dict[str, Any] = Body(...),
     slug: str = Query(...),
     images_per_item: int = Query(1)
 ):
-    return enrich_menu_item(parsed_menu, slug, images_per_item)
+    return await enrich_menu_item(parsed_menu, slug, images_per_item)
+
+@router.post("/enrich_menu/batch/")
+async def enrich_menu_batch(request: MenuEnrichRequest):
+    # Many slugs (or "all") in one round trip; lookups run concurrently under the search quota
+    return await enrich_menu_items(request.menu, request.slugs, request.images_per_item)
+
+if DB_ASYNC:
+    get_menu_db = get_async_db
+
+    async def menu_version(db: AsyncSession, restaurant_id) -> str | None:
+        return await crud.get_menu_version_async(db, restaurant_id)
+
+    async def load_restaurant_menu(db: AsyncSession, restaurant_id) -> Restaurant | None:
+        return await crud.get_restaurant_with_menu_async(db, restaurant_id)
+else:
+    get_menu_db = get_db
+
+    async def menu_version(db: Session, restaurant_id) -> str | None:
+        return await run_in_threadpool(crud.get_menu_version, db, restaurant_id)
+
+    async def load_restaurant_menu(db: Session, restaurant_id) -> Restaurant | None:
+        return await run_in_threadpool(crud.get_restaurant_with_menu, db, restaurant_id)
+
+async def cached_menu(request: Request, db, endpoint: str, restaurant_id: uuid.UUID,
+                      restrictions=(), disliked=(), prefer=(), private: bool = False) -> Response:
+    """
+    The (optionally filtered) menu as JSON with a strong ETag, answered 304 when the client's
+    If-None-Match still matches. Renders come from menu_cache while the restaurant's version
+    (one small query) is unchanged; only misses load and serialise the whole menu.
+    """
+    version = await menu_version(db, restaurant_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    # Filters are sets, so their order doesn't make a new variant
+    variant = json.dumps([sorted(set(restrictions)), sorted(set(disliked)), sorted(set(prefer))])
+    cached = menu_cache.get(endpoint, restaurant_id, version, variant)
+    if cached is None:
+        restaurant = await load_restaurant_menu(db, restaurant_id)
+        if restaurant is None:
+            raise HTTPException(status_code=404, detail="Restaurant not found")
+        if restrictions or disliked or prefer:
+            constraints = await run_in_threadpool(compile_constraints, restrictions, disliked, prefer)
+            menu = await run_in_threadpool(filter_menu, restaurant, constraints)
+        else:
+            menu = RestaurantMenuOut.model_validate(restaurant)
+        cached = menu_cache.put(restaurant_id, version, variant, menu.model_dump_json().encode())
+    else:
+        cache_saved_bytes.inc(len(cached.body), endpoint, "hit")
+
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        cache_saved_bytes.inc(len(cached.body), endpoint, "not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@router.get("/restaurants/match", response_model=List[RestaurantMatchOut])
+def match_restaurants(name: str, location: str | None = None, limit: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    """Ranked near-matches for a name, the same lookup ingest uses to avoid duplicates."""
+    return [
+        {"id": match.restaurant_id, "name": match.name, "location": match.location, "score": match.score}
+        for match in ensure_loaded(db).candidates(name, location, limit)
+    ]
+
+def _query_list(values: List[str]) -> List[str]:
+    # ?tags=a&tags=b and ?tags=a,b both work
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+def _page(db: Session, listing: str, sort, fields: List[str], cursor, limit: int, where=()) -> dict:
+    try:
+        items, next_cursor = keyset_page(db, LISTINGS[listing], sort, _query_list(fields), cursor, limit, where)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"items": items, "next_cursor": next_cursor}
+
+FIELDS_QUERY = Query([], description="repeat or comma-separate; defaults to a summary")
+
+@router.get("/restaurants", response_model=PageOut)
+def list_restaurants(
+    sort: Literal["recent", "name"] = "recent",
+    fields: List[str] = FIELDS_QUERY,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """Restaurants a page at a time, most recently updated or by name."""
+    return _page(db, "restaurants", sort, fields, cursor, limit)
+
+@router.get("/categories", response_model=PageOut)
+def list_categories(
+    restaurant_id: uuid.UUID | None = None,
+    fields: List[str] = FIELDS_QUERY,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    where = [Category.restaurant_id == restaurant_id] if restaurant_id else []
+    return _page(db, "categories", None, fields, cursor, limit, where)
+
+@router.get("/items", response_model=PageOut)
+def list_items(
+    category_id: uuid.UUID | None = None,
+    restaurant_id: uuid.UUID | None = None,
+    fields: List[str] = FIELDS_QUERY,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    where = []
+    if category_id:
+        where.append(MenuItem.category_id == category_id)
+    if restaurant_id:
+        where.append(MenuItem.category_id.in_(select(Category.id).where(Category.restaurant_id == restaurant_id)))
+    page = _page(db, "items", None, fields, cursor, limit, where)
+    for item in page["items"]:
+        if "slug" in item:
+            item["slug"] = crud.dish_slug(item["slug"])
+    return page
+
+@router.get("/restaurants/{restaurant_id}/menu", response_model=RestaurantMenuOut)
+async def get_restaurant_menu(
+    request: Request,
+    restaurant_id: uuid.UUID,
+    diet: List[str] = Query([], description="e.g. vegetarian, vegan; dishes must be tagged for it"),
+    avoid: List[str] = Query([], description="allergens or ingredients, e.g. nuts, gluten-free, onion"),
+    prefer: List[str] = Query([], description="cuisine tags to list first within each category"),
+    db=Depends(get_menu_db),
+):
+    allergens, ingredients = split_avoid(_query_list(avoid))
+    return await cached_menu(
+        request, db, "menu", restaurant_id, _query_list(diet) + allergens, ingredients, _query_list(prefer)
+    )
+
+@router.get("/restaurants/{restaurant_id}/menu/for_me", response_model=RestaurantMenuOut)
+async def get_restaurant_menu_for_me(
+    request: Request,
+    restaurant_id: uuid.UUID,
+    user: User = Depends(authenticated_user),
+    db=Depends(get_menu_db),
+):
+    """The menu filtered by the user's dietary restrictions and disliked ingredients, preferred cuisines first."""
+    # Cached by the filters, not the user: everyone with the same restrictions shares one render
+    return await cached_menu(
+        request, db, "menu_for_me", restaurant_id,
+        user.dietary_restrictions or [], user.disliked_ingredients or [], user.cuisine_preferences or [],
+        private=True,
+    )
+
+@router.post("/restaurants/{restaurant_id}/enrich")
+async def enrich_restaurant(
+    restaurant_id: uuid.UUID,
+    request: RestaurantEnrichRequest = Body(RestaurantEnrichRequest()),
+    stream: bool = Query(False),
+):
+    # Reads the menu from the DB, so the client only sends slugs; stream=true returns server-sent events
+    restaurant = await run_in_threadpool(load_restaurant_items, restaurant_id)
+    if restaurant is None:
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    events = enrich_restaurant_events(restaurant, request.slugs, request.images_per_item, request.refresh)
+
+    if stream:
+        async def sse():
+            async for event, data in events:
+                yield sse_event(event, data)
+        return StreamingResponse(
+            sse(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    items = []
+    async for event, data in events:
+        if event == "item":
+            items.append(data)
+        elif event == "done":
+            summary = data
+    return {"restaurant_id": str(restaurant_id), "items": items, **summary}
+
+@router.get("/search/items", response_model=ItemSearchOut)
+def search_items(
+    q: str | None = None,
+    tags: List[str] = Query([], description="repeat or comma-separate; items must carry all of them"),
+    max_price: float | None = Query(None, ge=0),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    tags = _query_list(tags)
+    if not (q and q.strip()) and not tags:
+        raise HTTPException(status_code=422, detail="Pass q, tags or both")
+    hits, has_more = search_menu_items(db, q, tags, max_price, offset, limit)
+    return {
+        "items": [
+            {**MenuItemOut.model_validate(item).model_dump(), "restaurant_id": restaurant_id, "score": score}
+            for item, restaurant_id, score in hits
+        ],
+        "next_offset": offset + limit if has_more else None,
+    }
+
+@router.get("/items/{item_id}/similar", response_model=List[MenuItemHitOut])
+def get_similar_items(
+    item_id: uuid.UUID,
+    limit: int = Query(SIMILAR_LIMIT, ge=1, le=SIMILAR_MAX_LIMIT),
+    same_restaurant: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Dishes like this one, from other restaurants unless same_restaurant is set."""
+    found = db.query(MenuItem, Category.restaurant_id).join(Category).filter(MenuItem.id == item_id).first()
+    if not found:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    item, restaurant_id = found
+    row = {field: getattr(item, field) for field in ("id", "name", "description", "tags", "image_prompt")}
+    similar = similar_items_index.similar(row, limit, None if same_restaurant else restaurant_id)
+    if similar is None:
+        raise HTTPException(status_code=503, detail="Similar-dishes index not built; run python -m utils.similar_items build")
+    # Rows of dishes deleted since the last build are still in the index
+    items = {i.id: i for i in db.query(MenuItem).filter(MenuItem.id.in_([s.id for s in similar]))}
+    return [
+        {**MenuItemOut.model_validate(items[s.id]).model_dump(), "restaurant_id": s.restaurant_id, "score": s.score}
+        for s in similar if s.id in items
+    ]
+
+@router.post("/menu_items/{item_id}/{action}", status_code=204)
+def record_menu_item_interaction(
+    item_id: uuid.UUID,
+    action: Literal["view", "favorite"],
+    user: User = Depends(authenticated_user),
+    db: Session = Depends(get_db),
+):
+    if not crud.add_interaction(db, user.id, action, "item", item_id):
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    record_interaction(user.id, action, "item", item_id)
+    return Response(status_code=204)
+
+@router.post("/restaurants/{restaurant_id}/{action}", status_code=204)
+def record_restaurant_interaction(
+    restaurant_id: uuid.UUID,
+    action: Literal["view", "favorite"],
+    user: User = Depends(authenticated_user),
+    db: Session = Depends(get_db),
+):
+    if not crud.add_interaction(db, user.id, action, "restaurant", restaurant_id):
+        raise HTTPException(status_code=404, detail="Restaurant not found")
+    record_interaction(user.id, action, "restaurant", restaurant_id)
+    return Response(status_code=204)
+
+@router.get("/recommendations", response_model=RecommendationsOut)
+def get_recommendations(
+    kind: Literal["all", "dishes", "restaurants"] = "all",
+    limit: int = Query(20, ge=1, le=100),
+    user: User = Depends(authenticated_user),
+    db: Session = Depends(get_db),
+):
+    """Dishes and restaurants for the user from what similar users liked and their own tastes."""
+    index = get_recommendation_index(db)
+    preferred = compile_constraints(prefer=user.cuisine_preferences or []).prefer
+    result = {"dishes": [], "restaurants": []}
+
+    if kind in ("all", "dishes"):
+        dishes = index.recommend_dishes(user.id, preferred, limit)
+        items = {item.id: item for item in db.query(MenuItem).filter(MenuItem.id.in_([d.id for d in dishes]))}
+        result["dishes"] = [
+            {**MenuItemOut.model_validate(items[d.id]).model_dump(), "restaurant_id": d.restaurant_id, "score": d.score}
+            for d in dishes if d.id in items
+        ]
+    if kind in ("all", "restaurants"):
+        picks = index.recommend_restaurants(user.id, preferred, limit)
+        restaurants = {r.id: r for r in db.query(Restaurant).filter(Restaurant.id.in_([p.id for p in picks]))}
+        result["restaurants"] = [
+            {**RestaurantOut.model_validate(restaurants[p.id]).model_dump(), "score": p.score}
+            for p in picks if p.id in restaurants
+        ]
+    return result
+
+@router.get("/cache/stats")
+def cache_stats():
+    return {
+        "parse_results": parse_cache.stats(),
+        "llm_responses": llm_cache.stats(),
+        "image_search": image_cache.stats(),
+        "menu_responses": menu_cache.stats(),
+    }
 
 
 
@@ -119,5 +479,5 @@ def logout():
 
 
 @router.get("/profile", response_model=UserOut)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(authenticated_user)):
     return current_user
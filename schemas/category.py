@@ -0,0 +1,26 @@
+import uuid
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from schemas.menu_item import MenuItemOut
+
+class CategoryOut(BaseModel):
+    id: uuid.UUID
+    category: str
+    description: Optional[str]
+    priority: Optional[int]
+    items: List[MenuItemOut] = []
+
+    class Config:
+        from_attributes = True
+
+class MenuOut(BaseModel):
+    id: uuid.UUID
+    title: str
+    description: Optional[str]
+    last_parsed: Optional[datetime]
+    enriched: Optional[str]
+    categories: List[CategoryOut] = []
+
+    class Config:
+        from_attributes = True
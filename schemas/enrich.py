@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Union
+
+class EnrichRequest(BaseModel):
+    slugs: Union[List[str], Literal["all"]] = "all"
+    images_per_item: int = 1
+
+class MenuEnrichRequest(EnrichRequest):
+    menu: Dict[str, Any]
+
+class RestaurantEnrichRequest(EnrichRequest):
+    refresh: bool = False  # look up items that already have images too
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    stage: Optional[str]
+    timings: Dict[str, float] = {}
+    created_at: datetime
+    finished_at: Optional[datetime]
+    result: Optional[Any]
+    error: Optional[str]
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+import uuid
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
 
+from utils.menu_chunker import dish_slug
+
 class MenuItemBase(BaseModel):
     id: str
     name: str
@@ -15,5 +18,27 @@ class MenuItemCreate(MenuItemBase):
     pass
 
 class MenuItemOut(MenuItemBase):
+    id: uuid.UUID
+
+    @field_validator("tags", "images", mode="before")
+    @classmethod
+    def _none_as_empty(cls, value):
+        # NULL array columns come back as None
+        return value or []
+
+    @field_validator("slug", mode="before")
+    @classmethod
+    def _without_restaurant_prefix(cls, value):
+        # Stored slugs carry their restaurant's id; clients get the parsed slug back
+        return dish_slug(value)
+
     class Config:
         from_attributes = True  # Pydantic v2 ORM compatibility
+
+class MenuItemHitOut(MenuItemOut):
+    restaurant_id: uuid.UUID
+    score: float
+
+class ItemSearchOut(BaseModel):
+    items: List[MenuItemHitOut]
+    next_offset: Optional[int] = None  # pass back as ?offset= for the next page; None on the last
@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class PageOut(BaseModel):
+    items: List[Dict[str, Any]]  # just the ?fields= asked for
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page; None on the last
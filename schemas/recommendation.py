@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import List
+from schemas.menu_item import MenuItemHitOut
+from schemas.restaurant import RestaurantHitOut
+
+class RecommendationsOut(BaseModel):
+    dishes: List[MenuItemHitOut] = []
+    restaurants: List[RestaurantHitOut] = []
@@ -1,7 +1,8 @@
 import uuid
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from schemas.category import MenuOut
 
 class RestaurantCreate(BaseModel):
     name: str
@@ -22,3 +23,15 @@ class RestaurantOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+class RestaurantMenuOut(RestaurantOut):
+    menus: List[MenuOut] = []
+
+class RestaurantMatchOut(BaseModel):
+    id: uuid.UUID
+    name: str
+    location: Optional[str]
+    score: float
+
+class RestaurantHitOut(RestaurantOut):
+    score: float
@@ -0,0 +1,46 @@
+"""Points the app at a throwaway SQLite database and cache directory before anything imports it."""
+import json
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="prevu-tests-")
+# Assigned, not defaulted: the db fixture drops every table, so it must never reach a
+# DATABASE_URL exported for a dev or production database
+TEST_DATABASE_URL = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("WARMUP_MODELS", "")
+os.environ.setdefault("SIMILAR_INDEX_PATH", os.path.join(_scratch, "similar_items"))
+os.environ.setdefault("RESPONSE_CACHE_SHARED_PATH", "")
+os.environ.setdefault("PARSE_CACHE_PATH", os.path.join(_scratch, "parse_results.sqlite3"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_scratch, "llm_responses.sqlite3"))
+
+
+@pytest.fixture
+def db():
+    from database.db import Base, SessionLocal, engine
+    import database.models  # noqa: F401  (registers the tables)
+    from utils import dietary
+    from utils.item_search import item_search_index
+    from utils.restaurant_index import restaurant_index
+
+    # The in-process indexes and term ids reload from the fresh tables on first use
+    restaurant_index.loaded = item_search_index.loaded = False
+    dietary._term_ids.clear()
+    if engine.url.render_as_string(hide_password=False) != TEST_DATABASE_URL:
+        pytest.exit(f"Refusing to drop tables on {engine.url!r}; tests only reset their own SQLite file")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def sample_menu():
+    with open(os.path.join(os.path.dirname(__file__), os.pardir, "output_menu.json")) as f:
+        return json.load(f)
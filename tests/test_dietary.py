@@ -0,0 +1,57 @@
+"""Dietary filtering over tag_bits: allergens inside compound words, and what may vouch for a dish."""
+import numpy as np
+import pytest
+
+from utils.dietary import bit_matrix, compile_constraints, evaluate, set_tag_bits, split_avoid
+
+
+def _safe(db, restrictions, dishes) -> list:
+    rows = [{"name": name, "description": description, "tags": tags} for name, description, tags in dishes]
+    set_tag_bits(db, rows)
+    db.commit()
+    safe, _ = evaluate(
+        bit_matrix([row["tag_bits"] for row in rows]), np.ones(len(rows), dtype=bool), compile_constraints(restrictions)
+    )
+    return [row["name"] for row, ok in zip(rows, safe.tolist()) if ok]
+
+
+@pytest.mark.parametrize("restriction,name,description", [
+    ("nuts", "Almond-Crusted Trout", "with peanut-lime sauce"),
+    ("egg", "Egg-Fried Rice", None),
+    ("dairy", "Bagel", "with cream-cheese"),
+])
+def test_allergen_inside_a_hyphenated_word_is_caught(db, restriction, name, description):
+    assert _safe(db, [restriction], [(name, description, []), ("Green Salad", None, [])]) == ["Green Salad"]
+
+
+def test_only_tags_vouch_for_a_dish(db):
+    dishes = [
+        ("Penne Arrabbiata", "ask for our gluten-free option", ["italian"]),
+        ("Penne Arrabbiata GF", "made with rice pasta", ["italian", "gluten-free"]),
+        ("Cheese Plate", "vegan cheeses available", []),
+        ("Cashew Cheese Plate", None, ["vegan"]),
+    ]
+    assert _safe(db, ["gluten"], dishes[:2]) == ["Penne Arrabbiata GF"]
+    assert _safe(db, ["dairy"], dishes[2:]) == ["Cashew Cheese Plate"]
+
+
+def test_split_avoid_keeps_allergens_and_sends_the_rest_to_ingredients():
+    assert split_avoid(["nuts", "Gluten-Free", "lactose", "green peppers", "onion"]) == (
+        ["nuts", "Gluten-Free", "lactose"], ["green peppers", "onion"],
+    )
+
+
+def test_menu_avoid_filters_multi_word_ingredients(db, sample_menu):
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from utils import crud
+
+    restaurant = crud.save_parsed_restaurant(db, sample_menu)
+    response = TestClient(app).get(
+        f"/restaurants/{restaurant.id}/menu", params=[("avoid", "cherry tomatoes"), ("avoid", "wild mushrooms")]
+    )
+
+    assert response.status_code == 200
+    names = [item["name"] for menu in response.json()["menus"] for c in menu["categories"] for item in c["items"]]
+    assert names == ["Lasagna"]
@@ -0,0 +1,48 @@
+"""Enriching a stored restaurant saves images as they arrive and tracks Menu.enriched like the worker."""
+import asyncio
+import copy
+
+import pytest
+
+from database.models import Menu
+from utils import crud, enricher
+
+
+class FakeClient:
+    async def fetch_dish_images(self, name, description, restaurant, num_images):
+        return [f"https://example.com/{name.lower().replace(' ', '-')}.jpg"]
+
+
+@pytest.fixture
+def restaurant(db, sample_menu, monkeypatch):
+    monkeypatch.setattr(enricher, "get_image_search_client", FakeClient)
+    return crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+
+
+def _images(db, restaurant_id) -> dict:
+    db.expire_all()
+    return {item.name: item.images for item in crud.get_restaurant_menu_items(db, restaurant_id)}
+
+
+def test_enriching_everything_saves_in_batches_and_marks_the_menu_done(db, restaurant):
+    async def run():
+        loaded = enricher.load_restaurant_items(restaurant.id)
+        return [event async for event, _ in enricher.enrich_restaurant_events(loaded, batch_size=2)]
+
+    assert asyncio.run(run())[-1] == "done"
+    assert all(_images(db, restaurant.id).values())
+    assert {menu.enriched for menu in db.query(Menu).filter(Menu.restaurant_id == restaurant.id)} == {"done"}
+
+
+def test_a_client_leaving_early_keeps_the_images_already_fetched(db, restaurant):
+    async def run():
+        events = enricher.enrich_restaurant_events(enricher.load_restaurant_items(restaurant.id), batch_size=100)
+        async for event, _ in events:
+            if event == "item":
+                break
+        await events.aclose()
+
+    asyncio.run(run())
+    assert all(_images(db, restaurant.id).values())
+    # Left for the worker to finish
+    assert {menu.enriched for menu in db.query(Menu).filter(Menu.restaurant_id == restaurant.id)} == {"pending"}
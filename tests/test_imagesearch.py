@@ -0,0 +1,45 @@
+"""Custom Search retries stay bounded: Retry-After is capped and each lookup has a deadline."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from utils import imagesearch
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setattr(imagesearch, "CSE_ID", "cx")
+    monkeypatch.setattr(imagesearch, "API_KEY", "key")
+
+
+def _client(handler, **options) -> imagesearch.ImageSearchClient:
+    client = imagesearch.ImageSearchClient(queries_per_minute=60_000, burst=100, **options)
+    client.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_retry_after_is_capped():
+    responses = iter([httpx.Response(429, headers={"Retry-After": "3600"})])
+
+    def handler(request):
+        return next(responses, httpx.Response(200, json={"items": [{"link": "https://example.com/a.jpg"}]}))
+
+    async def run():
+        async with _client(handler, max_backoff=0.05) as client:
+            return await client.fetch_image_links("lasagna")
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == ["https://example.com/a.jpg"]
+    assert time.perf_counter() - started < 5
+
+
+def test_a_lookup_past_its_deadline_gets_no_images():
+    async def run():
+        async with _client(lambda request: httpx.Response(503), max_retries=100, backoff=0.05, item_timeout=0.3) as client:
+            return await client.fetch_image_links("lasagna")
+
+    started = time.perf_counter()
+    assert asyncio.run(run()) == []
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,13 @@
+"""Startup stays within the import-time budget and leaves the heavy backends to utils.registry."""
+
+import os
+
+from benchmarks.import_time import measure, summarize
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "2500"))
+
+
+def test_app_import_within_budget():
+    total_ms, eager = summarize(measure("app"), "app")
+    assert not eager, f"heavy backends imported at startup: {', '.join(eager)}"
+    assert total_ms <= IMPORT_BUDGET_MS, f"importing app took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
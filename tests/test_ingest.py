@@ -0,0 +1,135 @@
+"""Storing parsed menus: dish upserts stay within one restaurant."""
+import copy
+
+from utils import crud
+
+
+def _slugs(db, restaurant_id) -> list:
+    return sorted(crud.dish_slug(item.slug) for item in crud.get_restaurant_menu_items(db, restaurant_id))
+
+
+def test_another_restaurant_with_the_same_dishes_gets_its_own_rows(db, sample_menu):
+    first = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    other_menu = {**copy.deepcopy(sample_menu), "restaurant_name": "Completely Different Osteria"}
+    second = crud.save_parsed_restaurant(db, other_menu)
+
+    assert first.id != second.id
+    assert _slugs(db, first.id) == _slugs(db, second.id) == ["lasagna", "risotto-ai-funghi", "tagliata-di-manzo"]
+
+
+def test_reparse_updates_the_restaurants_own_dishes_in_place(db, sample_menu):
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    items = crud.get_restaurant_menu_items(db, restaurant.id)
+    crud.set_menu_item_images(db, {items[0].id: ["https://example.com/a.jpg"]})
+
+    crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    db.expire_all()
+    reparsed = {item.id: item.images for item in crud.get_restaurant_menu_items(db, restaurant.id)}
+    assert set(reparsed) == {item.id for item in items}
+    assert reparsed[items[0].id] == ["https://example.com/a.jpg"]
+
+
+def test_repeated_slugs_in_one_menu_are_all_kept(db, sample_menu):
+    menu = copy.deepcopy(sample_menu)
+    dinner = copy.deepcopy(menu["menu"][0])
+    menu["menu"].append({**dinner, "category": "Dinner"})
+    restaurant = crud.save_parsed_restaurant(db, menu)
+
+    assert _slugs(db, restaurant.id) == [
+        "lasagna", "lasagna-2", "risotto-ai-funghi", "risotto-ai-funghi-2", "tagliata-di-manzo", "tagliata-di-manzo-2",
+    ]
+
+
+def test_similar_name_without_location_is_a_new_restaurant(db, sample_menu):
+    thai_kitchen = crud.save_parsed_restaurant(db, {**copy.deepcopy(sample_menu), "restaurant_name": "Thai Kitchen"})
+    for name, location in (("Thai House", None), ("The Thai Bistro", "500 Elm St, Boston")):
+        other = crud.save_parsed_restaurant(
+            db, {**copy.deepcopy(sample_menu), "restaurant_name": name, "location": location}
+        )
+        assert other.id != thai_kitchen.id
+    assert len(_slugs(db, thai_kitchen.id)) == 3
+
+
+def test_fuzzy_match_adds_a_menu_without_replacing(db, sample_menu):
+    located = {**copy.deepcopy(sample_menu), "restaurant_name": "Bella Roma Rossi Trattoria", "location": "12 Main St, Austin, TX"}
+    restaurant = crud.save_parsed_restaurant(db, located)
+    extra = {**located, "restaurant_name": "Bella Roma Rossi", "menu": [
+        {"category": "Desserts", "priority": 2, "items": [{"name": "Tiramisu", "slug": "tiramisu", "price": 8}]},
+    ]}
+
+    assert crud.save_parsed_restaurant(db, extra).id == restaurant.id
+    assert _slugs(db, restaurant.id) == ["lasagna", "risotto-ai-funghi", "tagliata-di-manzo", "tiramisu"]
+
+
+def test_string_prices_are_stored_and_indexed_as_numbers(db, sample_menu):
+    from utils.item_search import search_menu_items
+
+    search_menu_items(db, "soup")  # loads the in-process index, which ingest then updates
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+
+    assert sorted(item.price for item in crud.get_restaurant_menu_items(db, restaurant.id)) == [18.0, 22.0, 26.0]
+    matches, _ = search_menu_items(db, "lasagna", max_price=20)
+    assert [item.name for item, _, _ in matches] == ["Lasagna"]
+
+
+def test_a_failing_index_hook_does_not_skip_the_others(db, sample_menu, monkeypatch):
+    from utils.response_cache import menu_cache
+
+    def broken(*args):
+        raise RuntimeError("index unavailable")
+
+    invalidated = []
+    monkeypatch.setattr(crud, "index_menu_items", broken)
+    monkeypatch.setattr(menu_cache, "invalidate", invalidated.extend)
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+
+    assert invalidated == [restaurant.id]
+
+
+def test_dishes_taken_by_an_upsert_stale_their_old_restaurants_menu(db, sample_menu, monkeypatch):
+    from utils.response_cache import menu_cache
+
+    # Rows stored before slugs were scoped ("lasagna") still clash across restaurants
+    monkeypatch.setattr(crud, "scoped_slug", lambda restaurant_id, slug: slug)
+    first = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    version = crud.get_menu_version(db, first.id)
+
+    invalidated = []
+    monkeypatch.setattr(menu_cache, "invalidate", invalidated.extend)
+    second = crud.save_parsed_restaurant(
+        db, {**copy.deepcopy(sample_menu), "restaurant_name": "Completely Different Osteria"}
+    )
+
+    assert _slugs(db, first.id) == []
+    assert crud.get_menu_version(db, first.id) != version
+    assert set(invalidated) == {first.id, second.id}
+
+
+def test_image_and_enrichment_writes_change_the_version_but_not_last_updated(db, sample_menu):
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    last_updated, version = restaurant.last_updated, crud.get_menu_version(db, restaurant.id)
+    items = crud.get_restaurant_menu_items(db, restaurant.id)
+
+    crud.set_menu_item_images(db, {items[0].id: ["https://example.com/a.jpg"]})
+    after_images = crud.get_menu_version(db, restaurant.id)
+    crud.set_menu_enrichment(db, restaurant.menus[0].id, "done")
+    db.expire_all()
+
+    assert len({version, after_images, crud.get_menu_version(db, restaurant.id)}) == 3
+    assert db.get(type(restaurant), restaurant.id).last_updated == last_updated
+
+
+def test_responses_carry_the_parsed_slugs(db, sample_menu):
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    client = TestClient(app)
+    menu = client.get(f"/restaurants/{restaurant.id}/menu").json()
+    listed = client.get("/items", params={"restaurant_id": str(restaurant.id), "fields": "slug"}).json()
+
+    served = [item["slug"] for m in menu["menus"] for c in m["categories"] for item in c["items"]]
+    assert sorted(served) == sorted(item["slug"] for item in listed["items"]) == [
+        "lasagna", "risotto-ai-funghi", "tagliata-di-manzo",
+    ]
@@ -0,0 +1,70 @@
+"""Which items /search/items returns, in what order, from the in-process index and the Postgres query alike."""
+from sqlalchemy.dialects import postgresql
+
+from utils.item_search import ItemSearchIndex, _postgres_search, normalize_tags
+
+
+def _index() -> ItemSearchIndex:
+    index = ItemSearchIndex()
+    index.load([
+        {"slug": "al-pastor", "name": "Tacos al Pastor", "description": "pork, pineapple", "tags": ["Mexican", "Tacos"], "price": 12.0},
+        {"slug": "fish-taco", "name": "Baja Fish Taco", "description": "battered cod, slaw", "tags": ["mexican", "seafood"], "price": 14.0},
+        {"slug": "taco-salad", "name": "Salad", "description": "taco seasoning, beans", "tags": ["Gluten Free"], "price": 9.0},
+        {"slug": "carnitas", "name": "Carnitas Plate", "description": "slow-cooked pork", "tags": ["mexican", "gluten_free"], "price": 16.0},
+        {"slug": "pad-thai", "name": "Pad Thai", "description": "rice noodles, peanuts", "tags": ["thai"], "price": 13.0},
+    ])
+    return index
+
+
+def _slugs(page) -> list:
+    return [slug for slug, _ in page]
+
+
+def test_name_hits_outrank_description_hits():
+    page, has_more = _index().search("tacos")
+    assert _slugs(page) == ["al-pastor", "fish-taco", "taco-salad"]
+    assert not has_more
+
+
+def test_a_query_word_finds_its_tag_as_stored():
+    # "tacos" is stored as typed (lowercased), and the query matches it stemmed or not
+    assert normalize_tags(["Tacos", " Gluten Free", "gluten_free", ""]) == ["tacos", "gluten-free"]
+    assert "carnitas" in _slugs(_index().search("mexican")[0])
+    page, _ = _index().search("pastor tacos")
+    assert _slugs(page)[0] == "al-pastor"
+
+
+def test_tags_filter_requires_every_tag():
+    index = _index()
+    assert _slugs(index.search(None, tags=["Mexican", "Gluten Free"])[0]) == ["carnitas"]
+    assert _slugs(index.search("pork", tags=["gluten-free"])[0]) == ["carnitas"]
+    assert index.search("pork", tags=["thai"]) == ([], False)
+
+
+def test_price_filter():
+    assert _slugs(_index().search("mexican", max_price=13)[0]) == ["al-pastor"]
+
+
+def test_offset_and_has_more_walk_the_ranking():
+    index = _index()
+    full, _ = index.search("mexican", limit=10)
+    pages, offset, has_more = [], 0, True
+    while has_more:
+        page, has_more = index.search("mexican", offset=offset, limit=2)
+        pages += page
+        offset += 2
+    assert pages == full and len(full) == 3
+    assert index.search("mexican", offset=3) == ([], False)
+
+
+def test_postgres_query_uses_the_same_terms():
+    class Recorder:
+        def execute(self, statement):
+            self.sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            return []
+
+    db = Recorder()
+    _postgres_search(db, "The Tacos", ["Gluten Free"], None, 0, 20)
+    assert "ARRAY['tacos', 'taco']" in db.sql
+    assert "ARRAY['gluten-free']" in db.sql
+    assert "plainto_tsquery('english', 'tacos')" in db.sql
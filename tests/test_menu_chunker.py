@@ -0,0 +1,50 @@
+"""Chunked menu parsing: failed chunks, the single-chunk path and per-category dedupe."""
+import pytest
+
+from utils.menu_chunker import extract_menu_data_chunked, merge_partial_menus
+
+LINES = ["TRATTORIA ESEMPIO", "APPETIZERS", "Bruschetta", "$8.95", "DESSERTS", "Tiramisu", "$7.50"]
+
+
+def _partial(category: str, *names: str) -> dict:
+    return {"restaurant_name": "Trattoria Esempio",
+            "menu": [{"category": category, "priority": 1, "items": [{"name": n, "price": "8"} for n in names]}]}
+
+
+def test_failed_chunk_is_retried_once():
+    calls = []
+
+    def flaky(text: str) -> dict:
+        calls.append(text)
+        return {} if len(calls) == 1 else _partial("Appetizers", "Bruschetta")
+
+    menu = extract_menu_data_chunked(LINES, extract_fn=flaky, max_chars=10_000)
+    assert len(calls) == 2
+    assert [item["slug"] for item in menu["menu"][0]["items"]] == ["bruschetta"]
+
+
+def test_chunk_that_keeps_failing_fails_the_parse():
+    def failing_section(text: str) -> dict:
+        return {} if "DESSERTS" in text else _partial("Appetizers", "Bruschetta")
+
+    with pytest.raises(ValueError, match="section 2 of 2"):
+        extract_menu_data_chunked(LINES, extract_fn=failing_section, max_chars=40, max_workers=2)
+
+
+def test_single_chunk_is_normalised_like_merged_ones():
+    menu = extract_menu_data_chunked(LINES, extract_fn=lambda text: _partial("Small Plates", "Fried Calamari"),
+                                     max_chars=10_000)
+    item = menu["menu"][0]["items"][0]
+    assert (item["slug"], item["id"], item["images"]) == ("fried-calamari", "small_plates_fried_calamari", [])
+    assert menu["currency"] == "USD"
+
+
+def test_same_dish_in_two_sections_is_kept():
+    menu = merge_partial_menus([
+        _partial("Lunch", "Margherita", "Caesar Salad"),
+        _partial("Dinner", "Margherita"),
+        _partial("Lunch", "Margherita"),  # chunk overlap repeats a dish in the same section
+    ])
+    assert [[item["id"] for item in category["items"]] for category in menu["menu"]] == [
+        ["lunch_margherita", "lunch_caesar_salad"], ["dinner_margherita"],
+    ]
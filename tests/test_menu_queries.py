@@ -0,0 +1,35 @@
+"""GET /restaurants/{id}/menu issues a fixed number of queries, however big the menu is."""
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.bulk_ingest import synthetic_menu
+
+# One version query (utils.response_cache), then restaurant -> menus -> categories -> items via selectinload
+UNCACHED_MENU_QUERIES = 5
+# The version query alone, answered from the cached body
+CACHED_MENU_QUERIES = 1
+
+
+@pytest.mark.parametrize("categories,per_category", [(1, 1), (5, 10), (20, 25)])
+def test_menu_query_count_is_fixed(db, categories, per_category):
+    from app import app
+    from utils.crud import create_restaurant_with_menu
+    from utils.metrics import metrics
+
+    restaurant_id = create_restaurant_with_menu(
+        db, synthetic_menu(categories * per_category, f"q{categories}x{per_category}", per_category)
+    ).id
+
+    async def fetch() -> tuple:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            before = metrics.db_queries.value()
+            response = await client.get(f"/restaurants/{restaurant_id}/menu")
+            response.raise_for_status()
+            return response.json(), metrics.db_queries.value() - before
+
+    body, uncached = asyncio.run(fetch())
+    _, cached = asyncio.run(fetch())
+    assert sum(len(c["items"]) for m in body["menus"] for c in m["categories"]) == categories * per_category
+    assert (uncached, cached) == (UNCACHED_MENU_QUERIES, CACHED_MENU_QUERIES)
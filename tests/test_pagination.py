@@ -0,0 +1,87 @@
+"""Keyset pages: cursors round-trip, bad ones are a 400, and ties on the sort column neither repeat nor skip rows."""
+import base64
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from database.models import Restaurant
+from utils.pagination import LISTINGS, decode_cursor, encode_cursor
+
+RESTAURANT_KEYS = [Restaurant.__table__.c.last_updated, Restaurant.__table__.c.id]
+
+
+def _cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _client():
+    from fastapi.testclient import TestClient
+
+    from app import app
+    return TestClient(app)
+
+
+def test_cursor_round_trips():
+    key = [datetime(2024, 5, 1, 12, 30, 0, 123456), uuid.uuid4()]
+    assert decode_cursor(encode_cursor("recent", key), "recent", RESTAURANT_KEYS) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    "not-base64-json",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    _cursor(["name", ["2024-05-01T12:30:00", str(uuid.UUID(int=1))]]),    # another ?sort=
+    _cursor(["recent", ["2024-05-01T12:30:00"]]),                          # too few values
+    _cursor(["recent", "2024-05-01T12:30:00"]),
+    _cursor(["recent", [None, str(uuid.UUID(int=1))]]),
+    _cursor(["recent", ["yesterday", str(uuid.UUID(int=1))]]),
+    _cursor(["recent", ["2024-05-01T12:30:00+02:00", str(uuid.UUID(int=1))]]),
+    _cursor(["recent", ["2024-05-01T12:30:00", 7]]),
+    _cursor(["recent", ["2024-05-01T12:30:00", "not-a-uuid"]]),
+])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor, "recent", RESTAURANT_KEYS)
+
+
+@pytest.mark.parametrize("sort,key", [("recent", ["2024-05-01T12:30:00", 7]), ("name", [{"a": 1}, str(uuid.UUID(int=1))]),
+                                      ("name", [["Pho"], str(uuid.UUID(int=1))])])
+def test_tampered_cursor_is_a_400(db, sort, key):
+    response = _client().get("/restaurants", params={"sort": sort, "cursor": _cursor([sort, key])})
+    assert (response.status_code, response.json()) == (400, {"detail": "Invalid cursor"})
+
+
+def _walk(client, sort: str, limit: int) -> list:
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get("/restaurants", params={"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [item["id"] for item in response.json()["items"]]
+        cursor, pages = response.json()["next_cursor"], pages + 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("limit", [1, 4, 5, 23])
+def test_pages_across_equal_sort_values_have_no_duplicates_or_gaps(db, limit):
+    # One timestamp for everyone and three names between them: every page boundary falls inside a tie
+    when = datetime(2024, 5, 1, 12, 30)
+    restaurants = [Restaurant(id=uuid.uuid4(), name=f"Trattoria {i % 3}", last_updated=when) for i in range(23)]
+    db.add_all(restaurants)
+    db.commit()
+    client = _client()
+
+    recent, pages = _walk(client, "recent", limit)
+    assert recent == [str(r.id) for r in sorted(restaurants, key=lambda r: r.id, reverse=True)]
+    assert pages == -(-23 // limit)
+    by_name, _ = _walk(client, "name", limit)
+    assert by_name == [str(r.id) for r in sorted(restaurants, key=lambda r: (r.name, r.id))]
+
+
+def test_listings_sort_on_a_unique_key():
+    # Ties are only broken if every sort ends in the primary key
+    for listing in LISTINGS.values():
+        for keys, _ in listing.sorts.values():
+            assert keys[-1] == "id"
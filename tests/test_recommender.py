@@ -0,0 +1,82 @@
+"""The recommendation index picks up other processes' writes off the request path."""
+import copy
+import time
+
+import pytest
+
+from utils import crud, recommender
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(recommender, "_index", recommender.RecommendationIndex())
+
+
+def _wait_for_refresh():
+    for _ in range(200):
+        if not recommender._index_lock.locked():
+            return
+        time.sleep(0.01)
+    raise AssertionError("background refresh did not finish")
+
+
+def test_stale_index_refreshes_in_the_background(db, sample_menu, fresh_index, monkeypatch):
+    crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    index = recommender.get_recommendation_index(db)
+    assert len(index) == 3
+
+    # Another worker's ingest: this process's hooks never see it
+    monkeypatch.setattr(recommender, "index_new_items", lambda *args: None)
+    monkeypatch.setattr(crud, "index_new_items", lambda *args: None)
+    crud.save_parsed_restaurant(db, {**copy.deepcopy(sample_menu), "restaurant_name": "Completely Different Osteria"})
+    index.refreshed_at -= recommender.RECOMMEND_REFRESH_SECONDS + 1
+
+    assert recommender.get_recommendation_index(db) is index
+    _wait_for_refresh()
+    assert len(index) == 6
+
+
+def test_reparsed_dishes_keep_their_stored_ids_in_the_index(db, sample_menu, fresh_index):
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    index = recommender.get_recommendation_index(db)
+    crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+
+    stored = {item.id for item in crud.get_restaurant_menu_items(db, restaurant.id)}
+    assert set(index._item_slots) == stored
+
+
+def test_refresh_reads_only_rows_past_the_marks_and_updates_reparsed_terms(db, sample_menu, fresh_index, monkeypatch):
+    from sqlalchemy import event
+
+    from database.db import engine
+
+    restaurant = crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    index = recommender.get_recommendation_index(db)
+    lasagna = next(item for item in crud.get_restaurant_menu_items(db, restaurant.id) if item.name == "Lasagna")
+    before = set(recommender.term_ids(index._item_bits[index._item_slots[lasagna.id]]).tolist())
+
+    # Another worker re-parses the dish with a new description; this process's hooks never see it
+    monkeypatch.setattr(crud, "index_new_items", lambda *args: None)
+    reparsed = copy.deepcopy(sample_menu)
+    for category in reparsed["menu"]:
+        for item in category["items"]:
+            if item["name"] == "Lasagna":
+                item["description"] = "Baked with saffron"
+    crud.save_parsed_restaurant(db, reparsed)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        index.refresh(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 5
+    assert all("updated_at >=" in s or "created_at >=" in s for s in selects)
+    after = set(recommender.term_ids(index._item_bits[index._item_slots[lasagna.id]]).tolist())
+    assert after != before
+    # The dish's old-only terms no longer lead to it
+    for term in before - after:
+        assert index._item_slots[lasagna.id] not in index._terms.get(term)[0].tolist()
@@ -0,0 +1,55 @@
+"""Which parsed names the ingest index merges into a stored restaurant."""
+from utils.restaurant_index import RestaurantIndex
+
+
+def _index() -> RestaurantIndex:
+    index = RestaurantIndex()
+    index.load([
+        (1, "Thai Kitchen", None),
+        (2, "Bella Roma Rossi Trattoria", "12 Main St, Austin, TX"),
+        (3, "Pho 88", "Oak St, Boston"),
+    ])
+    return index
+
+
+def test_near_identical_name_replaces():
+    match = _index().best_match("THAI KITCHEN", None)
+    assert (match.restaurant_id, match.exact) == (1, True)
+
+
+def test_short_core_name_needs_the_full_name():
+    index = _index()
+    assert index.best_match("Thai House", None) is None
+    assert index.best_match("The Thai Bistro", "500 Elm St, Boston") is None
+    # Still offered for review by /restaurants/match
+    assert index.candidates("Thai House")[0].restaurant_id == 1
+
+
+def test_distinctive_located_name_merges_without_replacing():
+    index = _index()
+    match = index.best_match("Bella Roma Rossi", "12 Main St, Austin TX")
+    assert (match.restaurant_id, match.exact) == (2, False)
+    assert index.best_match("Bella Roma Rossi", None) is None
+    assert index.best_match("Pho 99", "Oak St, Boston") is None
+
+
+def test_exact_name_needs_agreeing_locations():
+    index = RestaurantIndex()
+    index.load([(1, "Joe's Pizza", "Austin, TX"), (2, "Joe's Pizza", "Portland, OR")])
+    assert index.best_match("Joe's Pizza", None) is None
+    assert index.best_match("Joe's Pizza", "Austin TX").restaurant_id == 1
+    assert index.best_match("JOE'S PIZZA", "Portland, OR").restaurant_id == 2
+    assert _index().best_match("Thai Kitchen", "Chicago, IL") is None
+
+
+def test_readding_compacts_dead_slots(monkeypatch):
+    from utils import restaurant_index
+
+    monkeypatch.setattr(restaurant_index, "COMPACT_MIN_DEAD", 10)
+    index = _index()
+    for _ in range(1000):
+        index.add(2, "Bella Roma Rossi Trattoria", "12 Main St, Austin, TX")
+
+    assert len(index._entries) < 20
+    assert index.best_match("Bella Roma Rossi Trattoria", "12 Main St, Austin, TX").restaurant_id == 2
+    assert index.best_match("THAI KITCHEN", None).restaurant_id == 1
@@ -0,0 +1,63 @@
+"""Rebuilding the similar-dishes index doesn't hold up ingest, and keeps what ingest appended meanwhile."""
+import copy
+import shutil
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from utils import crud, similar_items
+
+
+@pytest.fixture
+def index_path():
+    shutil.rmtree(similar_items.SIMILAR_INDEX_PATH, ignore_errors=True)
+    yield similar_items.SIMILAR_INDEX_PATH
+    shutil.rmtree(similar_items.SIMILAR_INDEX_PATH, ignore_errors=True)
+
+
+def _indexed_ids(path) -> set:
+    return set(similar_items._appended_since(path, 0))
+
+
+def test_ingest_during_a_build_neither_waits_nor_is_lost(db, sample_menu, index_path, monkeypatch):
+    crud.save_parsed_restaurant(db, copy.deepcopy(sample_menu))
+    similar_items.build(index_path, dim=32)
+
+    counted, resume = threading.Event(), threading.Event()
+    inverse_frequencies = similar_items.inverse_frequencies
+
+    def paused(*args):
+        counted.set()
+        assert resume.wait(10)
+        return inverse_frequencies(*args)
+
+    monkeypatch.setattr(similar_items, "inverse_frequencies", paused)
+    builder = threading.Thread(target=similar_items.build, args=(index_path, 32))
+    builder.start()
+    assert counted.wait(10)
+
+    # The build has read the table; this ingest appends to the current index without waiting for it
+    other = crud.save_parsed_restaurant(
+        db, {**copy.deepcopy(sample_menu), "restaurant_name": "Completely Different Osteria"}
+    )
+    resume.set()
+    builder.join(10)
+
+    stored = {item.id for item in crud.get_restaurant_menu_items(db, other.id)}
+    assert stored <= _indexed_ids(index_path)
+    assert len(_indexed_ids(index_path)) == 6
+
+
+def test_app_imports_and_locks_without_posix_file_locks(tmp_path):
+    # Windows has no fcntl; block it (and msvcrt, absent here anyway) and the API must still load
+    script = (
+        "import sys; sys.modules['fcntl'] = sys.modules['msvcrt'] = None\n"
+        "import app\n"
+        "from utils import similar_items\n"
+        f"with similar_items._write_lock({str(tmp_path / 'index')!r}):\n"
+        "    pass\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,71 @@
+"""The streaming parse shares /parse_menu/'s chunking and caches, and reports the dishes as stored."""
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from utils import crud, parser
+
+LINES = [{"text": text, "accuracy": 1.0} for text in (
+    "TRATTORIA ESEMPIO", "APPETIZERS", "Bruschetta", "$8.95", "DESSERTS", "Tiramisu", "$7.50",
+)]
+
+
+def _section(category: str, name: str, slug: str) -> dict:
+    return {"restaurant_name": "Trattoria Esempio",
+            "menu": [{"category": category, "items": [{"id": "1", "name": name, "slug": slug, "price": "8"}]}]}
+
+
+def _events(image_bytes: bytes) -> list:
+    async def collect():
+        return [chunk async for chunk in parser.stream_parse_menu(image_bytes, "menu.jpg")]
+
+    events = []
+    for chunk in asyncio.run(collect()):
+        head, data = chunk.strip().split("\n", 1)
+        events.append((head.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+    monkeypatch.setattr(parser, "_decode", lambda image_bytes, filename: None)
+    monkeypatch.setattr(parser, "run_ocr", lambda img: LINES)
+    monkeypatch.setattr(parser, "split_menu_sections", lambda lines: ["APPETIZERS ...", "DESSERTS ..."])
+
+    def stream(text):
+        calls.append(text)
+        yield json.dumps(_section("Appetizers", "Bruschetta", "Bruschetta Classica"))
+
+    def extract(text):
+        calls.append(text)
+        return _section("Desserts", "Tiramisu", "tiramisu")
+
+    monkeypatch.setattr(parser, "stream_menu_text", stream)
+    monkeypatch.setattr(parser, "extract_menu_data", extract)
+    return calls
+
+
+def test_every_section_is_parsed_and_done_lists_the_stored_dishes(db, model):
+    events = _events(b"first upload")
+
+    assert sorted(model) == ["APPETIZERS ...", "DESSERTS ..."]
+    items = [data for event, data in events if event == "item"]
+    assert [(i["category_index"], i["item"]["name"]) for i in items] == [(0, "Bruschetta"), (1, "Tiramisu")]
+    event, done = events[-1]
+    assert event == "done"
+    stored = {item.id: crud.dish_slug(item.slug) for item in crud.get_restaurant_menu_items(db, uuid.UUID(done["id"]))}
+    assert {item["id"]: item["slug"] for item in done["items"]} == {str(k): v for k, v in stored.items()}
+    assert sorted(stored.values()) == ["bruschetta", "tiramisu"]
+
+
+def test_an_llm_cache_hit_fills_the_parse_cache(db, model):
+    _events(b"first upload")
+    model.clear()
+    events = _events(b"same menu, another photo")
+
+    assert model == []
+    assert [event for event, _ in events].count("item") == 2
+    assert parser.parse_cache.get(parser.parse_cache_key(b"same menu, another photo")) is not None
@@ -0,0 +1,35 @@
+"""Multi-page uploads: zip archives are bounded by page count and total size before they're unpacked."""
+import io
+import zipfile
+
+import pytest
+
+from utils.helpers import expand_menu_pages
+
+
+def _zip(*members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_pages_come_out_in_member_order_after_loose_files():
+    archive = _zip(("b.jpg", b"2"), ("a.jpg", b"1"), ("notes.txt", b"x"))
+    pages = expand_menu_pages([(b"0", "cover.jpg"), (archive, "menu.zip")], max_pages=3)
+    assert pages == [(b"0", "cover.jpg"), (b"1", "a.jpg"), (b"2", "b.jpg")]
+
+
+def test_too_many_members_is_rejected():
+    archive = _zip(*((f"{i:04}.jpg", b"x") for i in range(50)))
+    with pytest.raises(ValueError, match="Too many pages"):
+        expand_menu_pages([(archive, "menu.zip")], max_pages=30)
+
+
+def test_total_unpacked_size_is_bounded_before_reading(monkeypatch):
+    # Highly compressible members: a few KB of zip, megabytes once inflated
+    archive = _zip(*((f"{i}.jpg", b"\0" * (1024 * 1024)) for i in range(5)))
+    monkeypatch.setattr(zipfile.ZipFile, "read", lambda *args: pytest.fail("member read before the size check"))
+    with pytest.raises(ValueError, match="Pages too large"):
+        expand_menu_pages([(archive, "menu.zip")], max_page_bytes=2 * 1024 * 1024, max_total_bytes=3 * 1024 * 1024)
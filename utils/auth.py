@@ -4,8 +4,10 @@ from datetime import datetime, timedelta, timezone
 from fastapi import Request
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database.db import SessionLocal
+from database.db import get_db, get_async_db, DB_ASYNC
 from fastapi import Cookie
 from typing import Annotated
 import logging
@@ -36,29 +38,36 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# Database session dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _email_from_token(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email: str = payload.get("sub")
-        if user_email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_email: str = payload.get("sub")
+    if user_email is None:
+        raise _credentials_exception()
+    return user_email
 
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    user_email = _email_from_token(token)
     user = db.query(User).filter(User.email == user_email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    user_email = _email_from_token(token)
+    user = (await db.execute(select(User).where(User.email == user_email))).scalars().first()
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+# What routes should depend on: the AsyncSession lookup when DB_ASYNC is on
+authenticated_user = get_current_user_async if DB_ASYNC else get_current_user
@@ -0,0 +1,130 @@
+# utils/cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+class DiskCache:
+    """
+    Small SQLite-backed JSON cache with LRU eviction and hit/miss counters.
+
+    Args:
+        path (str): SQLite file the entries live in (e.g., "cache/parse_results.sqlite3").
+        max_bytes (int): Evict least-recently-used entries once stored values exceed this size.
+        ttl (float | None): Seconds an entry stays valid; None keeps entries until evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def clear(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def entries(self, limit: int = 50) -> list:
+        """Most recently used entries first, without their values."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, size, created, accessed FROM entries ORDER BY accessed DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"key": k, "size": size, "created": created, "accessed": accessed} for k, size, created, accessed in rows]
+
+    def _evict(self) -> None:
+        if self.ttl is not None:
+            cursor = self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+            self.evictions += max(cursor.rowcount, 0)
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,16 +1,23 @@
-from sqlalchemy.orm import Session
-from database.models import Restaurant, MenuItem, User, Category
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+from database.models import (
+    Restaurant, MenuItem, User, Category, Menu, user_favorite_menu_items, user_viewed_menu_items,
+)
+import re
+import traceback
 import uuid
-from database.db import SessionLocal
+from datetime import datetime
+from utils.metrics import timed
+from utils.menu_chunker import dish_slug, slugify
+from utils.restaurant_index import ensure_loaded
+from utils.item_search import index_menu_items, normalize_tags, unindex_menu_items
+from utils.dietary import set_tag_bits
+from utils.recommender import INTERACTION_TABLES, index_new_items, unindex_items
+from utils.similar_items import index_similar_items
+from utils.pagination import iter_rows
+from utils.response_cache import menu_cache
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # # --- Create ---
 # def create_object(db: Session, model, data: dict):
 #     obj = model(id=str(uuid.uuid4()), **data)
@@ -21,7 +28,7 @@ def get_db():
 
 def create_object(db, model, data):
     data.pop('id', None)  # Remove id if present
-    obj = model(id=str(uuid.uuid4()), **data)
+    obj = model(id=uuid.uuid4(), **data)
     db.add(obj)
     db.commit()
     db.refresh(obj)
@@ -30,8 +37,10 @@ def create_object(db, model, data):
 
 
 # --- Get All ---
-def get_all(db: Session, model):
-    return db.query(model).all()
+def get_all(db: Session, model, fields=None):
+    # Plain rows (optionally just some columns) in keyset batches, not every ORM object at once;
+    # API listings page through utils/pagination.keyset_page instead
+    return iter_rows(db, model, fields)
 
 # --- Get One ---
 def get_one(db: Session, model, object_id: str):
@@ -61,33 +70,364 @@ def get_user_by_email(db: Session, email: str) -> User | None:
     return db.query(User).filter(User.email == email).first()
 
 def create_user(db: Session, email: str, hashed_password: str) -> User:
-    db_user = User(id=str(uuid.uuid4()), email=email, hashed_password=hashed_password)
+    db_user = User(id=uuid.uuid4(), email=email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def create_restaurant_with_menu(db: Session, parsed_data: dict):
-    restaurant = create_object(db, Restaurant, {
-        "name": parsed_data["restaurant_name"],
-        "location": parsed_data.get("location"),
-        "description": parsed_data.get("description"),
-        "currency": parsed_data.get("currency"),
-        "last_updated": parsed_data.get("last_updated"),
-        "restaurant_image": parsed_data.get("restaurant_image"),
-    })
+def _parse_datetime(value) -> datetime:
+    # The model returns ISO 8601 strings (often with a trailing "Z"); fall back to now if it doesn't
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return datetime.utcnow()
+
+
+def _parse_price(value) -> float:
+    # The model writes prices as strings ("18", "$12.50"); the column is a NOT NULL float,
+    # so anything without a number ("Market price") is stored as 0
+    if isinstance(value, (int, float)):
+        return float(value)
+    number = re.search(r"\d+(?:[.,]\d+)?", str(value or ""))
+    return float(number.group().replace(",", ".")) if number else 0.0
+
+
+MENU_ITEM_COLUMNS = ("name", "slug", "description", "price", "tags", "image_prompt", "images")
+# On a slug clash (the same restaurant re-parsed) the dish is updated in place; images already fetched for it are kept
+MENU_ITEM_UPSERT_COLUMNS = ("name", "description", "price", "tags", "image_prompt", "tag_bits", "category_id", "updated_at")
+
+def _insert_menu_items(db: Session, restaurant_id, rows: list) -> list:
+    """
+    One executemany INSERT ... ON CONFLICT (slug) DO UPDATE on Postgres and SQLite; plain INSERT elsewhere.
+
+    Returns the other restaurants the upsert took dishes from, with their menu versions bumped
+    so their cached menus go stale. Scoped slugs keep that empty unless rows predate them.
+    """
+    if not rows:
+        return []
+    table = MenuItem.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        db.execute(table.insert(), rows)
+        return []
+    previous_owners = db.scalars(
+        select(Category.restaurant_id).join(MenuItem).distinct()
+        .where(MenuItem.slug.in_([row["slug"] for row in rows]), Category.restaurant_id != restaurant_id)
+    ).all()
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.slug],
+        set_={column: statement.excluded[column] for column in MENU_ITEM_UPSERT_COLUMNS},
+    ).returning(table.c.slug, table.c.id)
+    # Dishes kept from an earlier parse keep their stored id; the post-commit index hooks need that one
+    stored = dict(db.execute(statement, rows).all())
+    for row in rows:
+        row["id"] = stored.get(row["slug"], row["id"])
+    return _bump_menu_versions(db, Menu.restaurant_id.in_(previous_owners)) if previous_owners else []
+
+def scoped_slug(restaurant_id, slug: str) -> str:
+    # The model's slugs are generic ("lasagna"), but menu_items.slug is unique table-wide and
+    # the upsert key, so stored slugs carry their restaurant: another menu's lasagna is a new row.
+    # Responses strip it again with dish_slug()
+    return f"{restaurant_id.hex}-{slug}"
+
+def _build_menu(restaurant_id, parsed_data: dict) -> tuple:
+    """The Menu plus category and item rows for one parse, ready for executemany."""
+    # Categories hang off a Menu, so every parse gets one
+    menu = Menu(
+        id=uuid.uuid4(),
+        restaurant_id=restaurant_id,
+        title=parsed_data.get("menu_title") or "Menu",
+        description=parsed_data.get("description"),
+    )
 
+    category_rows, item_rows, taken_slugs = [], [], set()
     for category_data in parsed_data.get("menu", []):
-        category = create_object(db, Category, {
-            "restaurant_id": restaurant.id,
+        category_id = uuid.uuid4()
+        category_rows.append({
+            "id": category_id,
+            "restaurant_id": restaurant_id,
+            "menu_id": menu.id,
             "category": category_data["category"],
             "description": category_data.get("description"),
             "priority": category_data.get("priority", 0),
         })
-
         for item_data in category_data.get("items", []):
-            item_data["category_id"] = category.id
-            create_object(db, MenuItem, item_data)
+            row = {column: item_data.get(column) for column in MENU_ITEM_COLUMNS}
+            # Two dishes sharing a slug in one menu (the same name in two sections) are both kept:
+            # later ones get -2, -3, ... in menu order, so a re-parse maps them back onto the same rows
+            base_slug = slug = row["slug"] or slugify(row["name"]) or "item"
+            suffix = 1
+            while slug in taken_slugs:
+                suffix += 1
+                slug = f"{base_slug}-{suffix}"
+            taken_slugs.add(slug)
+            row.update(
+                id=uuid.uuid4(), category_id=category_id, slug=scoped_slug(restaurant_id, slug),
+                price=_parse_price(row["price"]), tags=normalize_tags(row["tags"]),
+            )
+            item_rows.append(row)
+    return menu, category_rows, item_rows
+
+def _after_menu_write(restaurant_id, item_rows: list, dropped=(), touched=()) -> None:
+    """
+    Post-commit index and cache updates; the menu is stored by now, so one failing hook mustn't skip the rest.
+
+    dropped holds (id, slug) of the dishes the write deleted.
+    """
+    for hook, args in (
+        (unindex_menu_items, ([slug for _, slug in dropped],)),
+        (unindex_items, ([item_id for item_id, _ in dropped],)),
+        (index_menu_items, (item_rows,)),
+        (index_new_items, (restaurant_id, item_rows)),
+        (index_similar_items, (restaurant_id, item_rows)),
+        (menu_cache.invalidate, ([restaurant_id, *touched],)),
+    ):
+        try:
+            hook(*args)
+        except Exception:
+            print(f"⚠️ {hook.__qualname__} failed after storing restaurant {restaurant_id}")
+            traceback.print_exc()
+
+def _write_menu(db: Session, restaurant_id, category_rows: list, item_rows: list) -> list:
+    """Writes the categories and items; returns the other restaurants whose menus changed too."""
+    if category_rows:
+        db.execute(Category.__table__.insert(), category_rows)
+    set_tag_bits(db, item_rows)
+    return _insert_menu_items(db, restaurant_id, item_rows)
+
+@timed("db_insert")
+def create_restaurant_with_menu(db: Session, parsed_data: dict):
+    """
+    Inserts the restaurant, its menu, categories and items in one transaction.
+
+    The graph is built in memory first, then written as two single-row INSERTs and one
+    executemany each for categories and items, with a single commit. Any failure rolls
+    the whole restaurant back instead of leaving part of it behind.
+    """
+    restaurant = Restaurant(
+        id=uuid.uuid4(),
+        name=parsed_data["restaurant_name"],
+        location=parsed_data.get("location"),
+        description=parsed_data.get("description"),
+        currency=parsed_data.get("currency") or "USD",
+        last_updated=_parse_datetime(parsed_data.get("last_updated")),
+        restaurant_image=parsed_data.get("restaurant_image"),
+    )
+    restaurant_id = restaurant.id
+    menu, category_rows, item_rows = _build_menu(restaurant_id, parsed_data)
+
+    try:
+        db.add_all([restaurant, menu])
+        db.flush()
+        touched = _write_menu(db, restaurant_id, category_rows, item_rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _after_menu_write(restaurant_id, item_rows, touched=touched)
+    return restaurant
+
+@timed("db_insert")
+def refresh_restaurant_menu(db: Session, restaurant: Restaurant, parsed_data: dict, replace: bool = True):
+    """
+    Replaces an existing restaurant's menu with a fresh parse, in one transaction.
+
+    Fields the parse leaves empty keep their stored values. Dishes that are still on the
+    menu are upserted by slug onto the new categories, so their enriched images survive;
+    the old menus are then deleted, taking only the dishes that were dropped with them.
 
-    return restaurant
\ No newline at end of file
+    With replace=False (a fuzzy name match, which might be a different place) the parse is
+    added as another menu instead and only empty restaurant fields are filled in. The old
+    menus stay, keeping every dish the parse doesn't have; dishes it does have (same slug)
+    are upserted onto the new menu like a replace would, images included.
+    """
+    for field in ("location", "description", "currency", "restaurant_image"):
+        if parsed_data.get(field) and (replace or not getattr(restaurant, field)):
+            setattr(restaurant, field, parsed_data[field])
+    restaurant.last_updated = _parse_datetime(parsed_data.get("last_updated"))
+    restaurant_id = restaurant.id
+    menu, category_rows, item_rows = _build_menu(restaurant_id, parsed_data)
+    dropped = []
+
+    try:
+        old_menu_ids = db.scalars(select(Menu.id).where(Menu.restaurant_id == restaurant.id)).all() if replace else []
+        db.add(menu)
+        db.flush()
+        touched = _write_menu(db, restaurant_id, category_rows, item_rows)
+        if old_menu_ids:
+            old_category_ids = select(Category.id).where(Category.menu_id.in_(old_menu_ids)).scalar_subquery()
+            dropped_item_ids = select(MenuItem.id).where(MenuItem.category_id.in_(old_category_ids)).scalar_subquery()
+            dropped = db.execute(
+                select(MenuItem.id, MenuItem.slug).where(MenuItem.category_id.in_(old_category_ids))
+            ).all()
+            for table in (user_viewed_menu_items, user_favorite_menu_items):
+                db.execute(delete(table).where(table.c.menu_item_id.in_(dropped_item_ids)))
+            db.execute(delete(MenuItem).where(MenuItem.category_id.in_(old_category_ids)))
+            db.execute(delete(Category).where(Category.menu_id.in_(old_menu_ids)))
+            db.execute(delete(Menu).where(Menu.id.in_(old_menu_ids)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _after_menu_write(restaurant_id, item_rows, dropped, touched)
+    return restaurant
+
+def save_parsed_restaurant(db: Session, parsed_data: dict):
+    """
+    Stores a parse, attaching it to the restaurant it matches instead of adding a duplicate.
+
+    A near-identical name (utils.restaurant_index.Match.exact) replaces that restaurant's
+    menu. A fuzzier match ("Bella Roma Rossi" vs "Bella Roma Rossi Trattoria", same street)
+    only adds the parse as another menu, since replacing would delete the other place's
+    dishes and favourites if the match were wrong.
+    """
+    restaurant_name = parsed_data.get("restaurant_name")
+    if not restaurant_name:
+        raise ValueError("Missing restaurant name in parsed data")
+
+    index = ensure_loaded(db)
+    location = parsed_data.get("location")
+    match = index.best_match(restaurant_name, location)
+    existing_restaurant = db.get(Restaurant, match.restaurant_id) if match else None
+    replace = match.exact if existing_restaurant else True
+    if existing_restaurant is None:
+        # The index only sees this process's inserts; the exact-name lookup catches the rest,
+        # as long as the locations don't say they're two branches
+        same_name = db.query(Restaurant).filter(Restaurant.name == restaurant_name)
+        if location:
+            same_name = same_name.filter(or_(Restaurant.location.is_(None), Restaurant.location == location))
+        existing_restaurant = same_name.first()
+    if existing_restaurant:
+        restaurant = refresh_restaurant_menu(db, existing_restaurant, parsed_data, replace=replace)
+    else:
+        restaurant = create_restaurant_with_menu(db, parsed_data)
+    index.add(restaurant.id, restaurant.name, restaurant.location)
+    return restaurant
+
+def get_restaurant_with_menu(db: Session, restaurant_id) -> Restaurant | None:
+    """
+    The restaurant with menus -> categories -> items loaded up front: four queries
+    (one per level via selectinload) however many categories and dishes there are.
+    """
+    return (
+        db.query(Restaurant)
+        .options(selectinload(Restaurant.menus).selectinload(Menu.categories).selectinload(Category.items))
+        .filter(Restaurant.id == restaurant_id)
+        .first()
+    )
+
+async def get_restaurant_with_menu_async(db, restaurant_id) -> Restaurant | None:
+    """get_restaurant_with_menu for an AsyncSession; the same four queries, awaited."""
+    result = await db.execute(
+        select(Restaurant)
+        .options(selectinload(Restaurant.menus).selectinload(Menu.categories).selectinload(Category.items))
+        .where(Restaurant.id == restaurant_id)
+    )
+    return result.scalars().first()
+
+def _menu_version_query(restaurant_id):
+    return (
+        select(Restaurant.last_updated, func.max(Menu.last_parsed), func.coalesce(func.sum(Menu.cache_version), 0))
+        .outerjoin(Menu, Menu.restaurant_id == Restaurant.id)
+        .where(Restaurant.id == restaurant_id)
+        .group_by(Restaurant.id, Restaurant.last_updated)
+    )
+
+def _version(row) -> str | None:
+    return None if row is None else "|".join(str(value) for value in row)
+
+def get_menu_version(db: Session, restaurant_id) -> str | None:
+    """
+    What cached menu responses are stamped with: the restaurant's last_updated, its newest
+    Menu.last_parsed and the sum of its menus' cache_version, in one small query; None if there's no such restaurant.
+    """
+    return _version(db.execute(_menu_version_query(restaurant_id)).first())
+
+async def get_menu_version_async(db, restaurant_id) -> str | None:
+    return _version((await db.execute(_menu_version_query(restaurant_id))).first())
+
+def _bump_menu_versions(db: Session, *where) -> list:
+    # Images and enrichment status change the menu response without a re-parse; bumping
+    # cache_version changes its version, so every worker's cached copy goes stale.
+    # Returns the restaurants whose menus were bumped.
+    return list(set(db.scalars(
+        update(Menu).where(*where).values(cache_version=Menu.cache_version + 1).returning(Menu.restaurant_id)
+    ).all()))
+
+def get_restaurant_menu_items(db: Session, restaurant_id) -> list:
+    return db.query(MenuItem).join(Category).filter(Category.restaurant_id == restaurant_id).all()
+
+def set_menu_item_images(db: Session, images_by_id: dict) -> None:
+    """Writes many items' images in one executemany UPDATE and a single commit."""
+    if not images_by_id:
+        return
+    db.execute(update(MenuItem), [{"id": item_id, "images": images} for item_id, images in images_by_id.items()])
+    touched = _bump_menu_versions(
+        db, Menu.id.in_(select(Category.menu_id).join(MenuItem).where(MenuItem.id.in_(list(images_by_id))))
+    )
+    db.commit()
+    menu_cache.invalidate(touched)
+
+def get_menu_items(db: Session, menu_id) -> list:
+    return db.query(MenuItem).join(Category).filter(Category.menu_id == menu_id).all()
+
+def add_interaction(db: Session, user_id, kind: str, target: str, entity_id) -> bool:
+    """Records a view or favourite of a dish or restaurant; False if there's no such one."""
+    model = MenuItem if target == "item" else Restaurant
+    if db.get(model, entity_id) is None:
+        return False
+    table = INTERACTION_TABLES[(kind, target)]
+    entity_column = "menu_item_id" if target == "item" else "restaurant_id"
+    exists = db.execute(
+        select(table).where(table.c.user_id == user_id, table.c[entity_column] == entity_id)
+    ).first()
+    if exists is None:
+        db.execute(table.insert().values(user_id=user_id, **{entity_column: entity_id}))
+        db.commit()
+    return True
+
+def claim_pending_menu(db: Session, stale_before: datetime):
+    """
+    Atomically moves one claimable menu to in_progress and returns its id, or None.
+
+    Claimable means pending, or in_progress with a claim older than stale_before (its worker
+    died). On Postgres, FOR UPDATE SKIP LOCKED keeps concurrent workers off the same row;
+    SQLite ignores that clause, so the conditional UPDATE's rowcount settles any race there.
+    """
+    claimable = or_(
+        Menu.enriched == "pending",
+        (Menu.enriched == "in_progress") & (Menu.enrich_claimed_at.is_(None) | (Menu.enrich_claimed_at < stale_before)),
+    )
+    while True:
+        menu_id = db.execute(
+            select(Menu.id).where(claimable).order_by(Menu.last_parsed).limit(1).with_for_update(skip_locked=True)
+        ).scalar()
+        if menu_id is None:
+            db.rollback()
+            return None
+        claimed = db.execute(
+            update(Menu).where(Menu.id == menu_id, claimable)
+            .values(enriched="in_progress", enrich_claimed_at=datetime.utcnow())
+        ).rowcount
+        touched = _bump_menu_versions(db, Menu.id == menu_id) if claimed else []
+        db.commit()
+        if claimed:
+            menu_cache.invalidate(touched)
+            return menu_id
+
+def set_menu_enrichment(db: Session, menu_id, status: str) -> None:
+    """Sets Menu.enriched; in_progress also refreshes the claim so the menu isn't seen as abandoned."""
+    values = {"enriched": status, "enrich_claimed_at": datetime.utcnow() if status == "in_progress" else None}
+    db.execute(update(Menu).where(Menu.id == menu_id).values(**values))
+    touched = _bump_menu_versions(db, Menu.id == menu_id)
+    db.commit()
+    menu_cache.invalidate(touched)
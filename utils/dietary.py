@@ -0,0 +1,286 @@
+# utils/dietary.py
+
+import argparse
+import re
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from database.models import MenuItem, Term
+from utils.item_search import STOPWORDS, normalize_tag, stem
+
+# Restrictions name what to avoid (see User.dietary_restrictions: ['gluten', 'nuts']); a dish
+# is unsafe if any of these words is among its tags or ingredients
+AVOID_TERMS = {
+    "gluten": {"gluten", "wheat", "flour", "bread", "pasta", "noodle", "barley", "rye", "couscous", "seitan",
+               "breaded", "crouton", "bun", "pastry", "dumpling", "pizza", "beer"},
+    "nuts": {"nut", "peanut", "almond", "walnut", "pecan", "cashew", "pistachio", "hazelnut", "macadamia", "praline"},
+    "dairy": {"dairy", "milk", "cheese", "butter", "cream", "yogurt", "ghee", "mozzarella", "parmesan", "ricotta",
+              "feta", "cheddar", "mascarpone", "paneer", "burrata", "gelato"},
+    "egg": {"egg", "mayonnaise", "mayo", "aioli", "meringue", "custard"},
+    "shellfish": {"shellfish", "shrimp", "prawn", "crab", "lobster", "clam", "mussel", "oyster", "scallop", "crawfish"},
+    "fish": {"fish", "salmon", "tuna", "cod", "anchovy", "sardine", "halibut", "trout", "mackerel", "tilapia"},
+    "soy": {"soy", "tofu", "edamame", "miso", "tempeh"},
+    "sesame": {"sesame", "tahini"},
+    "pork": {"pork", "bacon", "ham", "prosciutto", "chorizo", "pancetta", "salami"},
+}
+# Tags that vouch for a dish despite a matching word ("gluten-free pasta", vegan "cheese")
+SAFE_TAGS = {"dairy": {"vegan"}, "egg": {"vegan"}}
+# Whole tags are also interned under this prefix; only these can vouch, so prose in a
+# description ("ask for our gluten-free option") never marks a dish safe
+TAG_PREFIX = "#"
+RESTRICTION_ALIASES = {
+    "nut": "nuts", "peanuts": "nuts", "tree-nuts": "nuts", "lactose": "dairy", "milk": "dairy", "eggs": "egg",
+    "wheat": "gluten", "celiac": "gluten", "crustacean": "shellfish",
+}
+# Diets are the other way round: the dish must carry one of these tags
+DIETS = {
+    "vegetarian": {"vegetarian", "vegan"},
+    "vegan": {"vegan"},
+    "pescatarian": {"pescatarian", "vegetarian", "vegan", "seafood"},
+    "halal": {"halal"},
+    "kosher": {"kosher"},
+    "keto": {"keto"},
+}
+
+
+def tag_term(tag: str) -> str:
+    return TAG_PREFIX + normalize_tag(tag)
+
+
+def item_terms(name: Optional[str], description: Optional[str], tags) -> set:
+    """
+    Ingredient words of the name, description and tags, plus every tag whole and as a tag_term.
+
+    Hyphenated words count by their parts, so "almond-crusted" is "almond" and "crusted" and
+    "cream-cheese" is "cream" and "cheese". A "gluten-free" tag therefore adds "gluten" too,
+    and its tag_term is what vouches for the dish against that word.
+    """
+    tags = [tag for tag in tags or [] if tag.strip()]
+    words = re.findall(r"[a-z0-9]+", " ".join([name or "", description or "", *tags]).lower())
+    return (
+        {stem(w) for w in words if w not in STOPWORDS}
+        | {normalize_tag(tag) for tag in tags}
+        | {tag_term(tag) for tag in tags}
+    )
+
+
+def encode_bits(ids) -> bytes:
+    value = 0
+    for term_id in ids:
+        value |= 1 << term_id
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+
+def bit_matrix(bitsets: list) -> np.ndarray:
+    """Packs per-item bitsets into an (items, words) uint64 array; None rows stay zero."""
+    width = max((len(b) for b in bitsets if b), default=0)
+    width = max(8, -(-width // 8) * 8)
+    buffer = b"".join((b or b"").ljust(width, b"\0") for b in bitsets)
+    return np.frombuffer(buffer, dtype="<u8").reshape(len(bitsets), width // 8)
+
+
+def _mask(ids, words: int) -> np.ndarray:
+    mask = np.zeros(words, dtype="<u8")
+    for term_id in ids:
+        if term_id // 64 < words:
+            mask[term_id // 64] |= np.uint64(1 << (term_id % 64))
+    return mask
+
+
+def intern_terms(db: Session, names) -> dict:
+    """Ids for the names, inserting the new ones inside the caller's transaction."""
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(db.execute(select(Term.name, Term.id).where(Term.name.in_(names))).all())
+    missing = names - ids.keys()
+    if missing:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            dialect_insert = None
+        if dialect_insert is None:
+            db.execute(Term.__table__.insert(), [{"name": name} for name in missing])
+        else:
+            # Another ingest may intern the same word concurrently; theirs wins and we read it back
+            db.execute(dialect_insert(Term.__table__).on_conflict_do_nothing(), [{"name": name} for name in missing])
+        ids.update(db.execute(select(Term.name, Term.id).where(Term.name.in_(missing))).all())
+    return ids
+
+
+def set_tag_bits(db: Session, item_rows: list) -> None:
+    """Fills each item row's tag_bits before it's written (ingest and re-parse)."""
+    terms = [item_terms(row.get("name"), row.get("description"), row.get("tags")) for row in item_rows]
+    ids = intern_terms(db, set().union(*terms))
+    for row, item_terms_ in zip(item_rows, terms):
+        row["tag_bits"] = encode_bits(ids[term] for term in item_terms_)
+
+
+# Committed ids only: query-time lookups never see a rolled-back ingest's terms
+_term_ids: dict = {}
+_term_ids_lock = threading.Lock()
+
+
+def lookup_term_ids(names) -> dict:
+    """Ids of already-interned terms; unknown names are absent (no dish has them)."""
+    names = set(names)
+    with _term_ids_lock:
+        found = {name: _term_ids[name] for name in names if name in _term_ids}
+    missing = names - found.keys()
+    if missing:
+        from database.db import SessionLocal
+        db = SessionLocal()
+        try:
+            loaded = dict(db.execute(select(Term.name, Term.id).where(Term.name.in_(missing))).all())
+        finally:
+            db.close()
+        with _term_ids_lock:
+            _term_ids.update(loaded)
+        found.update(loaded)
+    return found
+
+
+class DietaryConstraints(NamedTuple):
+    require: list   # diets: each a set of term ids, one of which the dish must carry
+    avoid: list     # (ids that make a dish unsafe, ids that vouch for it anyway)
+    prefer: set     # ids that rank a dish higher (cuisine preferences)
+
+    def __bool__(self) -> bool:
+        return bool(self.require or self.avoid or self.prefer)
+
+
+def split_avoid(values) -> tuple:
+    """
+    (restrictions, disliked ingredients) from free-text things to avoid.
+
+    Known allergens ("nuts", "gluten-free", "lactose") are restrictions and avoid their whole
+    word list; anything else ("green peppers") is an ingredient, matched by its last word.
+    """
+    restrictions, disliked = [], []
+    for value in values:
+        base = normalize_tag(value).removesuffix("-free")
+        (restrictions if RESTRICTION_ALIASES.get(base, base) in AVOID_TERMS else disliked).append(value)
+    return restrictions, disliked
+
+
+def compile_constraints(restrictions=(), disliked=(), prefer=()) -> DietaryConstraints:
+    """
+    Turns a user's restrictions, disliked ingredients and cuisine preferences into term ids.
+
+    A restriction is a diet ("vegetarian") or something to avoid ("nuts", "gluten-free");
+    a disliked ingredient is avoided by its last word ("green peppers" -> "pepper").
+    """
+    diets, avoid = [], []
+    for restriction in map(normalize_tag, restrictions):
+        if not restriction:
+            continue
+        if restriction in DIETS:
+            diets.append(DIETS[restriction])
+            continue
+        base = restriction.removesuffix("-free")
+        base = RESTRICTION_ALIASES.get(base, base)
+        vouching = {f"{base}-free", f"{stem(base)}-free"} | SAFE_TAGS.get(base, set())
+        avoid.append((AVOID_TERMS.get(base, {stem(base)}), {tag_term(tag) for tag in vouching}))
+    for ingredient in disliked:
+        words = re.findall(r"[a-z0-9]+", ingredient.lower())
+        if words:
+            avoid.append(({stem(words[-1])}, set()))
+    preferred = {normalize_tag(p) for p in prefer if p.strip()}
+
+    names = set(preferred).union(*diets, *(a | s for a, s in avoid))
+    ids = lookup_term_ids(names)
+    to_ids = lambda group: {ids[name] for name in group if name in ids}
+    return DietaryConstraints(
+        require=[to_ids(diet) for diet in diets],
+        avoid=[(to_ids(unsafe), to_ids(safe)) for unsafe, safe in avoid],
+        prefer=to_ids(preferred),
+    )
+
+
+def evaluate(matrix: np.ndarray, known: np.ndarray, constraints: DietaryConstraints) -> tuple:
+    """
+    (safe, preference) per row of a bit_matrix; a few ANDs over the whole array.
+
+    Rows without a bitset (known=False, not yet backfilled) are never reported safe.
+    """
+    words = matrix.shape[1]
+    has_any = lambda ids: (matrix & _mask(ids, words)).any(axis=1)
+    safe = known.copy()
+    for diet in constraints.require:
+        safe &= has_any(diet)
+    for unsafe, vouching in constraints.avoid:
+        safe &= ~has_any(unsafe) | has_any(vouching)
+    preference = np.bitwise_count(matrix & _mask(constraints.prefer, words)).sum(axis=1)
+    return safe, preference
+
+
+def filter_menu(restaurant, constraints: DietaryConstraints):
+    """The restaurant's menu with unsafe dishes removed and preferred ones first in each category."""
+    from schemas.restaurant import RestaurantMenuOut
+
+    items = [item for menu in restaurant.menus for category in menu.categories for item in category.items]
+    menu_out = RestaurantMenuOut.model_validate(restaurant)
+    if not items or not constraints:
+        return menu_out
+    bitsets = [item.tag_bits for item in items]
+    safe, preference = evaluate(bit_matrix(bitsets), np.array([b is not None for b in bitsets]), constraints)
+    keep = {item.id: int(score) for item, ok, score in zip(items, safe.tolist(), preference.tolist()) if ok}
+    for menu in menu_out.menus:
+        for category in menu.categories:
+            category.items = sorted((i for i in category.items if i.id in keep), key=lambda i: -keep[i.id])
+    return menu_out
+
+
+def backfill(batch_size: int = 1000, recompute: bool = False) -> int:
+    """
+    Computes tag_bits for items stored before it existed; returns how many were filled.
+
+    recompute=True re-encodes every item, for bitsets written by an older item_terms.
+    """
+    from database.db import SessionLocal
+
+    filled, last_id = 0, None
+    db = SessionLocal()
+    try:
+        while True:
+            statement = select(MenuItem.id, MenuItem.name, MenuItem.description, MenuItem.tags)
+            if recompute:
+                statement = statement.order_by(MenuItem.id)
+                if last_id is not None:
+                    statement = statement.where(MenuItem.id > last_id)
+            else:
+                statement = statement.where(MenuItem.tag_bits.is_(None))
+            rows = db.execute(statement.limit(batch_size)).mappings().all()
+            if not rows:
+                return filled
+            last_id = rows[-1]["id"]
+            rows = [dict(row) for row in rows]
+            set_tag_bits(db, rows)
+            # updated_at so each worker's recommender picks the new bits up on its next refresh
+            now = datetime.utcnow()
+            db.execute(update(MenuItem), [{"id": row["id"], "tag_bits": row["tag_bits"], "updated_at": now} for row in rows])
+            db.commit()
+            filled += len(rows)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Menu item tag bitsets")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--all", action="store_true", help="re-encode every item, not just those without tag_bits")
+    args = parser.parse_args()
+    print(f"✅ Filled tag_bits for {backfill(args.batch_size, recompute=args.all)} items")
+
+
+if __name__ == "__main__":
+    main()
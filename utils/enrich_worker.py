@@ -0,0 +1,151 @@
+# utils/enrich_worker.py
+#
+# Background enrichment: claims menus whose Menu.enriched is "pending", looks up images
+# for their dishes in batches and writes them to MenuItem.images.
+#
+#   python -m utils.enrich_worker            # poll forever (run as many processes as you like)
+#   python -m utils.enrich_worker --once     # drain the queue, then exit
+#
+# Set ENRICH_WORKER=true to also run one inside the API process.
+
+import argparse
+import asyncio
+import os
+import traceback
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+
+from database.db import SessionLocal
+from database.models import Menu
+from utils import crud
+from utils.enricher import ENRICH_BATCH_SIZE, iter_item_images, save_item_images
+from utils.metrics import metrics
+
+ENRICH_WORKER = os.getenv("ENRICH_WORKER", "false").lower() == "true"
+ENRICH_POLL_SECONDS = float(os.getenv("ENRICH_POLL_SECONDS", "5"))
+ENRICH_IMAGES_PER_ITEM = int(os.getenv("ENRICH_IMAGES_PER_ITEM", "1"))
+# A claim not refreshed for this long belongs to a worker that died; another worker takes over
+ENRICH_CLAIM_TIMEOUT_MINUTES = float(os.getenv("ENRICH_CLAIM_TIMEOUT_MINUTES", "10"))
+
+enriched_menus = metrics.counter(
+    "prevu_enriched_menus_total", "Menus finished by the enrichment worker, by outcome.", labels=("status",)
+)
+
+
+def _claim() -> object:
+    db = SessionLocal()
+    try:
+        return crud.claim_pending_menu(db, datetime.utcnow() - timedelta(minutes=ENRICH_CLAIM_TIMEOUT_MINUTES))
+    finally:
+        db.close()
+
+
+def _load_menu(menu_id) -> dict:
+    """Restaurant name plus the dishes still without images, so a resumed menu skips finished ones."""
+    db = SessionLocal()
+    try:
+        menu = crud.get_one(db, Menu, menu_id)
+        items = [
+            {"id": item.id, "slug": item.slug, "name": item.name, "description": item.description, "images": []}
+            for item in crud.get_menu_items(db, menu_id)
+            if not item.images
+        ]
+        return {"restaurant_name": menu.restaurant.name, "items": items}
+    finally:
+        db.close()
+
+
+def _set_status(menu_id, status: str) -> None:
+    db = SessionLocal()
+    try:
+        crud.set_menu_enrichment(db, menu_id, status)
+    finally:
+        db.close()
+
+
+async def enrich_stored_menu(menu_id, batch_size: int = ENRICH_BATCH_SIZE,
+                             images_per_item: int = ENRICH_IMAGES_PER_ITEM) -> str:
+    """
+    Enriches one claimed menu and returns its final status.
+
+    Each batch is looked up concurrently, then written in one UPDATE and the claim refreshed,
+    so a crash loses at most one batch of lookups (and those are in image_cache anyway).
+    The menu ends "failed" if it had dishes and none of them got images.
+    """
+    menu = await run_in_threadpool(_load_menu, menu_id)
+    items = menu["items"]
+    found = 0
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        async for _ in iter_item_images(batch, menu["restaurant_name"], images_per_item):
+            pass
+        with_images = [item for item in batch if item["images"]]
+        found += len(with_images)
+        await run_in_threadpool(save_item_images, with_images)
+        await run_in_threadpool(_set_status, menu_id, "in_progress")
+
+    status = "failed" if items and not found else "done"
+    await run_in_threadpool(_set_status, menu_id, status)
+    print(f"🖼️ Menu {menu_id}: images for {found}/{len(items)} dishes ({status})")
+    return status
+
+
+class EnrichWorker:
+    """Claims and enriches one menu at a time; several workers (threads or processes) can share a DB."""
+
+    def __init__(self, poll_seconds: float = ENRICH_POLL_SECONDS, batch_size: int = ENRICH_BATCH_SIZE):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._stop = asyncio.Event()
+
+    async def run_once(self) -> bool:
+        """Processes one menu if any is claimable; returns False when the queue is empty."""
+        menu_id = await run_in_threadpool(_claim)
+        if menu_id is None:
+            return False
+        try:
+            status = await enrich_stored_menu(menu_id, self.batch_size)
+        except Exception:
+            traceback.print_exc()
+            status = "failed"
+            await run_in_threadpool(_set_status, menu_id, status)
+        enriched_menus.inc(1, status)
+        return True
+
+    async def run(self, drain_only: bool = False) -> None:
+        while not self._stop.is_set():
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                traceback.print_exc()  # e.g. the DB is briefly unreachable; keep polling
+            if drain_only:
+                return
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enrich pending menus with dish images.")
+    parser.add_argument("--once", action="store_true", help="exit when no pending menus are left")
+    parser.add_argument("--batch-size", type=int, default=ENRICH_BATCH_SIZE)
+    args = parser.parse_args()
+
+    async def run():
+        from utils.imagesearch import close_image_search_client
+        try:
+            await EnrichWorker(batch_size=args.batch_size).run(drain_only=args.once)
+        finally:
+            await close_image_search_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,163 @@
-from typing import Dict, Any
-from utils.imagesearch import fetch_image_links
-
-def enrich_menu_item(parsed_menu: Dict[str, Any], slug: str, images_per_item: int = 1) -> Dict[str, Any]:
-    for category in parsed_menu.get("menu", []):
-        for item in category.get("items", []):
-            if item.get("slug", "").strip().lower() == slug.strip().lower():
-                query = f"{item['name']} - {item.get('description', '')} - {parsed_menu.get('restaurant_name', '')}"
-                print(f"🔍 Fetching images for slug '{slug}' with query: {query}")
-                item["images"] = fetch_image_links(query, num_images=images_per_item)
-                return parsed_menu
-
-    return {"error": f"❌ Dish with slug '{slug}' not found in menu."}
+import asyncio
+import os
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from typing import Dict, Any, AsyncIterator, List, Union
+from utils.imagesearch import get_image_search_client
+from utils import crud
+from database.db import SessionLocal
+from database.models import Category, MenuItem, Restaurant
+
+# Dishes whose images are written per UPDATE, by the worker and by /restaurants/{id}/enrich alike
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "20"))
+
+def _normalize_slug(slug: str) -> str:
+    return (slug or "").strip().lower()
+
+def build_slug_index(parsed_menu: Dict[str, Any]) -> Dict[str, dict]:
+    """Maps each normalised slug to its item dict (the same object, so edits land in the menu)."""
+    return {
+        _normalize_slug(item.get("slug", "")): item
+        for category in parsed_menu.get("menu", [])
+        for item in category.get("items", [])
+    }
+
+def _select(index: Dict[str, dict], slugs: Union[List[str], str]) -> tuple:
+    """Resolves requested slugs (or "all") to (found items, missing slugs), keeping request order."""
+    if slugs == "all":
+        return list(index.values()), []
+    found, missing, seen = [], [], set()
+    for slug in slugs:
+        key = _normalize_slug(slug)
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in index:
+            found.append(index[key])
+        else:
+            missing.append(slug)
+    return found, missing
+
+async def enrich_menu_item(parsed_menu: Dict[str, Any], slug: str, images_per_item: int = 1) -> Dict[str, Any]:
+    item = build_slug_index(parsed_menu).get(_normalize_slug(slug))
+    if item is None:
+        return {"error": f"❌ Dish with slug '{slug}' not found in menu."}
+
+    print(f"🔍 Fetching images for slug '{slug}'")
+    item["images"] = await get_image_search_client().fetch_dish_images(
+        item["name"], item.get("description", ""), parsed_menu.get("restaurant_name", ""), images_per_item
+    )
+    return parsed_menu
+
+async def iter_item_images(items: List[dict], restaurant: str, images_per_item: int) -> AsyncIterator[dict]:
+    """Looks up every item's images concurrently, yielding {"slug", "images"} as each one finishes."""
+    client = get_image_search_client()
+
+    async def lookup(item: dict) -> dict:
+        item["images"] = await client.fetch_dish_images(
+            item["name"], item.get("description", ""), restaurant, images_per_item
+        )
+        return {"slug": item["slug"], "images": item["images"]}
+
+    for next_done in asyncio.as_completed([lookup(item) for item in items]):
+        yield await next_done
+
+async def enrich_menu_items(
+    parsed_menu: Dict[str, Any], slugs: Union[List[str], str] = "all", images_per_item: int = 1
+) -> Dict[str, Any]:
+    """Batch enrich_menu_item: one index build and one concurrent fan-out for all requested slugs."""
+    items, missing = _select(build_slug_index(parsed_menu), slugs)
+    restaurant = parsed_menu.get("restaurant_name", "")
+    enriched = [result async for result in iter_item_images(items, restaurant, images_per_item)]
+    return {"enriched": len(enriched), "missing": missing, "menu": parsed_menu}
+
+def load_restaurant_items(restaurant_id) -> Dict[str, Any] | None:
+    """The restaurant name and its menu items as plain dicts, read in a short-lived session."""
+    db = SessionLocal()
+    try:
+        restaurant = crud.get_one(db, Restaurant, restaurant_id)
+        if restaurant is None:
+            return None
+        items = [
+            {"id": item.id, "slug": crud.dish_slug(item.slug), "name": item.name,
+             "description": item.description, "images": list(item.images or []), "menu_id": menu_id}
+            for item, menu_id in db.execute(
+                select(MenuItem, Category.menu_id).join(Category).where(Category.restaurant_id == restaurant_id)
+            )
+        ]
+        return {"restaurant_name": restaurant.name, "items": items}
+    finally:
+        db.close()
+
+def save_item_images(items: List[dict]) -> None:
+    db = SessionLocal()
+    try:
+        crud.set_menu_item_images(db, {item["id"]: item["images"] for item in items})
+    finally:
+        db.close()
+
+def set_menu_statuses(menu_ids, status: str) -> None:
+    db = SessionLocal()
+    try:
+        for menu_id in menu_ids:
+            crud.set_menu_enrichment(db, menu_id, status)
+    finally:
+        db.close()
+
+def select_restaurant_items(restaurant: Dict[str, Any], slugs: Union[List[str], str], refresh: bool) -> tuple:
+    """(items to look up, items already enriched, missing slugs) for a stored restaurant."""
+    items, missing = _select({_normalize_slug(item["slug"]): item for item in restaurant["items"]}, slugs)
+    if refresh:
+        return items, [], missing
+    return [i for i in items if not i["images"]], [i for i in items if i["images"]], missing
+
+async def enrich_restaurant_events(
+    restaurant: Dict[str, Any], slugs: Union[List[str], str] = "all", images_per_item: int = 1, refresh: bool = False,
+    batch_size: int = ENRICH_BATCH_SIZE,
+) -> AsyncIterator[tuple]:
+    """
+    Enriches a stored restaurant's dishes, yielding ("missing", {"slug"}) for unknown slugs,
+    ("item", {"slug", "images"}) as each dish's images arrive (already-enriched dishes first),
+    and ("done", summary) at the end.
+
+    Images are saved every batch_size dishes, and whatever was fetched is saved even when the
+    caller stops early (a streaming client disconnecting), so no paid lookup is thrown away.
+    Enriching "all" also moves the menus' Menu.enriched like the worker does: in_progress
+    while running, then done (or failed if no dish got images); back to pending if cut short.
+    """
+    to_fetch, ready, missing = select_restaurant_items(restaurant, slugs, refresh)
+    menu_ids = {item["menu_id"] for item in restaurant["items"]} if slugs == "all" else set()
+    for slug in missing:
+        yield "missing", {"slug": slug}
+    for item in ready:
+        yield "item", {"slug": item["slug"], "images": item["images"]}
+
+    by_slug = {item["slug"]: item for item in to_fetch}
+    unsaved, saved, finished = [], set(), False
+    if menu_ids:
+        await run_in_threadpool(set_menu_statuses, menu_ids, "in_progress")
+    try:
+        async for result in iter_item_images(to_fetch, restaurant["restaurant_name"], images_per_item):
+            unsaved.append(by_slug[result["slug"]])
+            if len(unsaved) >= batch_size:
+                batch, unsaved = unsaved, []
+                await run_in_threadpool(save_item_images, [item for item in batch if item["images"]])
+                saved.update(item["id"] for item in batch)
+                if menu_ids:
+                    await run_in_threadpool(set_menu_statuses, menu_ids, "in_progress")
+            yield "item", result
+        finished = True
+    finally:
+        # Also lookups that finished but weren't streamed yet; shielded, because a disconnect
+        # cancels this generator and those lookups are already paid for
+        rest = [item for item in to_fetch if item["id"] not in saved and item["images"]]
+        if rest:
+            await asyncio.shield(run_in_threadpool(save_item_images, rest))
+        if menu_ids and not finished:
+            await asyncio.shield(run_in_threadpool(set_menu_statuses, menu_ids, "pending"))
+
+    for menu_id in menu_ids:
+        fetched = [item for item in to_fetch if item["menu_id"] == menu_id]
+        failed = fetched and not any(item["images"] for item in fetched)
+        await run_in_threadpool(set_menu_statuses, [menu_id], "failed" if failed else "done")
+    yield "done", {"enriched": len(ready) + len(to_fetch), "fetched": len(to_fetch), "missing": missing}
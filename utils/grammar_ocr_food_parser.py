@@ -1,29 +1,25 @@
 import os
 import json
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel
+import hashlib
 from dotenv import load_dotenv
-
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = r"C:\Users\Param\Documents\Credentials\my-vertexai-project-464302-302be09a449a.json"
-
+from utils.registry import models
+from utils.metrics import timed
 
 # --- Set environment variables BEFORE importing vertexai ---
+# GOOGLE_APPLICATION_CREDENTIALS comes from .env (or the real environment) like everything else
 load_dotenv()  # Loads from .env by default
 
-# Now access them like this:
-GOOGLE_VERTEX_LOCATION = os.environ["GOOGLE_VERTEX_LOCATION"]
-GOOGLE_VERTEX_PROJECT = os.environ["GOOGLE_VERTEX_PROJECT"]
+# Now access them like this (missing values only fail once the model is first loaded):
+GOOGLE_VERTEX_LOCATION = os.getenv("GOOGLE_VERTEX_LOCATION")
+GOOGLE_VERTEX_PROJECT = os.getenv("GOOGLE_VERTEX_PROJECT")
 
 # --- Config ---
 PROJECT_ID = GOOGLE_VERTEX_PROJECT
 LOCATION = GOOGLE_VERTEX_LOCATION
 OUTPUT_FILE = "output_menu.json"
+MODEL_NAME = "gemini-2.0-flash-lite"
 
-# --- Menu Parser Function ---
-def extract_menu_data(raw_text: str) -> dict:
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-
-    system_prompt = """
+SYSTEM_PROMPT = """
         You are an AI that parses OCR-scanned restaurant menus into clean, structured JSON for use in apps, image generation systems, and databases.
 
         Your responsibilities:
@@ -111,12 +107,36 @@ def extract_menu_data(raw_text: str) -> dict:
         - Format all output as valid, clean JSON suitable for use in production systems.
     """
 
-    model = GenerativeModel("gemini-2.0-flash-lite")
+# Change whenever the prompt or model does, so cached parses never outlive them
+PROMPT_HASH = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16]
+PROMPT_VERSION = hashlib.sha256(f"{MODEL_NAME}\n{SYSTEM_PROMPT}".encode("utf-8")).hexdigest()[:16]
+
+# --- Model Loading ---
+def _load_llm():
+    if not PROJECT_ID or not LOCATION:
+        raise RuntimeError("GOOGLE_VERTEX_PROJECT and GOOGLE_VERTEX_LOCATION must be set")
+
+    # vertexai is slow to import, so it only happens the first time the model is needed
+    import vertexai
+    from vertexai.preview.generative_models import GenerativeModel
+
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return GenerativeModel(MODEL_NAME)
+
+models.register("llm", _load_llm)
 
-    response = model.generate_content([
-        system_prompt.strip(),
+def _prompt_contents(raw_text: str) -> list:
+    return [
+        SYSTEM_PROMPT.strip(),
         f"Here is the raw OCR text from a restaurant menu:\n\n{raw_text.strip()}"
-    ])
+    ]
+
+# --- Menu Parser Function ---
+@timed("llm")
+def extract_menu_data(raw_text: str) -> dict:
+    model = models.get("llm")
+
+    response = model.generate_content(_prompt_contents(raw_text))
 
     content = response.text.strip()
 
@@ -131,11 +151,6 @@ def extract_menu_data(raw_text: str) -> dict:
             item["images"] = item.get("images", [])
             item["id"] = str(idx)
 
-        # 💾 Save to file
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(parsed_data, f, indent=2)
-        print(f"✅ Output saved to: {OUTPUT_FILE}")
-
         return parsed_data
 
     except Exception as e:
@@ -143,6 +158,14 @@ def extract_menu_data(raw_text: str) -> dict:
         print("Raw response:", content)
         return {}
 
+# --- Streaming Variant ---
+def stream_menu_text(raw_text: str):
+    """Yields the model's JSON output piece by piece as it's generated (see utils/menu_stream.py)."""
+    model = models.get("llm")
+    for chunk in model.generate_content(_prompt_contents(raw_text), stream=True):
+        if chunk.text:
+            yield chunk.text
+
 # --- Example usage ---
 if __name__ == "__main__":
     sample_text = """
@@ -160,3 +183,8 @@ if __name__ == "__main__":
 
     result = extract_menu_data(sample_text)
     print(json.dumps(result, indent=2))
+
+    # 💾 Save to file
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"✅ Output saved to: {OUTPUT_FILE}")
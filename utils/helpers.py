@@ -1,17 +1,10 @@
 # utils/helpers.py
 
+import io
 import os
-import shutil
 import json
+import zipfile
 from datetime import datetime
-from fastapi import UploadFile
-
-def save_uploaded_file(file: UploadFile, save_dir: str = "temp") -> str:
-    os.makedirs(save_dir, exist_ok=True)
-    temp_path = f"{save_dir}/{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return temp_path
 
 def save_json(data: dict, filename_prefix: str, save_dir: str = "saved") -> None:
     os.makedirs(save_dir, exist_ok=True)
@@ -19,3 +12,48 @@ def save_json(data: dict, filename_prefix: str, save_dir: str = "saved") -> None
     filename = f"{save_dir}/{filename_prefix}_{timestamp}.json"
     with open(filename, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+
+def expand_menu_pages(uploads: list, max_page_bytes: int | None = None, max_pages: int | None = None,
+                      max_total_bytes: int | None = None) -> list:
+    """
+    Flattens (bytes, filename) uploads into page order, unpacking any zip archive by member name.
+
+    Raises ValueError when a page, the page count or the total unpacked size is over its
+    limit. Archives are checked from their member headers before anything is decompressed
+    (zipfile never inflates a member past its declared size).
+    """
+    entries, archives = [], []
+    try:
+        for data, filename in uploads:
+            if zipfile.is_zipfile(io.BytesIO(data)):
+                archive = zipfile.ZipFile(io.BytesIO(data))
+                archives.append(archive)
+                members = sorted(
+                    (info for info in archive.infolist()
+                     if info.filename.lower().endswith(IMAGE_EXTENSIONS) and not info.filename.startswith("__MACOSX/")),
+                    key=lambda info: info.filename,
+                )
+                oversized = [info.filename for info in members if max_page_bytes and info.file_size > max_page_bytes]
+                if oversized:
+                    raise ValueError(f"Pages too large in {filename}: {', '.join(oversized)}")
+                entries.extend((archive, info, info.file_size) for info in members)
+            else:
+                entries.append((None, (data, filename), len(data)))
+
+        if max_pages and len(entries) > max_pages:
+            raise ValueError(f"Too many pages: {len(entries)} (limit {max_pages})")
+        total = sum(size for _, _, size in entries)
+        if max_total_bytes and total > max_total_bytes:
+            raise ValueError(
+                f"Pages too large: {total // (1024 * 1024)} MB unpacked (limit {max_total_bytes // (1024 * 1024)} MB)"
+            )
+
+        return [
+            (archive.read(entry), os.path.basename(entry.filename)) if archive else entry
+            for archive, entry, _ in entries
+        ]
+    finally:
+        for archive in archives:
+            archive.close()
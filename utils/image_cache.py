@@ -0,0 +1,75 @@
+# utils/image_cache.py
+#
+# Custom Search results keyed by the dish (or restaurant) they were fetched for, so
+# re-enriching a menu, or calling /enrich_menu/ again for a slug, costs no quota.
+#
+#   python -m utils.image_cache stats
+#   python -m utils.image_cache purge [--expired]
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+from utils.cache import DiskCache
+
+# Cache "margherita pizza" once for every restaurant instead of once per restaurant.
+# Cheaper, but a chain's own photos can then show up on another restaurant's menu.
+IMAGE_CACHE_SHARE_DISHES = os.getenv("IMAGE_CACHE_SHARE_DISHES", "false").lower() == "true"
+
+image_cache = DiskCache(
+    os.getenv("IMAGE_CACHE_PATH", "cache/image_search.sqlite3"),
+    max_bytes=int(os.getenv("IMAGE_CACHE_MAX_MB", "32")) * 1024 * 1024,
+    ttl=float(os.getenv("IMAGE_CACHE_TTL_DAYS", "14")) * 24 * 3600,
+)
+
+
+def normalize_query_part(text: str) -> str:
+    """Lowercase, accents folded, punctuation dropped, whitespace collapsed: "Crème Brûlée!" -> "creme brulee"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text)).strip()
+
+
+def _exclusions_hash(exclusions: list) -> str:
+    # A changed BAD_DOMAINS list would have filtered results differently
+    return hashlib.sha256(",".join(sorted(exclusions)).encode("utf-8")).hexdigest()[:8]
+
+
+def dish_cache_key(name: str, restaurant: str, num_images: int, exclusions: list,
+                   share_dishes: bool = IMAGE_CACHE_SHARE_DISHES) -> str:
+    owner = "*" if share_dishes else normalize_query_part(restaurant)
+    return f"dish:{normalize_query_part(name)}|{owner}|{num_images}|{_exclusions_hash(exclusions)}"
+
+
+def restaurant_cache_key(restaurant: str, location: str, num_images: int, exclusions: list) -> str:
+    return (f"restaurant:{normalize_query_part(restaurant)}|{normalize_query_part(location)}"
+            f"|{num_images}|{_exclusions_hash(exclusions)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and purge the image search cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    purge_parser = commands.add_parser("purge")
+    purge_parser.add_argument("--expired", action="store_true", help="only entries past their TTL")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        print(json.dumps({
+            "path": image_cache.path,
+            **image_cache.stats(),
+            "ttl_seconds": image_cache.ttl,
+            "share_dishes": IMAGE_CACHE_SHARE_DISHES,
+        }, indent=2))
+    elif args.command == "purge":
+        if args.expired:
+            print(f"🧹 Purged {image_cache.purge_expired()} expired entries")
+        else:
+            print(f"🧹 Purged {image_cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,34 @@
+import asyncio
+import random
+import weakref
+import httpx
 import requests
 import json
-import time
 from dotenv import load_dotenv
 import os
+from utils.metrics import metrics, timed
+from utils.rate_limit import TokenBucket
+from utils.image_cache import image_cache, dish_cache_key, restaurant_cache_key
 
 load_dotenv()
 
-# Access environment variables
-CSE_ID = os.environ["CSE_ID"]
-API_KEY = os.environ["API_KEY"]
+# Access environment variables (only image search needs them, so the app boots without them)
+CSE_ID = os.getenv("CSE_ID")
+API_KEY = os.getenv("API_KEY")
+# Point at a local stand-in to run enrichment offline (see benchmarks/fakes.py)
+CSE_ENDPOINT = os.getenv("CSE_ENDPOINT", "https://www.googleapis.com/customsearch/v1")
+
+# Custom Search allows 100 queries/minute per project by default; raise this with the quota
+CSE_QUERIES_PER_MINUTE = float(os.getenv("CSE_QUERIES_PER_MINUTE", "100"))
+CSE_BURST = int(os.getenv("CSE_BURST", "10"))
+CSE_CONCURRENCY = int(os.getenv("CSE_CONCURRENCY", "8"))
+CSE_TIMEOUT = float(os.getenv("CSE_TIMEOUT", "10"))
+CSE_MAX_RETRIES = int(os.getenv("CSE_MAX_RETRIES", "3"))
+CSE_BACKOFF = float(os.getenv("CSE_BACKOFF", "0.5"))
+# Longest single wait between attempts, whatever Retry-After asks for
+CSE_MAX_BACKOFF = float(os.getenv("CSE_MAX_BACKOFF", "10"))
+# Budget for one lookup, retries and backoff included; past it the item gets no images
+CSE_ITEM_TIMEOUT = float(os.getenv("CSE_ITEM_TIMEOUT", "30"))
 
 BAD_DOMAINS = [
     "lookaside.fbsbx.com",
@@ -16,19 +36,33 @@ BAD_DOMAINS = [
     "tiktok.com"
 ]
 
-def fetch_image_links(query: str, num_images: int = 6) -> list:
-    """Fetch image URLs from Google Custom Search for a given query, excluding known bad domains."""
+image_search_retries = metrics.counter(
+    "prevu_image_search_retries_total", "Custom Search requests retried, by cause.", labels=("reason",)
+)
+
+_session = requests.Session()
+
+def _search_params(query: str, num_images: int) -> dict:
     exclusions = " ".join(f"-site:{domain}" for domain in BAD_DOMAINS)
-    full_query = f"{query} {exclusions}"
+    return {
+        "q": f"{query} {exclusions}",
+        "num": num_images,
+        "start": 1,
+        "imgSize": "huge",
+        "searchType": "image",
+        "key": API_KEY,
+        "cx": CSE_ID,
+    }
 
-    url = (
-        f"https://www.googleapis.com/customsearch/v1?"
-        f"q={full_query}&num={num_images}&start=1&imgSize=huge&searchType=image&"
-        f"key={API_KEY}&cx={CSE_ID}"
-    )
+@timed("image_search")
+def fetch_image_links(query: str, num_images: int = 6) -> list:
+    """Fetch image URLs from Google Custom Search for a given query, excluding known bad domains."""
+    if not CSE_ID or not API_KEY:
+        print(f"❌ CSE_ID / API_KEY not set; skipping image search for '{query}'")
+        return []
 
     try:
-        response = requests.get(url)
+        response = _session.get(CSE_ENDPOINT, params=_search_params(query, num_images), timeout=CSE_TIMEOUT)
         response.raise_for_status()
         data = response.json()
         return [item["link"] for item in data.get("items", [])]
@@ -36,31 +70,185 @@ def fetch_image_links(query: str, num_images: int = 6) -> list:
         print(f"❌ Error fetching images for '{query}': {e}")
         return []
 
-def enrich_menu_with_images(menu_data: dict) -> dict:
-    restaurant = menu_data.get("restaurant_name", "")
-    location = menu_data.get("location", "")
-
-    # 🏞️ Add a restaurant-level image
-    if restaurant:
-        restaurant_query = f"{restaurant} restaurant {location}".strip()
-        print(f"🏞️ Fetching top-level restaurant image for: {restaurant_query}")
-        images = fetch_image_links(restaurant_query)
-        menu_data["restaurant_image"] = images[0] if images else ""
-    else:
-        print("⚠️ No restaurant name found; skipping top-level image.")
-        menu_data["restaurant_image"] = ""
-
-    # 🖼️ Add images for each dish
-    for category in menu_data.get("menu", []):
-        for item in category.get("items", []):
+class ImageSearchClient:
+    """
+    Async Custom Search client: one pooled connection set, a token bucket sized to the
+    quota, bounded concurrency, and retries with exponential backoff on 429/5xx.
+
+    Bound to the event loop it is first used on; use get_image_search_client() inside
+    the app, or `async with ImageSearchClient() as client` in scripts.
+
+    Args:
+        queries_per_minute (float): Sustained request rate, retries included.
+        burst (int): Requests allowed back to back before the rate applies.
+        concurrency (int): Requests in flight at once.
+        timeout (float): Seconds allowed per attempt before it counts as failed.
+        max_retries (int): Extra attempts after a 429, 5xx, timeout or connection error.
+        backoff (float): Base delay in seconds, doubled on every retry (with jitter).
+        max_backoff (float): Cap on any one delay, Retry-After included.
+        item_timeout (float): Seconds allowed per lookup across all its attempts.
+    """
+
+    def __init__(
+        self,
+        queries_per_minute: float = CSE_QUERIES_PER_MINUTE,
+        burst: int = CSE_BURST,
+        concurrency: int = CSE_CONCURRENCY,
+        timeout: float = CSE_TIMEOUT,
+        max_retries: int = CSE_MAX_RETRIES,
+        backoff: float = CSE_BACKOFF,
+        max_backoff: float = CSE_MAX_BACKOFF,
+        item_timeout: float = CSE_ITEM_TIMEOUT,
+    ):
+        self.bucket = TokenBucket(queries_per_minute / 60, capacity=burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.item_timeout = item_timeout
+        self.requests = 0
+        self.retries = 0
+        self._pending: dict = {}
+        self.http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5), self.max_backoff)
+
+    @timed("image_search")
+    async def fetch_image_links(self, query: str, num_images: int = 6) -> list:
+        """Same contract as fetch_image_links: image URLs for the query, or [] on failure."""
+        if not CSE_ID or not API_KEY:
+            print(f"❌ CSE_ID / API_KEY not set; skipping image search for '{query}'")
+            return []
+        try:
+            return await asyncio.wait_for(self._fetch_with_retries(query, num_images), self.item_timeout)
+        except asyncio.TimeoutError:
+            print(f"❌ Giving up on images for '{query}' after {self.item_timeout:g}s")
+            return []
+
+    async def _fetch_with_retries(self, query: str, num_images: int) -> list:
+        params = _search_params(query, num_images)
+        for attempt in range(self.max_retries + 1):
+            # Hold a concurrency slot only for the call itself; backing off shouldn't stall other lookups
+            async with self.semaphore:
+                await self.bucket.acquire()
+                self.requests += 1
+                response, reason = None, None
+                try:
+                    response = await self.http.get(CSE_ENDPOINT, params=params)
+                    if response.status_code == 429 or response.status_code >= 500:
+                        reason = str(response.status_code)
+                    else:
+                        response.raise_for_status()
+                        return [item["link"] for item in response.json().get("items", [])]
+                except httpx.TimeoutException:
+                    reason = "timeout"
+                except httpx.TransportError:
+                    reason = "connection"
+                except Exception as e:
+                    print(f"❌ Error fetching images for '{query}': {e}")
+                    return []
+
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            image_search_retries.inc(1, reason)
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+        print(f"❌ Giving up on images for '{query}' after {self.max_retries + 1} attempts ({reason})")
+        return []
+
+    async def _cached_fetch(self, key: str, query: str, num_images: int) -> list:
+        images = await asyncio.to_thread(image_cache.get, key)
+        if images is not None:
+            return images
+        # The same dish twice in one menu (or two concurrent requests) shares one lookup
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        pending = self._pending[key] = asyncio.ensure_future(self.fetch_image_links(query, num_images))
+        try:
+            images = await asyncio.shield(pending)
+        finally:
+            self._pending.pop(key, None)
+        if images:  # failures aren't cached, so the next call tries again
+            await asyncio.to_thread(image_cache.set, key, images)
+        return images
+
+    async def fetch_dish_images(self, name: str, description: str, restaurant: str, num_images: int = 6) -> list:
+        """Images for one dish, served from image_cache when this dish was looked up before."""
+        query = f"{name} - {description or ''} - {restaurant}".strip(" -")
+        key = dish_cache_key(name, restaurant, num_images, BAD_DOMAINS)
+        return await self._cached_fetch(key, query, num_images)
+
+    async def fetch_restaurant_images(self, restaurant: str, location: str, num_images: int = 6) -> list:
+        query = f"{restaurant} restaurant {location}".strip()
+        key = restaurant_cache_key(restaurant, location, num_images, BAD_DOMAINS)
+        return await self._cached_fetch(key, query, num_images)
+
+    async def enrich_menu(self, menu_data: dict, images_per_item: int = 6) -> dict:
+        """Adds "restaurant_image" and every item's "images", fetching them all concurrently."""
+        restaurant = menu_data.get("restaurant_name", "")
+        location = menu_data.get("location", "")
+
+        async def restaurant_image():
+            if not restaurant:
+                print("⚠️ No restaurant name found; skipping top-level image.")
+                return ""
+            print(f"🏞️ Fetching top-level restaurant image for: {restaurant} {location}".rstrip())
+            images = await self.fetch_restaurant_images(restaurant, location)
+            return images[0] if images else ""
+
+        async def item_images(item: dict):
             name = item.get("name", "")
-            desc = item.get("description", "")
-            query = f"{name} - {desc} - {restaurant}".strip(" -")
-            print(f"🔍 Fetching images for: {query}")
-            item["images"] = fetch_image_links(query)
-            time.sleep(1)
+            print(f"🔍 Fetching images for: {name}")
+            item["images"] = await self.fetch_dish_images(name, item.get("description", ""), restaurant, images_per_item)
+
+        items = [item for category in menu_data.get("menu", []) for item in category.get("items", [])]
+        menu_data["restaurant_image"], *_ = await asyncio.gather(
+            restaurant_image(), *(item_images(item) for item in items)
+        )
+        return menu_data
+
+# One client per event loop; httpx pools and asyncio primitives can't cross loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ImageSearchClient]" = weakref.WeakKeyDictionary()
 
-    return menu_data
+def get_image_search_client() -> ImageSearchClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = ImageSearchClient()
+    return client
+
+async def close_image_search_client() -> None:
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def enrich_menu_with_images_async(menu_data: dict) -> dict:
+    return await get_image_search_client().enrich_menu(menu_data)
+
+def enrich_menu_with_images(menu_data: dict) -> dict:
+    """Blocking wrapper for scripts; inside the app await enrich_menu_with_images_async instead."""
+    async def run():
+        async with ImageSearchClient() as client:
+            return await client.enrich_menu(menu_data)
+    return asyncio.run(run())
 
 def process_files(input_file: str, output_file: str):
     """Load JSON from input_file, enrich with images, and save to output_file."""
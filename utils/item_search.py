@@ -0,0 +1,324 @@
+# utils/item_search.py
+
+import argparse
+import math
+import os
+import re
+import threading
+from array import array
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import String, case, func, literal, literal_column, or_, select, update
+from sqlalchemy.orm import Session
+
+from database.models import Category, MenuItem, menu_item_search_document
+
+# Page size for GET /search/items when ?limit= isn't given
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = 100
+
+# Score added when a query word is one of the item's tags (on top of ts_rank_cd on Postgres)
+TAG_WEIGHT = 0.5
+# In-process field weights, mirroring setweight 'A' (name) and 'B' (description)
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+STOPWORDS = {"a", "an", "and", "the", "of", "with", "in", "on", "or", "for", "to", "our", "served"}
+
+
+def stem(word: str) -> str:
+    # Just enough to fold plurals ("tacos" -> "taco", "berries" -> "berry", "tomatoes" -> "tomato"); Postgres uses the english stemmer
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: Optional[str]) -> list:
+    return [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in STOPWORDS]
+
+
+def search_terms(text: Optional[str]) -> list:
+    return list(dict.fromkeys(stem(w) for w in _words(text)))
+
+
+def normalize_tag(tag: str) -> str:
+    # Applied once when a menu is stored: "Gluten Free" and "gluten_free" are both "gluten-free"
+    return re.sub(r"[\s_]+", "-", tag.strip().lower())
+
+
+def normalize_tags(tags) -> list:
+    return list(dict.fromkeys(tag for tag in map(normalize_tag, tags or []) if tag))
+
+
+def tag_terms(text: Optional[str]) -> list:
+    """The tags a query hits: each word as typed and stemmed, so "tacos" finds a "tacos" or "taco" tag."""
+    return list(dict.fromkeys(form for w in _words(text) for form in (w, stem(w))))
+
+
+class ItemSearchIndex:
+    """
+    In-process inverted index over menu items for databases without full-text search.
+
+    Postgres answers searches from tsvector/GIN indexes; SQLite (local runs, benchmarks)
+    uses this instead of scanning every row with LIKE. Postings are compact int/float
+    arrays per term, scored with numpy. Items are keyed by slug, which is what the
+    ingest upsert keys on, and search returns slugs for the caller to load.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._slugs: list = []
+        self._slots: dict = {}
+        self._prices = array("d")
+        self._terms: dict = {}
+        self._tags: dict = {}
+        self._arrays: dict = {}
+        self._columns = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, rows) -> None:
+        """Adds or replaces items given as mappings with slug, name, description, tags and price."""
+        with self._lock:
+            for row in rows:
+                self.remove([row["slug"]])
+                slot = len(self._slugs)
+                self._slugs.append(row["slug"])
+                self._slots[row["slug"]] = slot
+                self._prices.append(row["price"] if row.get("price") is not None else math.nan)
+
+                weights = {}
+                for term in search_terms(row.get("description")):
+                    weights[term] = DESCRIPTION_WEIGHT
+                for term in search_terms(row.get("name")):
+                    weights[term] = weights.get(term, 0.0) + NAME_WEIGHT
+                for term, weight in weights.items():
+                    slots, term_weights = self._terms.setdefault(term, (array("i"), array("f")))
+                    slots.append(slot)
+                    term_weights.append(weight)
+                    self._arrays.pop(term, None)
+                for tag in normalize_tags(row.get("tags")):
+                    self._tags.setdefault(tag, array("i")).append(slot)
+                    self._arrays.pop(("tag", tag), None)
+            self._columns = None
+
+    def remove(self, slugs) -> None:
+        with self._lock:
+            for slug in slugs:
+                slot = self._slots.pop(slug, None)
+                if slot is not None:
+                    self._slugs[slot] = None
+                    self._columns = None
+
+    def load(self, rows) -> None:
+        with self._lock:
+            self._slugs.clear()
+            self._slots.clear()
+            self._prices = array("d")
+            self._terms.clear()
+            self._tags.clear()
+            self._arrays.clear()
+            self.add(rows)
+            self.loaded = True
+
+    def _postings(self, term: str) -> tuple:
+        cached = self._arrays.get(term)
+        if cached is None:
+            slots, weights = self._terms[term]
+            cached = self._arrays[term] = (np.array(slots, dtype=np.int32), np.array(weights, dtype=np.float32))
+        return cached
+
+    def _tag_postings(self, tag: str) -> np.ndarray:
+        cached = self._arrays.get(("tag", tag))
+        if cached is None:
+            cached = self._arrays[("tag", tag)] = np.array(self._tags.get(tag, ()), dtype=np.int32)
+        return cached
+
+    def _live_columns(self) -> tuple:
+        if self._columns is None:
+            live = np.fromiter((slug is not None for slug in self._slugs), dtype=bool, count=len(self._slugs))
+            self._columns = (live, np.array(self._prices, dtype=np.float64))
+        return self._columns
+
+    def search(self, q: Optional[str], tags=(), max_price: Optional[float] = None, offset: int = 0, limit: int = SEARCH_PAGE_SIZE) -> tuple:
+        """
+        Returns ([(slug, score)], has_more) for one page.
+
+        Items match when every query word is in the name or description, or when a query
+        word is one of their tags (see tag_terms); `tags` then narrows to items carrying all
+        of them. _postgres_search applies the same rules.
+        """
+        terms = search_terms(q)
+        tags = normalize_tags(tags)
+        with self._lock:
+            live, prices = self._live_columns()
+            if terms:
+                total = max(len(self), 1)
+                text_slots, text_scores = [], []
+                for term in terms:
+                    if term in self._terms:
+                        slots, weights = self._postings(term)
+                        text_slots.append(slots)
+                        text_scores.append(weights * math.log(1 + total / len(slots)))
+                tag_slots = [self._tag_postings(tag) for tag in tag_terms(q) if tag in self._tags]
+                if not text_slots and not tag_slots:
+                    return [], False
+                slots, inverse = np.unique(np.concatenate(text_slots + tag_slots), return_inverse=True)
+                n_text = sum(map(len, text_slots))
+                term_hits = np.bincount(inverse[:n_text], minlength=len(slots))
+                tag_hit = np.bincount(inverse[n_text:], minlength=len(slots)) > 0
+                # A tag hit scores TAG_WEIGHT once however many query words hit tags, as on Postgres
+                scores = np.bincount(inverse[:n_text], weights=np.concatenate(text_scores or [[]]), minlength=len(slots))
+                scores = scores + np.where(tag_hit, TAG_WEIGHT, 0.0)
+                keep = (term_hits == len(terms)) | tag_hit
+                slots, scores = slots[keep], scores[keep]
+            elif tags:
+                slots = self._tag_postings(tags[0])
+                scores = np.zeros(len(slots))
+            else:
+                return [], False
+
+            keep = live[slots]
+            for tag in tags:
+                keep &= np.isin(slots, self._tag_postings(tag), assume_unique=True)
+            if max_price is not None:
+                keep &= prices[slots] <= max_price
+            slots, scores = slots[keep], scores[keep]
+
+            order = np.lexsort((slots, -scores))[offset:offset + limit + 1]
+            page = [(self._slugs[slot], float(scores[i])) for i, slot in zip(order.tolist(), slots[order].tolist())]
+        return page[:limit], len(page) > limit
+
+
+item_search_index = ItemSearchIndex()
+
+
+def _ensure_loaded(db: Session) -> ItemSearchIndex:
+    if not item_search_index.loaded:
+        with item_search_index._lock:
+            if not item_search_index.loaded:
+                rows = db.execute(
+                    select(MenuItem.slug, MenuItem.name, MenuItem.description, MenuItem.tags, MenuItem.price)
+                    .execution_options(yield_per=10000)
+                ).mappings()
+                item_search_index.load(rows)
+    return item_search_index
+
+
+def index_menu_items(rows) -> None:
+    """Keeps a loaded in-process index current after ingest; an unloaded one reads the DB later."""
+    if item_search_index.loaded:
+        item_search_index.add(rows)
+
+
+def unindex_menu_items(slugs) -> None:
+    if item_search_index.loaded:
+        item_search_index.remove(slugs)
+
+
+def _postgres_search(db: Session, q, tags, max_price, offset, limit) -> tuple:
+    from sqlalchemy.dialects.postgresql import array as pg_array
+
+    filters, score = [], literal(0.0)
+    terms = search_terms(q)
+    if terms:
+        document = menu_item_search_document(MenuItem.name, MenuItem.description)
+        query = func.plainto_tsquery(literal_column("'english'"), " ".join(_words(q)))
+        tag_hit = MenuItem.tags.overlap(pg_array(tag_terms(q), type_=String))
+        filters.append(or_(document.op("@@")(query), tag_hit))
+        score = func.ts_rank_cd(document, query) + case((tag_hit, TAG_WEIGHT), else_=0.0)
+    if tags:
+        filters.append(MenuItem.tags.contains(pg_array(normalize_tags(tags), type_=String)))
+    if max_price is not None:
+        filters.append(MenuItem.price <= max_price)
+
+    score = score.label("score")
+    statement = (
+        select(MenuItem, Category.restaurant_id, score)
+        .join(Category)
+        .where(*filters)
+        .order_by(score.desc(), MenuItem.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    rows = [tuple(row) for row in db.execute(statement)]
+    return rows[:limit], len(rows) > limit
+
+
+def search_menu_items(db: Session, q: Optional[str] = None, tags=(), max_price: Optional[float] = None,
+                      offset: int = 0, limit: int = SEARCH_PAGE_SIZE) -> tuple:
+    """
+    One page of ranked matches as ([(MenuItem, restaurant_id, score)], has_more).
+
+    Postgres runs a tsvector/GIN query; anything else goes through the in-process index
+    and loads just the page's rows by slug.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return _postgres_search(db, q, tags, max_price, offset, limit)
+
+    page, has_more = _ensure_loaded(db).search(q, tags, max_price, offset, limit)
+    if not page:
+        return [], has_more
+    found = {
+        item.slug: (item, restaurant_id)
+        for item, restaurant_id in db.execute(
+            select(MenuItem, Category.restaurant_id).join(Category).where(MenuItem.slug.in_([slug for slug, _ in page]))
+        )
+    }
+    return [(*found[slug], score) for slug, score in page if slug in found], has_more
+
+
+def normalize_stored_tags(batch_size: int = 1000) -> int:
+    """Rewrites tags stored before normalize_tags ran at write time; returns how many items changed."""
+    from database.db import SessionLocal
+
+    changed, last_id = 0, None
+    db = SessionLocal()
+    try:
+        while True:
+            statement = select(MenuItem.id, MenuItem.tags).order_by(MenuItem.id).limit(batch_size)
+            if last_id is not None:
+                statement = statement.where(MenuItem.id > last_id)
+            rows = db.execute(statement).all()
+            if not rows:
+                return changed
+            last_id = rows[-1].id
+            updates = [
+                {"id": row.id, "tags": normalize_tags(row.tags), "updated_at": datetime.utcnow()}
+                for row in rows if row.tags and normalize_tags(row.tags) != list(row.tags)
+            ]
+            if updates:
+                db.execute(update(MenuItem), updates)
+                db.commit()
+            changed += len(updates)
+    finally:
+        db.close()
+
+
+def main():
+    # Existing Postgres databases predate the search indexes; create_all only adds them to new tables
+    parser = argparse.ArgumentParser(description="Menu item search indexes")
+    parser.add_argument("command", choices=["create-indexes", "normalize-tags"])
+    args = parser.parse_args()
+
+    if args.command == "normalize-tags":
+        print(f"✅ normalised tags of {normalize_stored_tags()} items")
+        return
+
+    from database.db import engine
+    for index in MenuItem.__table__.indexes:
+        if index.name in ("ix_menu_items_search", "ix_menu_items_tags"):
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ {index.name}")
+
+
+if __name__ == "__main__":
+    main()
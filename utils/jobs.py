@@ -0,0 +1,117 @@
+# utils/jobs.py
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from utils.metrics import metrics
+
+
+class Job:
+    """Tracks one unit of background work: its current stage, per-stage timings and outcome."""
+
+    def __init__(self, kind: str):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"  # queued -> running -> done / failed
+        self.stage: Optional[str] = None
+        self.timings: dict = {}
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    @contextmanager
+    def track(self, stage: str):
+        self.stage = stage
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = round(time.perf_counter() - start, 4)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "timings": dict(self.timings),
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Runs blocking work (OCR, LLM calls, DB writes) on a bounded thread pool.
+
+    Args:
+        max_workers (int): Number of jobs allowed to run at once; the rest wait in the queue.
+        max_jobs (int): How many jobs to remember for status lookups before the oldest finished ones are dropped.
+    """
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 1000):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs); its return value becomes job.result."""
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        job.status = "running"
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+    def _prune(self) -> None:
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at is not None]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
+
+
+job_queue = JobQueue(
+    max_workers=int(os.getenv("PARSE_WORKERS", "2")),
+    max_jobs=int(os.getenv("JOB_HISTORY_SIZE", "1000")),
+)
+
+metrics.gauge("prevu_jobs_in_flight", "Parse jobs queued or running.", job_queue.in_flight)
+metrics.gauge("prevu_job_workers", "Threads available to run parse jobs.", lambda: job_queue.max_workers)
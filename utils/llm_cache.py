@@ -0,0 +1,132 @@
+# utils/llm_cache.py
+#
+# Cache in front of the Vertex menu parse, keyed on what the model actually sees.
+# A re-photographed menu has different image bytes but usually the same OCR text,
+# so the key is built from normalised OCR lines rather than the upload itself.
+#
+#   python -m utils.llm_cache stats
+#   python -m utils.llm_cache list --limit 20
+#   python -m utils.llm_cache show <key>
+#   python -m utils.llm_cache purge [--expired | --stale | --key <key>]
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from typing import Callable
+
+from utils.cache import DiskCache
+from utils.grammar_ocr_food_parser import MODEL_NAME, PROMPT_HASH
+
+# OCR lines below this confidence are noise that differs between photos of the same menu
+LLM_CACHE_MIN_ACCURACY = float(os.getenv("LLM_CACHE_MIN_ACCURACY", "0.6"))
+
+llm_cache = DiskCache(
+    os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3"),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "128")) * 1024 * 1024,
+    ttl=float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+)
+
+
+def normalize_ocr_text(lines: list, min_accuracy: float = LLM_CACHE_MIN_ACCURACY) -> str:
+    """Lowercased, whitespace-collapsed OCR text with low-confidence lines dropped."""
+    normalized = []
+    for line in lines:
+        if isinstance(line, dict):
+            if line.get("accuracy", 1.0) < min_accuracy:
+                continue
+            text = line.get("text", "")
+        else:
+            text = str(line)
+        text = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text).lower()).strip()
+        if text:
+            normalized.append(text)
+    return "\n".join(normalized)
+
+
+def llm_cache_key(lines: list) -> str:
+    text_hash = hashlib.sha256(normalize_ocr_text(lines).encode("utf-8")).hexdigest()
+    # Editing SYSTEM_PROMPT or switching models changes the key, so stale parses are never served
+    return f"{text_hash}:{PROMPT_HASH}:{MODEL_NAME}"
+
+
+def cached_extract_menu_data(lines: list, extract: Callable[[list], dict] | None = None) -> dict:
+    """
+    Returns the cached parse for these OCR lines, or runs extract and caches a non-empty result.
+
+    Args:
+        lines (list): run_ocr output (dicts with "text" and "accuracy").
+        extract (Callable[[list], dict]): The uncached parse; defaults to extract_menu_data_chunked.
+    """
+    if extract is None:
+        from utils.menu_chunker import extract_menu_data_chunked as extract
+
+    key = llm_cache_key(lines)
+    cached_menu = llm_cache.get(key)
+    if cached_menu is not None:
+        return cached_menu
+
+    parsed_menu = extract(lines)
+    if parsed_menu:
+        llm_cache.set(key, parsed_menu)
+    return parsed_menu
+
+
+def _timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and purge the LLM response cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    list_parser = commands.add_parser("list")
+    list_parser.add_argument("--limit", type=int, default=50)
+    show_parser = commands.add_parser("show")
+    show_parser.add_argument("key")
+    purge_parser = commands.add_parser("purge")
+    purge_group = purge_parser.add_mutually_exclusive_group()
+    purge_group.add_argument("--expired", action="store_true", help="only entries past their TTL")
+    purge_group.add_argument("--stale", action="store_true", help="only entries from an older prompt or model")
+    purge_group.add_argument("--key", help="a single entry")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        stats = llm_cache.stats()
+        print(json.dumps({
+            "path": llm_cache.path,
+            "entries": stats["entries"],
+            "bytes": stats["bytes"],
+            "max_bytes": stats["max_bytes"],
+            "ttl_seconds": llm_cache.ttl,
+            "prompt_hash": PROMPT_HASH,
+            "model": MODEL_NAME,
+        }, indent=2))
+    elif args.command == "list":
+        for entry in llm_cache.entries(limit=args.limit):
+            stale = "" if entry["key"].endswith(f":{PROMPT_HASH}:{MODEL_NAME}") else "  (stale prompt/model)"
+            print(f"{entry['key']}  {entry['size']:>8} B  created {_timestamp(entry['created'])}  "
+                  f"used {_timestamp(entry['accessed'])}{stale}")
+    elif args.command == "show":
+        value = llm_cache.get(args.key)
+        if value is None:
+            raise SystemExit(f"❌ No entry for {args.key}")
+        print(json.dumps(value, indent=2, ensure_ascii=False))
+    elif args.command == "purge":
+        if args.expired:
+            print(f"🧹 Purged {llm_cache.purge_expired()} expired entries")
+        elif args.stale:
+            suffix = f":{PROMPT_HASH}:{MODEL_NAME}"
+            stale = [e["key"] for e in llm_cache.entries(limit=-1) if not e["key"].endswith(suffix)]
+            print(f"🧹 Purged {sum(llm_cache.delete(key) for key in stale)} stale entries")
+        elif args.key:
+            print("🧹 Purged 1 entry" if llm_cache.delete(args.key) else f"❌ No entry for {args.key}")
+        else:
+            print(f"🧹 Purged {llm_cache.clear()} entries")
+
+
+if __name__ == "__main__":
+    main()
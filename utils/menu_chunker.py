@@ -0,0 +1,228 @@
+# utils/menu_chunker.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", "3000"))
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "4"))
+
+# Lines before the first section header (restaurant name, address, hours) go to every chunk
+PREAMBLE_MAX_CHARS = 400
+
+PRICE_RE = re.compile(r"(?:\$\s?\d+(?:[.,]\d{1,2})?|\b\d{1,3}[.,]\d{2}\b|^\d{1,3}$)\s*$")
+SECTION_WORDS = {
+    "appetizers", "appetizer", "starters", "small", "plates", "mains", "main", "courses", "entrees",
+    "entrées", "sides", "desserts", "dessert", "beverages", "drinks", "salads", "soups", "sandwiches",
+    "wraps", "specials", "breakfast", "brunch", "lunch", "dinner", "kids", "pasta", "pizza", "burgers",
+}
+TOP_LEVEL_FIELDS = ("restaurant_name", "location", "description", "currency", "last_updated", "restaurant_image")
+
+
+def _line_text(line) -> str:
+    return (line["text"] if isinstance(line, dict) else str(line)).strip()
+
+
+def is_price_line(text: str) -> bool:
+    return bool(PRICE_RE.search(text))
+
+
+def is_section_header(text: str) -> bool:
+    """
+    Short, digit-free, mostly alphabetic lines look like headers when they're in caps, or
+    when they're title case and name a usual menu section (dish names are title case too).
+    """
+    words = text.split()
+    if not words or len(words) > 5 or len(text) > 40 or any(c.isdigit() for c in text):
+        return False
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) < 3 or len(letters) < 0.6 * len(text.replace(" ", "")):
+        return False
+    if text.isupper():
+        return True
+    return all(w[0].isupper() for w in words if w[0].isalpha()) and bool(
+        SECTION_WORDS & set(re.findall(r"[a-z]+", text.lower()))
+    )
+
+
+def split_menu_sections(lines: list, max_chars: int = LLM_CHUNK_CHARS) -> list:
+    """
+    Cuts OCR lines into section-aligned chunks of roughly max_chars each.
+
+    Args:
+        lines (list): run_ocr output (dicts with "text") or plain strings, in reading order.
+        max_chars (int): Soft chunk size; a single oversized section is split after a price line.
+
+    Returns:
+        List[str]: Chunk texts, each prefixed with the menu's preamble for context.
+    """
+    texts = [t for t in (_line_text(line) for line in lines) if t]
+
+    preamble, sections, current = [], [], []
+    for text in texts:
+        if is_section_header(text) and (current or sections or preamble):
+            if current:
+                sections.append(current)
+            current = [text]
+        elif not sections and not current:
+            preamble.append(text)
+        else:
+            current.append(text)
+    if current:
+        sections.append(current)
+
+    # Nothing looked like a header: treat the top lines as preamble and the rest as one section
+    if not sections:
+        return ["\n".join(texts)] if texts else []
+
+    preamble_text = "\n".join(preamble)[:PREAMBLE_MAX_CHARS]
+    budget = max(max_chars - len(preamble_text), max_chars // 2)
+
+    pieces = []
+    for section in sections:
+        piece, size = [], 0
+        for position, text in enumerate(section):
+            piece.append(text)
+            size += len(text) + 1
+            if size >= budget and is_price_line(text) and position < len(section) - 1:
+                pieces.append(piece)
+                # Keep the header on continuation pieces so the model files items under it
+                piece, size = [section[0]], len(section[0]) + 1
+        pieces.append(piece)
+
+    chunks, chunk, size = [], [], 0
+    for piece in pieces:
+        piece_size = sum(len(t) + 1 for t in piece)
+        if chunk and size + piece_size > budget:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.extend(piece)
+        size += piece_size
+    if chunk:
+        chunks.append(chunk)
+
+    return ["\n".join(([preamble_text] if preamble_text else []) + chunk) for chunk in chunks]
+
+
+def slugify(text: str, separator: str = "-") -> str:
+    return re.sub(r"[^a-z0-9]+", separator, (text or "").lower()).strip(separator)
+
+
+# Stored slugs are prefixed with their restaurant's id (utils.crud.scoped_slug)
+SCOPED_SLUG_RE = re.compile(r"^[0-9a-f]{32}-")
+
+
+def dish_slug(slug: str) -> str:
+    """The slug as the parse wrote it, without the restaurant prefix it's stored with."""
+    return SCOPED_SLUG_RE.sub("", slug or "", count=1)
+
+
+def _category_key(name: str) -> str:
+    return slugify((name or "").replace("&", " and "), " ")
+
+
+def merge_partial_menus(partials: list) -> dict:
+    """
+    Merges per-chunk parses into one menu, independent of which chunk finished first.
+
+    Top-level fields take the first non-empty value in chunk order, categories with the
+    same normalised name are folded together, items are deduped by slug within their
+    category (chunks overlap at section boundaries, but two sections can share a dish name),
+    and every item gets a deterministic slug and id derived from its category and name.
+    """
+    merged = {field: None for field in TOP_LEVEL_FIELDS}
+    categories, seen_items = {}, {}
+
+    for partial in partials:
+        if not partial:
+            continue
+        for field in TOP_LEVEL_FIELDS:
+            if merged[field] in (None, "") and partial.get(field) not in (None, ""):
+                merged[field] = partial[field]
+
+        for category_data in partial.get("menu", []):
+            key = _category_key(category_data.get("category", "")) or "other"
+            category = categories.setdefault(key, {
+                "category": category_data.get("category") or "Other",
+                "description": category_data.get("description"),
+                "priority": category_data.get("priority"),
+                "items": [],
+            })
+            if category["description"] is None:
+                category["description"] = category_data.get("description")
+            if category["priority"] is None:
+                category["priority"] = category_data.get("priority")
+
+            for item in category_data.get("items", []):
+                item_key = slugify(item.get("name", "")) or slugify(item.get("slug", ""))
+                if not item_key or item_key in seen_items.setdefault(key, set()):
+                    continue
+                seen_items[key].add(item_key)
+                category["items"].append(dict(item))
+
+    # Stable ordering: by priority, then by the order categories first appeared
+    ordered = sorted(
+        enumerate(categories.values()),
+        key=lambda pair: (pair[1]["priority"] if isinstance(pair[1]["priority"], int) else 99, pair[0]),
+    )
+
+    merged["menu"] = []
+    for _, category in ordered:
+        prefix = slugify(category["category"].split("/")[0], "_")
+        for item in category["items"]:
+            item["slug"] = slugify(item.get("name", "")) or slugify(item.get("slug", ""))
+            item["id"] = f"{prefix}_{item['slug'].replace('-', '_')}"
+            item["images"] = item.get("images") or []
+        merged["menu"].append(category)
+
+    if merged["currency"] is None:
+        merged["currency"] = "USD"
+    if merged["restaurant_image"] is None:
+        merged["restaurant_image"] = ""
+
+    return merged
+
+
+def extract_chunk(extract_fn: Callable[[str], dict], chunk: str, position: int, total: int) -> dict:
+    # extract_menu_data returns {} when the model's JSON doesn't parse; that's usually a one-off
+    partial = extract_fn(chunk) or extract_fn(chunk)
+    if not partial:
+        raise ValueError(f"Could not parse menu section {position} of {total}: model output was not valid menu JSON")
+    return partial
+
+
+def extract_menu_data_chunked(
+    lines: list,
+    extract_fn: Callable[[str], dict] | None = None,
+    max_chars: int = LLM_CHUNK_CHARS,
+    max_workers: int = LLM_MAX_WORKERS,
+) -> dict:
+    """
+    Parses OCR lines with one LLM call per chunk, at most max_workers at a time.
+
+    Args:
+        lines (list): run_ocr output in reading order.
+        extract_fn (Callable[[str], dict]): Turns raw text into menu JSON; defaults to the
+            Vertex-backed extract_menu_data. Pass a stub to run the pipeline offline.
+
+    Returns:
+        dict: The merged menu, or {} when OCR found no text. A chunk whose parse comes back
+            empty is retried once; if it fails again the whole parse raises ValueError rather
+            than returning a menu with that section missing.
+    """
+    if extract_fn is None:
+        from utils.grammar_ocr_food_parser import extract_menu_data as extract_fn
+
+    chunks = split_menu_sections(lines, max_chars=max_chars)
+    if not chunks:
+        return {}
+    if len(chunks) == 1:
+        return merge_partial_menus([extract_chunk(extract_fn, chunks[0], 1, 1)])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks))), thread_name_prefix="llm") as pool:
+        partials = list(pool.map(
+            lambda pair: extract_chunk(extract_fn, pair[1], pair[0], len(chunks)), enumerate(chunks, start=1)
+        ))
+
+    return merge_partial_menus(partials)
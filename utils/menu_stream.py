@@ -0,0 +1,190 @@
+# utils/menu_stream.py
+
+import json
+from typing import Iterable, Iterator, Optional
+
+
+class _Frame:
+    __slots__ = ("kind", "start", "path", "key", "index", "expect", "value_start", "fields")
+
+    def __init__(self, kind: str, start: int, path: tuple):
+        self.kind = kind  # "obj" or "arr"
+        self.start = start
+        self.path = path
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expect = "key" if kind == "obj" else "value"
+        self.value_start: Optional[int] = None
+        self.fields: dict = {}
+
+
+def _is_category(path: tuple) -> bool:
+    return len(path) == 2 and path[0] == "menu" and isinstance(path[1], int)
+
+
+def _is_item(path: tuple) -> bool:
+    return len(path) == 4 and _is_category(path[:2]) and path[2] == "items" and isinstance(path[3], int)
+
+
+class MenuStreamParser:
+    """
+    Incremental scanner over the model's menu JSON as it streams in.
+
+    feed() returns events as soon as they're complete:
+      - ("restaurant", {...top-level fields...}) once the "menu" array starts
+      - ("category", {"index", "category", "description", "priority"}) once a category's "items" start
+      - ("item", {"category_index", "item"}) as each dish object closes
+
+    Anything before the first "{" (e.g. a ```json fence) is ignored. Each character is
+    scanned once, so the total cost stays linear in the response size.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: list = []
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._string_start = 0
+        self._restaurant_sent = False
+        self._categories_sent: set = set()
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        events: list = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._end_string(i)
+                continue
+
+            if not self._stack:
+                if c == "{" and self._root_start is None:
+                    self._root_start = i
+                    self._stack.append(_Frame("obj", i, ()))
+                continue
+
+            frame = self._stack[-1]
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = frame.kind == "obj" and frame.expect == "key"
+                if not self._string_is_key:
+                    self._begin_value(frame, i, events)
+            elif c in "{[":
+                self._begin_value(frame, i, events)
+                child_path = frame.path + ((frame.key,) if frame.kind == "obj" else (frame.index,))
+                self._stack.append(_Frame("obj" if c == "{" else "arr", i, child_path))
+            elif c in "}]":
+                self._finish_scalar(frame, i)
+                self._stack.pop()
+                self._on_close(frame, i, events)
+                if self._stack:
+                    self._stack[-1].value_start = None
+            elif c == ":":
+                frame.expect = "value"
+            elif c == ",":
+                self._finish_scalar(frame, i)
+                if frame.kind == "obj":
+                    frame.expect, frame.key = "key", None
+                else:
+                    frame.index += 1
+            elif not c.isspace() and frame.value_start is None:
+                self._begin_value(frame, i, events)  # number, true, false or null
+
+        self._pos = len(buf)
+        return events
+
+    def _begin_value(self, frame: _Frame, i: int, events: list) -> None:
+        frame.value_start = i
+        if frame.path == () and frame.key == "menu":
+            self._send_restaurant(events)
+        elif _is_category(frame.path) and frame.key == "items":
+            self._send_category(frame, events)
+
+    def _end_string(self, i: int) -> None:
+        frame = self._stack[-1]
+        raw = self.buffer[self._string_start:i + 1]
+        if self._string_is_key:
+            frame.key = json.loads(raw)
+        elif frame.kind == "obj":
+            frame.fields[frame.key] = json.loads(raw)
+            frame.value_start = None
+
+    def _finish_scalar(self, frame: _Frame, i: int) -> None:
+        if frame.value_start is None:
+            return
+        raw = self.buffer[frame.value_start:i].strip()
+        frame.value_start = None
+        if frame.kind == "obj" and raw:
+            try:
+                frame.fields[frame.key] = json.loads(raw)
+            except ValueError:
+                frame.fields[frame.key] = raw
+
+    def _on_close(self, frame: _Frame, i: int, events: list) -> None:
+        if _is_item(frame.path) and frame.kind == "obj":
+            item = json.loads(self.buffer[frame.start:i + 1])
+            events.append(("item", {"category_index": frame.path[1], "item": item}))
+        elif _is_category(frame.path) and frame.kind == "obj":
+            self._send_category(frame, events)
+        elif frame.path == ():
+            self._root_end = i
+            self._send_restaurant(events, frame)
+
+    def _send_restaurant(self, events: list, root: Optional[_Frame] = None) -> None:
+        if self._restaurant_sent:
+            return
+        self._restaurant_sent = True
+        fields = (root or self._stack[0]).fields
+        events.append(("restaurant", {k: v for k, v in fields.items() if k != "menu"}))
+
+    def _send_category(self, frame: _Frame, events: list) -> None:
+        index = frame.path[1]
+        if index in self._categories_sent:
+            return
+        self._categories_sent.add(index)
+        fields = {k: v for k, v in frame.fields.items() if k != "items"}
+        events.append(("category", {"index": index, **fields}))
+
+    def result(self) -> dict:
+        """The complete menu once the stream has ended; {} if it never closed into valid JSON."""
+        if self._root_start is None or self._root_end is None:
+            return {}
+        try:
+            return json.loads(self.buffer[self._root_start:self._root_end + 1])
+        except ValueError:
+            return {}
+
+
+def menu_events(menu: dict) -> Iterator[tuple]:
+    """Replays an already-parsed menu as the same events MenuStreamParser emits."""
+    yield "restaurant", {k: v for k, v in menu.items() if k != "menu"}
+    for index, category in enumerate(menu.get("menu", [])):
+        yield "category", {"index": index, **{k: v for k, v in category.items() if k != "items"}}
+        for item in category.get("items", []):
+            yield "item", {"category_index": index, "item": item}
+
+
+def parse_menu_stream(chunks: Iterable[str]) -> Iterator[tuple]:
+    """Feeds text chunks through a MenuStreamParser, yielding events and finally ("menu", full_menu)."""
+    parser = MenuStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield "menu", parser.result()
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
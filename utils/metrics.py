@@ -0,0 +1,256 @@
+# utils/metrics.py
+
+import bisect
+import inspect
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Optional
+
+# METRICS_ENABLED=false turns every timer into the undecorated function and /metrics into an empty page
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# One JSON line per HTTP request with its latency, DB query count and stage timings; off by default so
+# /jobs polls and /metrics scrapes don't flood stdout
+REQUEST_TIMING_LOG = os.getenv("REQUEST_TIMING_LOG", "false").lower() == "true"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Per-request scratchpad; run_in_threadpool copies the context, so worker threads write into the same dict
+_request: ContextVar[Optional[dict]] = ContextVar("request_metrics", default=None)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from a callback, so nothing has to be kept in sync."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name, self.help, self.callback = name, help_text, callback
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.callback()}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, tuple(buckets)
+        self._series: dict = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            labels = _format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{labels} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Metrics:
+    """
+    In-process metrics with Prometheus text exposition.
+
+    Args:
+        enabled (bool): When False, timed() hands back the undecorated function and the
+            SQLAlchemy hook is never installed, so instrumented code runs as if it weren't.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: list = []
+        self.stage_seconds = self.histogram(
+            "prevu_stage_seconds", "Time spent in each pipeline stage.", labels=("stage",)
+        )
+        self.stage_errors = self.counter(
+            "prevu_stage_errors_total", "Pipeline stage calls that raised.", labels=("stage",)
+        )
+        self.request_seconds = self.histogram(
+            "prevu_http_request_seconds", "HTTP request latency.", labels=("method", "route", "status")
+        )
+        self.request_queries = self.histogram(
+            "prevu_http_request_db_queries", "Database queries issued per HTTP request.",
+            labels=("route",), buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+        )
+        self.db_queries = self.counter("prevu_db_queries_total", "Database queries issued.")
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help_text, callback)
+        self._metrics.append(metric)
+        return metric
+
+    def observe_stage(self, stage: str, seconds: float, failed: bool = False) -> None:
+        self.stage_seconds.observe(seconds, stage)
+        if failed:
+            self.stage_errors.inc(1, stage)
+        request = _request.get()
+        if request is not None:
+            stages = request["stages"]
+            stages[stage] = round(stages.get(stage, 0.0) + seconds, 4)
+
+    def timed(self, stage: str):
+        """Decorator recording each call's duration under prevu_stage_seconds{stage=...}; works on coroutines too."""
+        def decorator(fn):
+            if not self.enabled:
+                return fn
+
+            if inspect.iscoroutinefunction(fn):
+                @wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    failed = True
+                    try:
+                        result = await fn(*args, **kwargs)
+                        failed = False
+                        return result
+                    finally:
+                        self.observe_stage(stage, time.perf_counter() - start, failed)
+                return async_wrapper
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                failed = True
+                try:
+                    result = fn(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    self.observe_stage(stage, time.perf_counter() - start, failed)
+            return wrapper
+        return decorator
+
+    def instrument_engine(self, engine) -> None:
+        """Counts every statement the engine executes, in total and against the current request."""
+        if not self.enabled:
+            return
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count_query(conn, cursor, statement, parameters, context, executemany):
+            self.db_queries.inc()
+            request = _request.get()
+            if request is not None:
+                request["queries"] += 1
+
+    def render(self) -> str:
+        if not self.enabled:
+            return ""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(enabled=METRICS_ENABLED)
+timed = metrics.timed
+
+
+class MetricsMiddleware:
+    """
+    Times each HTTP request, counts its DB queries and optionally logs them as one JSON line.
+
+    Pure ASGI rather than BaseHTTPMiddleware, so streaming responses aren't buffered and the
+    request context stays visible to code running in the threadpool.
+    """
+
+    def __init__(self, app, registry: Metrics = metrics, log_requests: bool = REQUEST_TIMING_LOG):
+        self.app = app
+        self.registry = registry
+        self.log_requests = log_requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request = {"queries": 0, "stages": {}}
+        token = _request.set(request)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request.reset(token)
+            elapsed = time.perf_counter() - start
+            # The matched route template keeps label cardinality bounded (/jobs/{job_id}, not every id)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.registry.request_seconds.observe(elapsed, scope["method"], route, status_code)
+            self.registry.request_queries.observe(request["queries"], route)
+            if self.log_requests:
+                print(json.dumps({
+                    "event": "request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status_code,
+                    "ms": round(elapsed * 1000, 2),
+                    "db_queries": request["queries"],
+                    "stages": request["stages"],
+                }), flush=True)
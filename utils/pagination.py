@@ -0,0 +1,155 @@
+# utils/pagination.py
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from database.models import Category, MenuItem, Restaurant
+
+# Page size for the collection endpoints when ?limit= isn't given
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = 500
+
+
+class Listing(NamedTuple):
+    model: type
+    fields: tuple          # columns ?fields= may select
+    default_fields: tuple
+    sorts: dict            # ?sort= name -> (key columns, descending); the first is the default
+
+
+LISTINGS = {
+    "restaurants": Listing(
+        Restaurant,
+        fields=("id", "name", "location", "description", "currency", "last_updated", "restaurant_image"),
+        default_fields=("id", "name", "location", "last_updated", "restaurant_image"),
+        sorts={"recent": (("last_updated", "id"), True), "name": (("name", "id"), False)},
+    ),
+    "categories": Listing(
+        Category,
+        fields=("id", "category", "description", "priority", "restaurant_id", "menu_id"),
+        default_fields=("id", "category", "restaurant_id", "menu_id"),
+        sorts={"name": (("category", "id"), False)},
+    ),
+    "items": Listing(
+        MenuItem,
+        fields=("id", "name", "slug", "description", "price", "tags", "image_prompt", "images", "category_id"),
+        default_fields=("id", "name", "price", "tags", "category_id"),
+        sorts={"name": (("name", "id"), False)},
+    ),
+}
+
+# The (sort column, id) indexes behind LISTINGS, in database/models.py
+KEYSET_INDEXES = {
+    "ix_restaurants_last_updated_id", "ix_restaurants_name_id", "ix_categories_category_id",
+    "ix_categories_restaurant_category_id", "ix_menu_items_name_id", "ix_menu_items_category_name_id",
+}
+
+
+def encode_cursor(sort: str, values) -> str:
+    payload = json.dumps([sort, [v.isoformat() if isinstance(v, datetime) else str(v) if isinstance(v, uuid.UUID) else v
+                                 for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, columns) -> list:
+    """
+    The key a cursor resumes after; ValueError if it's malformed or from another ?sort=.
+
+    Only values encode_cursor could have written get through (strings for datetime and UUID
+    keys, the column's own type otherwise), so a tampered cursor is a 400 and never reaches SQL.
+    """
+    try:
+        cursor_sort, values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if cursor_sort != sort or not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        loaded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime or python_type is uuid.UUID:
+                if not isinstance(value, str):
+                    raise ValueError
+                value = datetime.fromisoformat(value) if python_type is datetime else uuid.UUID(value)
+                # Stored timestamps are naive UTC, and so are the ones encode_cursor writes
+                if python_type is datetime and value.tzinfo is not None:
+                    raise ValueError
+            elif not isinstance(value, python_type):
+                raise ValueError
+            loaded.append(value)
+        return loaded
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(db: Session, listing: Listing, sort: Optional[str] = None, fields=(), cursor: Optional[str] = None,
+                limit: int = PAGE_SIZE, where=()) -> tuple:
+    """
+    One page of a collection as ([row mappings], next_cursor); next_cursor is None on the last page.
+
+    Seeks past the cursor's key with a row-value comparison on an indexed (sort column, id)
+    pair instead of OFFSET, so every page costs the same however deep it is, and selects
+    only the requested columns as plain rows. Raises ValueError for unknown fields or sorts
+    and for bad cursors.
+    """
+    sort = sort or next(iter(listing.sorts))
+    if sort not in listing.sorts:
+        raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(listing.sorts)}")
+    fields = tuple(dict.fromkeys(fields or listing.default_fields))
+    unknown = [field for field in fields if field not in listing.fields]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; expected any of {', '.join(listing.fields)}")
+
+    table = listing.model.__table__
+    keys, descending = listing.sorts[sort]
+    key_columns = [table.c[key] for key in keys]
+    statement = select(*(table.c[name] for name in dict.fromkeys(fields + keys))).where(*where)
+    if cursor:
+        key, after = tuple_(*key_columns), tuple(decode_cursor(cursor, sort, key_columns))
+        statement = statement.where(key < after if descending else key > after)
+    statement = statement.order_by(*(column.desc() if descending else column for column in key_columns)).limit(limit + 1)
+
+    rows = db.execute(statement).mappings().all()
+    next_cursor = encode_cursor(sort, [rows[limit - 1][key] for key in keys]) if len(rows) > limit else None
+    return [{field: row[field] for field in fields} for row in rows[:limit]], next_cursor
+
+
+def iter_rows(db: Session, model, fields=None, batch_size: int = 1000):
+    """Every row of a table as plain mappings, read in id-ordered keyset batches rather than all at once."""
+    table = model.__table__
+    columns = [table.c[name] for name in dict.fromkeys(["id", *(fields or table.c.keys())])]
+    last_id = None
+    while True:
+        statement = select(*columns).order_by(table.c.id).limit(batch_size)
+        if last_id is not None:
+            statement = statement.where(table.c.id > last_id)
+        rows = db.execute(statement).mappings().all()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def main():
+    # Existing databases predate the keyset indexes; create_all only adds them to new tables
+    parser = argparse.ArgumentParser(description="Keyset pagination indexes")
+    parser.add_argument("command", choices=["create-indexes"])
+    parser.parse_args()
+
+    from database.db import engine
+    for listing in LISTINGS.values():
+        for index in listing.model.__table__.indexes:
+            if index.name in KEYSET_INDEXES:
+                index.create(bind=engine, checkfirst=True)
+                print(f"✅ {index.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,227 @@
-from PIL import Image
-from utils.ocr_extractor import run_ocr
-from utils.grammar_ocr_food_parser import extract_menu_data
-from utils.helpers import save_uploaded_file, save_json
+import asyncio
+import hashlib
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from PIL import UnidentifiedImageError
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from utils.ocr_extractor import run_ocr, run_ocr_pages
+from utils.grammar_ocr_food_parser import PROMPT_VERSION, extract_menu_data, stream_menu_text
+from utils.llm_cache import cached_extract_menu_data, llm_cache, llm_cache_key
+from utils.menu_chunker import LLM_MAX_WORKERS, extract_chunk, merge_partial_menus, split_menu_sections
+from utils.menu_stream import menu_events, parse_menu_stream, sse_event
+from utils.helpers import save_json
+from utils.uploads import persist_upload, read_upload
+from utils.cache import DiskCache
+from utils.preprocess import preprocess_image, PREPROCESS_VERSION
+from utils.jobs import Job
+from utils.metrics import timed
+from utils import crud
+from database.db import SessionLocal
+from schemas.restaurant import RestaurantOut
+
+# Parsed menus keyed by image content, so re-uploads skip OCR and the LLM entirely
+parse_cache = DiskCache(
+    os.getenv("PARSE_CACHE_PATH", "cache/parse_results.sqlite3"),
+    max_bytes=int(os.getenv("PARSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+)
+
+# Debug copies of every parse under saved/; off by default to keep the request path off disk
+SAVE_PARSED_JSON = os.getenv("SAVE_PARSED_JSON", "false").lower() == "true"
+
+def parse_cache_key(image_bytes: bytes) -> str:
+    return f"{hashlib.sha256(image_bytes).hexdigest()}:{PREPROCESS_VERSION}:{PROMPT_VERSION}"
+
+def _stage(job: Job | None, name: str):
+    return job.track(name) if job else nullcontext()
+
+@timed("decode")
+def _decode(image_bytes: bytes, filename: str):
+    try:
+        return preprocess_image(image_bytes)
+    except UnidentifiedImageError:
+        raise ValueError(f"Could not decode image: {filename}")
+
+def parse_menu_image(image_bytes: bytes, filename: str, job: Job | None = None) -> dict:
+    """Blocking OCR + LLM pipeline; call it from a worker thread, never from the event loop."""
+    with _stage(job, "cache_lookup"):
+        cache_key = parse_cache_key(image_bytes)
+        cached_menu = parse_cache.get(cache_key)
+    if cached_menu is not None:
+        return cached_menu
+
+    persist_upload(image_bytes, filename)
+    with _stage(job, "decode"):
+        img = _decode(image_bytes, filename)
+
+    with _stage(job, "ocr"):
+        raw_menu_data = run_ocr(img)
+
+    with _stage(job, "llm"):
+        parsed_menu = cached_extract_menu_data(raw_menu_data)
+    if SAVE_PARSED_JSON:
+        save_json(parsed_menu, "parsed_menu")
+
+    if parsed_menu:
+        parse_cache.set(cache_key, parsed_menu)
+
+    return parsed_menu
 
 async def handle_parse_menu(file: UploadFile) -> dict:
-    image_path = save_uploaded_file(file)
-    Image.open(image_path)  # just to validate it's an image
+    image_bytes = await read_upload(file)
+    return await run_in_threadpool(parse_menu_image, image_bytes, file.filename)
+
+def parse_menu_pages(pages: list, job: Job | None = None) -> dict:
+    """
+    Blocking OCR + LLM pipeline for a multi-page menu.
+
+    Args:
+        pages (list): (image_bytes, filename) tuples in page order.
+
+    Returns:
+        dict: One parsed restaurant whose menu covers every page.
+    """
+    with _stage(job, "cache_lookup"):
+        digest = hashlib.sha256()
+        for image_bytes, _ in pages:
+            digest.update(hashlib.sha256(image_bytes).digest())
+        cache_key = f"pages:{digest.hexdigest()}:{PREPROCESS_VERSION}:{PROMPT_VERSION}"
+        cached_menu = parse_cache.get(cache_key)
+    if cached_menu is not None:
+        return cached_menu
 
-    raw_menu_data = run_ocr(image_path)
-    raw_text = "\n".join(item['text'] for item in raw_menu_data)
+    with _stage(job, "decode"):
+        images = []
+        for image_bytes, filename in pages:
+            persist_upload(image_bytes, filename)
+            images.append(_decode(image_bytes, filename))
 
-    parsed_menu = extract_menu_data(raw_text)
-    save_json(parsed_menu, "parsed_menu")
+    with _stage(job, "ocr"):
+        page_lines = run_ocr_pages(images)
+
+    with _stage(job, "llm"):
+        # Sections can run across a page break, so chunk the pages as one stream of lines
+        parsed_menu = cached_extract_menu_data([line for lines in page_lines for line in lines])
+    if SAVE_PARSED_JSON:
+        save_json(parsed_menu, "parsed_menu")
+
+    if parsed_menu:
+        parse_cache.set(cache_key, parsed_menu)
 
     return parsed_menu
+
+def store_parsed_menu(parsed_menu: dict, include_items: bool = False) -> dict:
+    """
+    Saves (or finds) the restaurant in its own session and returns it as RestaurantOut JSON.
+
+    include_items adds "items": the dishes of the menu just stored, with their stored ids and slugs.
+    """
+    db = SessionLocal()
+    try:
+        restaurant = crud.save_parsed_restaurant(db, parsed_menu)
+        stored = RestaurantOut.model_validate(restaurant).model_dump(mode="json")
+        if include_items:
+            menu = max(restaurant.menus, key=lambda m: m.last_parsed)
+            stored["items"] = [
+                {"id": str(item.id), "slug": crud.dish_slug(item.slug), "name": item.name, "category": category.category}
+                for category in menu.categories for item in category.items
+            ]
+        return stored
+    finally:
+        db.close()
+
+def _store_parsed_menu(job: Job, parsed_menu: dict) -> dict:
+    with job.track("db_insert"):
+        return store_parsed_menu(parsed_menu)
+
+def run_parse_menu_job(job: Job, image_bytes: bytes, filename: str) -> dict:
+    return _store_parsed_menu(job, parse_menu_image(image_bytes, filename, job))
+
+def run_parse_menu_pages_job(job: Job, pages: list) -> dict:
+    return _store_parsed_menu(job, parse_menu_pages(pages, job))
+
+async def _stream_sections(lines: list):
+    """
+    The chunked parse of /parse_menu/, streamed: events for the first section as the model
+    writes it while the other sections parse concurrently, then theirs in section order
+    (category indexes continue across sections), and finally ("menu", merged).
+    """
+    chunks = split_menu_sections(lines)
+    if not chunks:
+        yield "menu", {}
+        return
+    pool = ThreadPoolExecutor(max_workers=max(1, min(LLM_MAX_WORKERS, len(chunks) - 1)), thread_name_prefix="llm")
+    try:
+        rest = [
+            asyncio.wrap_future(pool.submit(extract_chunk, extract_menu_data, chunk, position, len(chunks)))
+            for position, chunk in enumerate(chunks[1:], start=2)
+        ]
+        first = None
+        async for event, data in iterate_in_threadpool(parse_menu_stream(stream_menu_text(chunks[0]))):
+            if event == "menu":
+                first = data
+            else:
+                yield event, data
+        if not first:
+            first = await run_in_threadpool(extract_chunk, extract_menu_data, chunks[0], 1, len(chunks))
+
+        partials, offset = [first], len(first.get("menu", []))
+        for future in rest:
+            partial = await future
+            for event, data in menu_events(partial):
+                if event == "category":
+                    yield event, {**data, "index": data["index"] + offset}
+                elif event == "item":
+                    yield event, {**data, "category_index": data["category_index"] + offset}
+            partials.append(partial)
+            offset += len(partial.get("menu", []))
+        yield "menu", merge_partial_menus(partials)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def stream_parse_menu(image_bytes: bytes, filename: str):
+    """
+    Server-sent events for one upload, through the same caches and chunked parse as /parse_menu/:
+    "ocr" when text is extracted, then "restaurant", each "category" and each "item" as soon as
+    the model has written them, and finally "done" with the stored restaurant (or "error").
+
+    Streamed items carry the model's provisional slugs and ids; "done" lists the dishes as
+    stored ("items" with their ids and slugs), which is what clients should key on.
+    """
+    try:
+        cache_key = parse_cache_key(image_bytes)
+        parsed_menu = await run_in_threadpool(parse_cache.get, cache_key)
+        streamed = False
+
+        if parsed_menu is None:
+            persist_upload(image_bytes, filename)
+            img = await run_in_threadpool(_decode, image_bytes, filename)
+            raw_menu_data = await run_in_threadpool(run_ocr, img)
+            yield sse_event("ocr", {"lines": len(raw_menu_data)})
+
+            text_key = llm_cache_key(raw_menu_data)
+            parsed_menu = await run_in_threadpool(llm_cache.get, text_key)
+            if parsed_menu is None:
+                streamed = True
+                async for event, data in _stream_sections(raw_menu_data):
+                    if event == "menu":
+                        parsed_menu = data
+                    else:
+                        yield sse_event(event, data)
+                if not parsed_menu:
+                    yield sse_event("error", {"detail": "No menu text found"})
+                    return
+                await run_in_threadpool(llm_cache.set, text_key, parsed_menu)
+            await run_in_threadpool(parse_cache.set, cache_key, parsed_menu)
+
+        if not streamed:
+            for event, data in menu_events(parsed_menu):
+                yield sse_event(event, data)
+
+        restaurant = await run_in_threadpool(store_parsed_menu, parsed_menu, True)
+        yield sse_event("done", restaurant)
+    except Exception as e:
+        traceback.print_exc()
+        yield sse_event("error", {"detail": str(e)})
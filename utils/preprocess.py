@@ -0,0 +1,111 @@
+# utils/preprocess.py
+
+import io
+import os
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# Longest side (px) an image is shrunk to before OCR; tune with benchmarks/preprocess_ocr.py
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))
+OCR_DESKEW = os.getenv("OCR_DESKEW", "false").lower() == "true"
+OCR_CROP = os.getenv("OCR_CROP", "false").lower() == "true"
+
+# Part of the parse cache key, since changing these changes what OCR sees
+PREPROCESS_VERSION = f"max{OCR_MAX_SIDE}-deskew{int(OCR_DESKEW)}-crop{int(OCR_CROP)}"
+
+
+def load_image(source, max_side: int = OCR_MAX_SIDE, grayscale: bool = True) -> Image.Image:
+    """
+    Decodes an image once, letting the JPEG decoder downscale while it decodes.
+
+    Args:
+        source (bytes | str): Raw image bytes or a path to the image file.
+        max_side (int): Longest side to keep; 0 disables downscaling.
+        grayscale (bool): Decode straight to a single luminance channel.
+
+    Returns:
+        PIL.Image.Image: The decoded, upright and size-capped image.
+    """
+    img = Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source)
+    mode = "L" if grayscale else "RGB"
+
+    if max_side and img.format == "JPEG":
+        # Draft mode picks the largest 1/2, 1/4 or 1/8 DCT scale that still covers max_side
+        img.draft(mode, (max_side, max_side))
+
+    img = ImageOps.exif_transpose(img)
+    img = img.convert(mode)
+
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    return img
+
+
+def _text_mask(gray: np.ndarray) -> np.ndarray:
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return mask
+
+
+def crop_to_text(gray: np.ndarray, margin: int = 16) -> np.ndarray:
+    """Crops away empty borders around the region that contains ink."""
+    mask = cv2.dilate(_text_mask(gray), np.ones((15, 15), np.uint8))
+    points = cv2.findNonZero(mask)
+    if points is None:
+        return gray
+
+    x, y, w, h = cv2.boundingRect(points)
+    height, width = gray.shape[:2]
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + w + margin, width), min(y + h + margin, height)
+    return gray[y0:y1, x0:x1]
+
+
+def deskew(gray: np.ndarray, max_angle: float = 15.0) -> np.ndarray:
+    """Rotates a slightly tilted page back to horizontal using the text pixels' minimum-area rectangle."""
+    points = cv2.findNonZero(_text_mask(gray))
+    if points is None:
+        return gray
+
+    angle = cv2.minAreaRect(points)[-1]
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return gray
+
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE
+    )
+
+
+def preprocess_image(
+    source,
+    max_side: int = OCR_MAX_SIDE,
+    grayscale: bool = True,
+    deskew_page: bool = OCR_DESKEW,
+    crop: bool = OCR_CROP,
+) -> np.ndarray:
+    """
+    Prepares an upload for PaddleOCR: single decode, size cap, contrast stretch,
+    optional deskew and crop.
+
+    Returns:
+        np.ndarray: A 3-channel BGR image, the layout PaddleOCR expects.
+    """
+    img = load_image(source, max_side=max_side, grayscale=grayscale)
+
+    if not grayscale:
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+    gray = np.asarray(ImageOps.autocontrast(img, cutoff=1))
+    if crop:
+        gray = crop_to_text(gray)
+    if deskew_page:
+        gray = deskew(gray)
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
@@ -0,0 +1,44 @@
+# utils/rate_limit.py
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` acquisitions per second on average, with bursts up to `capacity`.
+
+    Waiters are served in arrival order, so a burst of callers spreads out evenly over time
+    instead of all retrying at once.
+
+    Args:
+        rate (float): Tokens added per second (e.g., 100 / 60 for a 100 queries/minute quota).
+        capacity (float): Largest burst allowed after a quiet period; the bucket starts full.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Waits until `tokens` are available and takes them; returns the seconds spent waiting."""
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+        return waited
@@ -0,0 +1,420 @@
+# utils/recommender.py
+
+import math
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models import (
+    Category, MenuItem, user_favorite_menu_items, user_favorite_restaurants, user_viewed_menu_items,
+    user_viewed_restaurants,
+)
+
+# New items and interactions are pulled from the DB this often (incrementally)...
+RECOMMEND_REFRESH_SECONDS = float(os.getenv("RECOMMEND_REFRESH_SECONDS", "60"))
+# ...and everything is rebuilt this often, which also drops un-favourites and other workers' deleted dishes
+RECOMMEND_REBUILD_SECONDS = float(os.getenv("RECOMMEND_REBUILD_SECONDS", "3600"))
+# A refresh re-reads rows stamped this long before the previous one started: their stamps
+# come from each worker's clock, and a slow transaction can commit after a refresh has read
+RECOMMEND_REFRESH_OVERLAP_SECONDS = float(os.getenv("RECOMMEND_REFRESH_OVERLAP_SECONDS", "300"))
+
+INTERACTION_WEIGHTS = {"view": 1.0, "favorite": 3.0}
+PREFERENCE_WEIGHT = 2.0
+# Blend of "people who liked what you liked" and "dishes like the ones you liked"
+COOCCURRENCE_WEIGHT = 0.6
+AFFINITY_WEIGHT = 0.4
+# Most similar users whose items are counted, and strongest profile terms scored
+NEIGHBOURS = 200
+PROFILE_TERMS = 24
+# Terms on more than this share of dishes ("tomato", "served") say little about taste and
+# cost the most to score; small catalogues keep them
+COMMON_TERM_SHARE = 0.2
+COMMON_TERM_MIN_DISHES = 1000
+
+INTERACTION_TABLES = {
+    ("view", "item"): user_viewed_menu_items,
+    ("favorite", "item"): user_favorite_menu_items,
+    ("view", "restaurant"): user_viewed_restaurants,
+    ("favorite", "restaurant"): user_favorite_restaurants,
+}
+_EMPTY = (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32))
+
+
+class _Postings:
+    """key -> growing (slots, weights) arrays; numpy copies are cached until the key changes."""
+
+    def __init__(self):
+        self._slots: dict = {}
+        self._weights: dict = {}
+        self._cache: dict = {}
+
+    def add(self, key, slot: int, weight: float = 1.0) -> None:
+        self._slots.setdefault(key, array("i")).append(slot)
+        self._weights.setdefault(key, array("f")).append(weight)
+        self._cache.pop(key, None)
+
+    def discard(self, key, slot: int) -> None:
+        slots = self._slots.get(key)
+        if slots is not None and slot in slots:
+            position = slots.index(slot)
+            del slots[position]
+            del self._weights[key][position]
+            self._cache.pop(key, None)
+
+    def count(self, key) -> int:
+        return len(self._slots.get(key, ()))
+
+    def get(self, key) -> tuple:
+        cached = self._cache.get(key)
+        if cached is None:
+            if key not in self._slots:
+                return _EMPTY
+            cached = self._cache[key] = (np.array(self._slots[key], dtype=np.int32), np.array(self._weights[key], dtype=np.float32))
+        return cached
+
+    def gather(self, keys, key_weights) -> tuple:
+        """Every key's postings concatenated, weights scaled by the key's weight."""
+        parts = [(self.get(k), w) for k, w in zip(keys, key_weights)]
+        if not parts:
+            return _EMPTY
+        return (
+            np.concatenate([slots for (slots, _), _ in parts]),
+            np.concatenate([weights * w for (_, weights), w in parts]),
+        )
+
+
+class _Growing:
+    """An append-only float column with a cached numpy copy."""
+
+    def __init__(self):
+        self.values = array("f")
+        self._cached = None
+
+    def append(self, value: float) -> None:
+        self.values.append(value)
+        self._cached = None
+
+    def add(self, index: int, value: float) -> None:
+        self.values[index] += value
+        self._cached = None
+
+    def numpy(self) -> np.ndarray:
+        if self._cached is None:
+            self._cached = np.array(self.values, dtype=np.float32)
+        return self._cached
+
+
+class _Interactions:
+    """Users x entities as two sets of postings (by user and by entity), for two-hop co-occurrence."""
+
+    def __init__(self):
+        self.user_slots: dict = {}
+        self.by_user = _Postings()
+        self.by_entity = _Postings()
+        self.seen: set = set()
+
+    def add(self, user_id, slot: int, weight: float, key) -> bool:
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        user = self.user_slots.setdefault(user_id, len(self.user_slots))
+        self.by_user.add(user, slot, weight)
+        self.by_entity.add(slot, user, weight)
+        return True
+
+    def seeds(self, user_id) -> tuple:
+        user = self.user_slots.get(user_id)
+        return (user, *self.by_user.get(user)) if user is not None else (None, *_EMPTY)
+
+    def cooccurrence(self, user, seeds, seed_weights, entities: int, popularity: np.ndarray) -> np.ndarray:
+        """Scores entities by how much the users who share this user's entities liked them."""
+        if not len(seeds):
+            return np.zeros(entities, dtype=np.float32)
+        users, weights = self.by_entity.gather(seeds.tolist(), seed_weights.tolist())
+        affinity = np.bincount(users, weights=weights, minlength=len(self.user_slots))
+        affinity[user] = 0
+        neighbours = np.flatnonzero(affinity)
+        if len(neighbours) > NEIGHBOURS:
+            neighbours = neighbours[np.argpartition(affinity[neighbours], -NEIGHBOURS)[-NEIGHBOURS:]]
+        slots, weights = self.by_user.gather(neighbours.tolist(), affinity[neighbours].tolist())
+        # Dividing by sqrt(popularity) keeps everyone's favourite dish from topping every list
+        return np.bincount(slots, weights=weights, minlength=entities) / np.sqrt(np.maximum(popularity, 1.0))
+
+
+class Recommendation(NamedTuple):
+    id: object
+    restaurant_id: Optional[object]
+    score: float
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _normalized(scores: np.ndarray) -> np.ndarray:
+    top = scores.max() if len(scores) else 0
+    return scores / top if top > 0 else scores
+
+
+def term_ids(tag_bits: Optional[bytes]) -> np.ndarray:
+    if not tag_bits:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(np.unpackbits(np.frombuffer(tag_bits, dtype=np.uint8), bitorder="little"))
+
+
+class RecommendationIndex:
+    """
+    In-memory scoring index over dishes, restaurants and who viewed or favourited them.
+
+    Dish scores blend two signals, each a handful of bincounts over postings arrays:
+    co-occurrence (users who share this user's dishes, weighted by overlap, and the
+    dishes they liked) and tag affinity (the user's profile of terms from their dishes'
+    tag_bits and cuisine preferences, matched against each dish's terms). Restaurants
+    get the same co-occurrence over restaurant interactions plus the dish scores rolled
+    up per restaurant. Top-k is an argpartition over the score array.
+
+    New dishes and interactions go in without a rebuild, and re-parsed dishes swap their
+    terms in place: from ingest and the interaction endpoints in this process, and via
+    refresh() for other processes' writes.
+    """
+
+    def __init__(self):
+        self.loaded_at = 0.0
+        self.refreshed_at = 0.0
+        self._since: Optional[datetime] = None  # when the last refresh started reading
+        self._item_ids: list = []
+        self._item_slots: dict = {}
+        self._item_restaurant = array("i")
+        self._item_bits: list = []
+        self._item_alive = _Growing()  # 1.0, or 0.0 once the dish is deleted
+        self._restaurant_ids: list = []
+        self._restaurant_slots: dict = {}
+        self._terms = _Postings()
+        self._item_popularity = _Growing()
+        self._restaurant_popularity = _Growing()
+        self._items = _Interactions()
+        self._restaurants = _Interactions()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._item_slots)
+
+    def _restaurant_slot(self, restaurant_id) -> int:
+        slot = self._restaurant_slots.get(restaurant_id)
+        if slot is None:
+            slot = self._restaurant_slots[restaurant_id] = len(self._restaurant_ids)
+            self._restaurant_ids.append(restaurant_id)
+            self._restaurant_popularity.append(0.0)
+        return slot
+
+    def _index_terms(self, slot: int, tag_bits: Optional[bytes]) -> None:
+        terms = term_ids(tag_bits)
+        for term in terms.tolist():
+            # Long descriptions shouldn't outscore short ones just by having more words
+            self._terms.add(term, slot, 1.0 / math.sqrt(len(terms)))
+
+    def add_items(self, rows) -> None:
+        """Adds dishes given as (item_id, restaurant_id, tag_bits); known ids get the new tag_bits."""
+        with self._lock:
+            for item_id, restaurant_id, tag_bits in rows:
+                slot = self._item_slots.get(item_id)
+                if slot is not None:
+                    if tag_bits != self._item_bits[slot]:  # re-parsed
+                        for term in term_ids(self._item_bits[slot]).tolist():
+                            self._terms.discard(term, slot)
+                        self._item_bits[slot] = tag_bits
+                        self._index_terms(slot, tag_bits)
+                    continue
+                slot = self._item_slots[item_id] = len(self._item_ids)
+                self._item_ids.append(item_id)
+                self._item_restaurant.append(self._restaurant_slot(restaurant_id))
+                self._item_bits.append(tag_bits)
+                self._item_alive.append(1.0)
+                self._item_popularity.append(0.0)
+                self._index_terms(slot, tag_bits)
+
+    def remove_items(self, item_ids) -> None:
+        with self._lock:
+            for item_id in item_ids:
+                slot = self._item_slots.get(item_id)
+                if slot is not None and self._item_alive.values[slot]:
+                    self._item_alive.add(slot, -1.0)
+
+    def add_interactions(self, rows) -> None:
+        """Adds (user_id, kind, target, entity_id) rows: kind view/favorite, target item/restaurant."""
+        with self._lock:
+            for user_id, kind, target, entity_id in rows:
+                weight = INTERACTION_WEIGHTS[kind]
+                if target == "item":
+                    slot = self._item_slots.get(entity_id)
+                    if slot is not None and self._items.add(user_id, slot, weight, (user_id, kind, entity_id)):
+                        self._item_popularity.add(slot, weight)
+                elif entity_id in self._restaurant_slots:
+                    slot = self._restaurant_slots[entity_id]
+                    if self._restaurants.add(user_id, slot, weight, (user_id, kind, entity_id)):
+                        self._restaurant_popularity.add(slot, weight)
+
+    def _profile(self, seeds, seed_weights, preferred_terms) -> tuple:
+        weights = {}
+        for slot, weight in zip(seeds.tolist(), seed_weights.tolist()):
+            for term in term_ids(self._item_bits[slot]).tolist():
+                weights[term] = weights.get(term, 0.0) + weight
+        for term in preferred_terms:
+            weights[term] = weights.get(term, 0.0) + PREFERENCE_WEIGHT
+        total = len(self._item_ids)
+        common = max(COMMON_TERM_SHARE * total, COMMON_TERM_MIN_DISHES)
+        scored = {}
+        for term, weight in weights.items():
+            df = self._terms.count(term)
+            if 0 < df <= common or term in preferred_terms:
+                scored[term] = weight * math.log(1 + total / df)
+        top = sorted(scored, key=scored.get, reverse=True)[:PROFILE_TERMS]
+        return top, [scored[term] for term in top]
+
+    def _dish_scores(self, user_id, preferred_terms) -> tuple:
+        n_items = len(self._item_ids)
+        popularity = self._item_popularity.numpy()
+        user, seeds, seed_weights = self._items.seeds(user_id)
+        cooccurrence = self._items.cooccurrence(user, seeds, seed_weights, n_items, popularity)
+
+        terms, term_weights = self._profile(seeds, seed_weights, preferred_terms)
+        slots, weights = self._terms.gather(terms, term_weights)
+        affinity = np.bincount(slots, weights=weights, minlength=n_items)
+
+        scores = COOCCURRENCE_WEIGHT * _normalized(cooccurrence) + AFFINITY_WEIGHT * _normalized(affinity)
+        if not scores.any():
+            # Nothing to go on yet: what's popular
+            scores = popularity.astype(np.float64)
+        scores *= self._item_alive.numpy()
+        return scores, seeds
+
+    def recommend_dishes(self, user_id, preferred_terms=(), k: int = 20) -> list:
+        with self._lock:
+            scores, seeds = self._dish_scores(user_id, preferred_terms)
+            scores[seeds] = 0  # already known to them
+            return [
+                Recommendation(self._item_ids[slot], self._restaurant_ids[self._item_restaurant[slot]], float(scores[slot]))
+                for slot in _top_k(scores, k).tolist()
+            ]
+
+    def recommend_restaurants(self, user_id, preferred_terms=(), k: int = 20) -> list:
+        with self._lock:
+            n_restaurants = len(self._restaurant_ids)
+            dish_scores, _ = self._dish_scores(user_id, preferred_terms)
+            item_restaurant = np.array(self._item_restaurant, dtype=np.int32)
+            counts = np.bincount(item_restaurant, minlength=n_restaurants)
+            by_dishes = np.bincount(item_restaurant, weights=dish_scores, minlength=n_restaurants) / np.sqrt(np.maximum(counts, 1))
+
+            user, seeds, seed_weights = self._restaurants.seeds(user_id)
+            cooccurrence = self._restaurants.cooccurrence(
+                user, seeds, seed_weights, n_restaurants, self._restaurant_popularity.numpy()
+            )
+            scores = 0.5 * _normalized(cooccurrence) + 0.5 * _normalized(by_dishes)
+            scores[seeds[seed_weights >= INTERACTION_WEIGHTS["favorite"]]] = 0
+            return [Recommendation(self._restaurant_ids[slot], None, float(scores[slot])) for slot in _top_k(scores, k).tolist()]
+
+    # --- Loading from the DB ---
+
+    def refresh(self, db: Session) -> None:
+        """
+        Adds dishes and interactions stored since the last refresh, and new tag_bits of
+        dishes re-parsed since; the first refresh reads everything.
+
+        Only rows past the high-water marks (MenuItem.updated_at, the interactions'
+        created_at) are read, so a refresh costs what was written since, not the table
+        sizes. Deleted dishes aren't seen here: this process drops its own via
+        unindex_items(), other processes' go at the next rebuild.
+
+        The DB reads happen outside the index lock, so recommendations keep being served
+        from the current arrays while it runs; only applying the new rows takes the lock.
+        """
+        started = datetime.utcnow()
+        since = self._since - timedelta(seconds=RECOMMEND_REFRESH_OVERLAP_SECONDS) if self._since else None
+        items = select(MenuItem.id, Category.restaurant_id, MenuItem.tag_bits).join(Category)
+        if since is not None:
+            items = items.where(MenuItem.updated_at >= since)
+        for rows in db.execute(items.execution_options(yield_per=5000)).partitions():
+            self.add_items(rows)
+        for (kind, target), table in INTERACTION_TABLES.items():
+            entity = table.c.menu_item_id if target == "item" else table.c.restaurant_id
+            interactions = select(table.c.user_id, entity)
+            if since is not None:
+                interactions = interactions.where(table.c.created_at >= since)
+            rows = db.execute(interactions).all()
+            self.add_interactions((user_id, kind, target, entity_id) for user_id, entity_id in rows)
+        self._since = started
+        self.refreshed_at = time.monotonic()
+
+
+_index = RecommendationIndex()
+_index_lock = threading.Lock()
+
+
+def _update_index(rebuild: bool) -> None:
+    """Refreshes (or rebuilds and swaps in) the shared index in its own session; runs off the request path."""
+    global _index
+    from database.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if rebuild:
+            index = RecommendationIndex()
+            index.refresh(db)
+            index.loaded_at = time.monotonic()
+            _index = index
+        else:
+            _index.refresh(db)
+    except Exception as e:
+        print(f"⚠️ Recommendation index refresh failed: {e}")
+    finally:
+        db.close()
+        _index_lock.release()
+
+
+def get_recommendation_index(db: Session) -> RecommendationIndex:
+    """
+    The shared index, built on first use, then refreshed incrementally when stale and rebuilt
+    hourly in a background thread. Requests never wait for those reads; they keep serving
+    the current index until the refreshed one is in place.
+    """
+    global _index
+    if not _index.loaded_at:
+        with _index_lock:
+            if not _index.loaded_at:
+                index = RecommendationIndex()
+                index.refresh(db)
+                index.loaded_at = time.monotonic()
+                _index = index
+        return _index
+    now = time.monotonic()
+    rebuild = now - _index.loaded_at > RECOMMEND_REBUILD_SECONDS
+    if (rebuild or now - _index.refreshed_at > RECOMMEND_REFRESH_SECONDS) and _index_lock.acquire(blocking=False):
+        threading.Thread(target=_update_index, args=(rebuild,), name="recommend-refresh", daemon=True).start()
+    return _index
+
+
+def index_new_items(restaurant_id, item_rows) -> None:
+    """Called after ingest so this process recommends new dishes before the next refresh."""
+    if _index.loaded_at:
+        _index.add_items((row["id"], restaurant_id, row.get("tag_bits")) for row in item_rows)
+
+
+def unindex_items(item_ids) -> None:
+    """Called after a re-parse deletes dishes, so this process stops recommending them."""
+    if _index.loaded_at:
+        _index.remove_items(item_ids)
+
+
+def record_interaction(user_id, kind: str, target: str, entity_id) -> None:
+    if _index.loaded_at:
+        _index.add_interactions([(user_id, kind, target, entity_id)])
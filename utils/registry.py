@@ -0,0 +1,85 @@
+# utils/registry.py
+
+import os
+import threading
+import time
+import traceback
+from typing import Any, Callable, Optional
+
+# Models loaded and exercised once at startup; /readyz waits for these
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "ocr,llm").split(",") if name.strip()]
+
+
+class _Entry:
+    def __init__(self, loader: Callable[[], Any], warm_up: Optional[Callable[[Any], None]]):
+        self.loader = loader
+        self.warm_up = warm_up
+        self.instance: Any = None
+        self.state = "not_loaded"  # not_loaded -> loading -> loaded -> ready, or failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Defers importing and building heavy backends (PaddleOCR, Vertex AI) until first use.
+
+    Modules register a loader at import time, which is cheap; the loader only runs
+    the first time get() is called, or when warm_up() is run at startup.
+    """
+
+    def __init__(self):
+        self._entries: dict = {}
+
+    def register(self, name: str, loader: Callable[[], Any], warm_up: Optional[Callable[[Any], None]] = None) -> None:
+        self._entries[name] = _Entry(loader, warm_up)
+
+    def get(self, name: str) -> Any:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No model registered under '{name}'")
+
+        if entry.instance is None:
+            with entry.lock:
+                if entry.instance is None:
+                    entry.state = "loading"
+                    start = time.perf_counter()
+                    try:
+                        instance = entry.loader()
+                    except Exception as e:
+                        entry.state, entry.error = "failed", str(e)
+                        raise
+                    entry.load_seconds = round(time.perf_counter() - start, 3)
+                    entry.instance, entry.state, entry.error = instance, "loaded", None
+        return entry.instance
+
+    def warm_up(self, names: Optional[list] = None) -> None:
+        """Loads each model and runs its dummy inference; failures are recorded, not raised."""
+        for name in names if names is not None else list(self._entries):
+            entry = self._entries.get(name)
+            if entry is None:
+                print(f"⚠️ Warm-up skipped, no model registered under '{name}'")
+                continue
+            try:
+                instance = self.get(name)
+                if entry.warm_up:
+                    entry.warm_up(instance)
+                entry.state = "ready"
+                print(f"✅ Model '{name}' ready")
+            except Exception as e:
+                traceback.print_exc()
+                entry.state, entry.error = "failed", str(e)
+
+    def is_ready(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.state == "ready"
+
+    def status(self) -> dict:
+        return {
+            name: {"state": entry.state, "error": entry.error, "load_seconds": entry.load_seconds}
+            for name, entry in self._entries.items()
+        }
+
+
+models = ModelRegistry()
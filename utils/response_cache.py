@@ -0,0 +1,171 @@
+# utils/response_cache.py
+
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from utils.cache import DiskCache
+from utils.metrics import metrics
+
+# Rendered menu responses each worker keeps in memory, by body size
+RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+# Optional SQLite file shared by every worker on the host (utils.cache.DiskCache); empty keeps caching per-process
+RESPONSE_CACHE_SHARED_PATH = os.getenv("RESPONSE_CACHE_SHARED_PATH", "")
+RESPONSE_CACHE_SHARED_MAX_MB = int(os.getenv("RESPONSE_CACHE_SHARED_MAX_MB", "256"))
+
+cache_lookups = metrics.counter(
+    "prevu_response_cache_lookups_total", "Cached-response lookups, by endpoint and where they were answered.",
+    labels=("endpoint", "result"),
+)
+cache_saved_bytes = metrics.counter(
+    "prevu_response_cache_saved_bytes_total",
+    "Response bytes not re-rendered (hit) or not sent at all (not_modified).",
+    labels=("endpoint", "reason"),
+)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match against our ETag; GET revalidation uses weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseCacheBackend(ABC):
+    """Somewhere rendered responses outlive one worker; keys already carry the data's version."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse) -> None:
+        ...
+
+
+class DiskCacheBackend(ResponseCacheBackend):
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self.cache.get(key)
+        return CachedResponse(value["etag"], value["body"].encode()) if value else None
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self.cache.set(key, {"etag": response.etag, "body": response.body.decode()})
+
+
+class ResponseCache:
+    """
+    Read-through cache of rendered JSON responses for one restaurant's data.
+
+    Entries are keyed on the restaurant id and a variant (e.g. the dietary filter) and
+    stamped with the data's version (Restaurant.last_updated, Menu.last_parsed and
+    Menu.cache_version), so a
+    write in any process makes them stale on the next read without coordination. Writes
+    in this process also invalidate() straight away to free the memory. The in-process
+    LRU sits in front of an optional shared backend, which keys on the version too.
+
+    Args:
+        max_bytes (int): Evict least-recently-used bodies once they exceed this size.
+        shared (ResponseCacheBackend | None): Consulted on local misses and filled on renders.
+    """
+
+    def __init__(self, max_bytes: int, shared: Optional[ResponseCacheBackend] = None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()  # (restaurant_id, variant) -> (version, CachedResponse)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _shared_key(restaurant_id, version: str, variant: str) -> str:
+        return f"{restaurant_id}|{version}|{variant}"
+
+    def get(self, endpoint: str, restaurant_id, version: str, variant: str = "") -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get((restaurant_id, variant))
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end((restaurant_id, variant))
+                self.hits += 1
+                cache_lookups.inc(1, endpoint, "hit")
+                return entry[1]
+        if self.shared is not None:
+            response = self.shared.get(self._shared_key(restaurant_id, version, variant))
+            if response is not None:
+                self._store(restaurant_id, version, variant, response)
+                with self._lock:
+                    self.hits += 1
+                cache_lookups.inc(1, endpoint, "shared_hit")
+                return response
+        with self._lock:
+            self.misses += 1
+        cache_lookups.inc(1, endpoint, "miss")
+        return None
+
+    def put(self, restaurant_id, version: str, variant: str, body: bytes) -> CachedResponse:
+        response = CachedResponse(strong_etag(body), body)
+        self._store(restaurant_id, version, variant, response)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(restaurant_id, version, variant), response)
+        return response
+
+    def _store(self, restaurant_id, version: str, variant: str, response: CachedResponse) -> None:
+        with self._lock:
+            previous = self._entries.pop((restaurant_id, variant), None)
+            if previous is not None:
+                self._bytes -= len(previous[1].body)
+            self._entries[(restaurant_id, variant)] = (version, response)
+            self._bytes += len(response.body)
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+
+    def invalidate(self, restaurant_ids) -> None:
+        restaurant_ids = set(restaurant_ids)
+        if not restaurant_ids:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in restaurant_ids]:
+                self._bytes -= len(self._entries.pop(key)[1].body)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+menu_cache = ResponseCache(
+    RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+    DiskCacheBackend(DiskCache(RESPONSE_CACHE_SHARED_PATH, max_bytes=RESPONSE_CACHE_SHARED_MAX_MB * 1024 * 1024))
+    if RESPONSE_CACHE_SHARED_PATH else None,
+)
+metrics.gauge("prevu_response_cache_hit_ratio", "Share of menu response lookups answered from cache.",
+              lambda: menu_cache.stats()["hit_rate"])
+metrics.gauge("prevu_response_cache_bytes", "Bytes of rendered menu responses held in this worker.",
+              lambda: menu_cache.stats()["bytes"])
@@ -0,0 +1,246 @@
+# utils/restaurant_index.py
+
+import os
+import re
+import threading
+import unicodedata
+from typing import NamedTuple, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+# Scores are 0-100; at or above this a parsed restaurant is treated as one we already have
+RESTAURANT_MATCH_THRESHOLD = float(os.getenv("RESTAURANT_MATCH_THRESHOLD", "90"))
+# Full normalised names at least this close are the same place; only such a match may replace its menu
+RESTAURANT_EXACT_THRESHOLD = float(os.getenv("RESTAURANT_EXACT_THRESHOLD", "97"))
+# Core names shorter than this ("thai", "golden dragon") are shared by unrelated places,
+# so on their own they never merge two restaurants
+DISTINCTIVE_CORE_WORDS = 3
+
+# Words that describe the kind of place rather than which place it is
+GENERIC_WORDS = {
+    "restaurant", "restaurants", "bar", "grill", "cafe", "kitchen", "bistro", "eatery", "diner",
+    "the", "and", "co", "company", "house", "ristorante", "trattoria", "llc", "inc",
+}
+
+# Candidates are drawn from the rarest trigrams of the query only; common ones ("ing", " re")
+# match thousands of names and would cost more to count than they narrow down
+RARE_GRAMS = 8
+MAX_CANDIDATES = 64
+NUMBER_MISMATCH_PENALTY = 15
+# Every save re-adds its restaurant in a new slot; once this share of slots is dead the
+# postings are rebuilt, before dead slots crowd live ones out of MAX_CANDIDATES
+COMPACT_DEAD_SHARE = 0.25
+COMPACT_MIN_DEAD = 1000
+
+
+def normalize_name(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower().replace("&", " and ")
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", text)).strip()
+
+
+def core_name(normalized: str) -> str:
+    """The distinguishing part of a name: "italian restaurant and bar" -> "italian"."""
+    words = [w for w in normalized.split() if w not in GENERIC_WORDS]
+    return " ".join(words) or normalized
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Match(NamedTuple):
+    restaurant_id: object
+    name: str
+    location: Optional[str]
+    score: float
+    exact: bool = False  # near-identical full name: safe to replace the stored menu
+
+
+class _Entry(NamedTuple):
+    restaurant_id: object
+    name: str
+    location: Optional[str]
+    normalized: str
+    core: str
+    normalized_location: str
+    numbers: str
+
+
+def _entry(restaurant_id, name: str, location: Optional[str]) -> _Entry:
+    normalized = normalize_name(name)
+    return _Entry(
+        restaurant_id, name, location, normalized, core_name(normalized), normalize_name(location or ""),
+        re.sub(r"\D", "", normalized),
+    )
+
+
+class RestaurantIndex:
+    """
+    In-memory trigram index over restaurant names, ranked with rapidfuzz.
+
+    Candidates are the restaurants sharing the most trigrams of the query's core name
+    (generic words like "restaurant" or "bar" dropped); only those are scored, so a lookup
+    touches a few dozen names rather than every restaurant. Locations, when both sides
+    have one, weigh in so two "Thai Kitchen"s in different cities stay separate.
+
+    best_match() is stricter than the ranking, because a wrong merge loses data: a short
+    core name or missing locations only match when the full names are near-identical.
+
+    Each process keeps its own copy: loaded from the DB on first use, then updated by
+    add() as this process inserts restaurants. Re-adding leaves a dead slot behind;
+    the postings are compacted once enough pile up.
+    """
+
+    def __init__(self, threshold: float = RESTAURANT_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.loaded = False
+        # Entries live in slots so postings can be numpy int arrays; a removed entry
+        # leaves a None slot behind that lookups skip
+        self._entries: list = []
+        self._slots: dict = {}
+        self._postings: dict = {}
+        self._arrays: dict = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _append(self, entry: _Entry) -> None:
+        slot = len(self._entries)
+        self._entries.append(entry)
+        self._slots[entry.restaurant_id] = slot
+        for gram in trigrams(entry.core):
+            self._postings.setdefault(gram, []).append(slot)
+            self._arrays.pop(gram, None)
+
+    def add(self, restaurant_id, name: str, location: Optional[str] = None) -> None:
+        entry = _entry(restaurant_id, name, location)
+        with self._lock:
+            self.remove(restaurant_id)
+            self._append(entry)
+
+    def remove(self, restaurant_id) -> None:
+        with self._lock:
+            slot = self._slots.pop(restaurant_id, None)
+            if slot is not None:
+                self._entries[slot] = None
+                dead = len(self._entries) - len(self._slots)
+                if dead >= COMPACT_MIN_DEAD and dead > COMPACT_DEAD_SHARE * len(self._entries):
+                    self._compact()
+
+    def _compact(self) -> None:
+        live = [entry for entry in self._entries if entry is not None]
+        self._entries.clear()
+        self._slots.clear()
+        self._postings.clear()
+        self._arrays.clear()
+        for entry in live:
+            self._append(entry)
+
+    def load(self, rows) -> None:
+        """Replaces the index with (id, name, location) rows."""
+        with self._lock:
+            self._entries.clear()
+            self._slots.clear()
+            self._postings.clear()
+            self._arrays.clear()
+            for restaurant_id, name, location in rows:
+                self._append(_entry(restaurant_id, name, location))
+            self.loaded = True
+
+    def _posting_array(self, gram: str) -> np.ndarray:
+        array = self._arrays.get(gram)
+        if array is None:
+            array = self._arrays[gram] = np.asarray(self._postings[gram], dtype=np.int32)
+        return array
+
+    def _candidates(self, core: str) -> list:
+        grams = sorted((g for g in trigrams(core) if g in self._postings), key=lambda g: len(self._postings[g]))
+        if not grams:
+            return []
+        slots, counts = np.unique(
+            np.concatenate([self._posting_array(g) for g in grams[:RARE_GRAMS]]), return_counts=True
+        )
+        if len(slots) > MAX_CANDIDATES:
+            # Shared-gram counts are small ints with many ties, so pick the cutoff from a
+            # histogram rather than sorting (argpartition degrades badly on ties)
+            at_least = np.cumsum(np.bincount(counts)[::-1])[::-1]
+            cutoff = int(np.flatnonzero(at_least >= MAX_CANDIDATES)[-1])
+            above = slots[counts > cutoff]
+            slots = np.concatenate([above, slots[counts == cutoff][:MAX_CANDIDATES - len(above)]])
+        return [entry for entry in map(self._entries.__getitem__, slots.tolist()) if entry is not None]
+
+    @staticmethod
+    def _scores(query: _Entry, entries: list) -> np.ndarray:
+        scores = np.maximum(
+            process.cdist([query.core], [e.core for e in entries], scorer=fuzz.ratio)[0],
+            process.cdist([query.normalized], [e.normalized for e in entries], scorer=fuzz.token_sort_ratio)[0],
+        ).astype(np.float64)
+        # "Pho 88" and "Pho 99" read as near-identical strings but are different places
+        scores -= NUMBER_MISMATCH_PENALTY * np.array([e.numbers != query.numbers for e in entries])
+        if query.normalized_location:
+            located = np.array([bool(e.normalized_location) for e in entries])
+            locations = process.cdist(
+                [query.normalized_location], [e.normalized_location for e in entries], scorer=fuzz.token_set_ratio
+            )[0]
+            scores = np.where(located, 0.75 * scores + 0.25 * locations, scores)
+        return scores
+
+    def _ranked(self, query: _Entry, limit: int) -> list:
+        with self._lock:
+            entries = self._candidates(query.core)
+        if not entries:
+            return []
+        scores = self._scores(query, entries)
+        return [(entries[i], round(float(scores[i]), 2)) for i in np.argsort(-scores, kind="stable")[:limit]]
+
+    def _is_exact(self, query: _Entry, entry: _Entry) -> bool:
+        """Near-identical full names at the same place: both without a location, or with agreeing ones."""
+        if entry.numbers != query.numbers or fuzz.ratio(query.normalized, entry.normalized) < RESTAURANT_EXACT_THRESHOLD:
+            return False
+        if not query.normalized_location or not entry.normalized_location:
+            return not query.normalized_location and not entry.normalized_location
+        return fuzz.token_set_ratio(query.normalized_location, entry.normalized_location) >= self.threshold
+
+    def candidates(self, name: str, location: Optional[str] = None, limit: int = 5) -> list:
+        """Best-scoring restaurants for the name (and location), highest first."""
+        query = _entry(None, name, location)
+        return [
+            Match(entry.restaurant_id, entry.name, entry.location, score, self._is_exact(query, entry))
+            for entry, score in self._ranked(query, limit)
+        ]
+
+    def best_match(self, name: str, location: Optional[str] = None) -> Optional[Match]:
+        """
+        The restaurant this name and location most likely is, or None.
+
+        A near-identical full name matches at the threshold when the locations agree (or
+        neither has one): "Joe's Pizza" with no city isn't any city's "Joe's Pizza". Anything
+        fuzzier also needs a distinctive core name and a location on both sides: "Thai House"
+        is not "Thai Kitchen".
+        """
+        query = _entry(None, name, location)
+        for entry, score in self._ranked(query, limit=5):
+            if score < self.threshold:
+                break
+            exact = self._is_exact(query, entry)
+            distinctive = min(len(query.core.split()), len(entry.core.split())) >= DISTINCTIVE_CORE_WORDS
+            if exact or (distinctive and query.normalized_location and entry.normalized_location):
+                return Match(entry.restaurant_id, entry.name, entry.location, score, exact)
+        return None
+
+
+restaurant_index = RestaurantIndex()
+
+
+def ensure_loaded(db) -> RestaurantIndex:
+    """Builds the shared index from the restaurants table the first time it's needed."""
+    if not restaurant_index.loaded:
+        from database.models import Restaurant
+        with restaurant_index._lock:
+            if not restaurant_index.loaded:
+                restaurant_index.load(db.query(Restaurant.id, Restaurant.name, Restaurant.location).all())
+    return restaurant_index
@@ -0,0 +1,336 @@
+# utils/similar_items.py
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from database.models import Category, MenuItem
+from utils.item_search import search_terms
+
+# Directory holding the similar-dishes index; every worker memory-maps the same files read-only
+SIMILAR_INDEX_PATH = os.getenv("SIMILAR_INDEX_PATH", "cache/similar_items")
+# Floats per stored vector; a new width takes effect on the next build
+SIMILAR_DIM = int(os.getenv("SIMILAR_DIM", "256"))
+SIMILAR_LIMIT = 10
+SIMILAR_MAX_LIMIT = 50
+
+# Document frequencies are counted in this hash space before features are folded into SIMILAR_DIM
+IDF_BUCKETS = 1 << 20
+FIELD_WEIGHTS = {"name": 2.0, "tags": 1.5, "description": 1.0, "image_prompt": 0.5}
+BIGRAM_WEIGHT = 0.5
+# Character trigrams of the name's words, so "tagliata" still lands near "tagliato"
+NAME_TRIGRAM_WEIGHT = 0.3
+
+# One per vector row: the item's and its restaurant's UUID bytes
+RECORD = np.dtype([("item", "V16"), ("restaurant", "V16")])
+
+
+class Similar(NamedTuple):
+    id: uuid.UUID
+    restaurant_id: uuid.UUID
+    score: float
+
+
+def features(row) -> dict:
+    """Weighted words, word pairs and name trigrams of an item mapping."""
+    counts = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = row.get(field)
+        words = search_terms(" ".join(value or []) if field == "tags" else value)
+        for word in words:
+            counts[word] = counts.get(word, 0.0) + weight
+        for pair in zip(words, words[1:]):
+            key = " ".join(pair)
+            counts[key] = counts.get(key, 0.0) + weight * BIGRAM_WEIGHT
+    for word in search_terms(row.get("name")):
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            key = "#" + padded[i:i + 3]
+            counts[key] = counts.get(key, 0.0) + NAME_TRIGRAM_WEIGHT
+    return counts
+
+
+def _hashed(row) -> tuple:
+    counts = features(row)
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in counts), dtype=np.uint32, count=len(counts))
+    return hashes, np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+
+def document_frequencies(rows) -> tuple:
+    """(per-bucket counts of items carrying a feature, number of items)."""
+    buckets = [np.unique(_hashed(row)[0] % IDF_BUCKETS) for row in rows]
+    if not buckets:
+        return np.zeros(IDF_BUCKETS, dtype=np.int64), 0
+    return np.bincount(np.concatenate(buckets), minlength=IDF_BUCKETS), len(buckets)
+
+
+def inverse_frequencies(df: np.ndarray, count: int) -> np.ndarray:
+    return (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+
+
+def vectorize(rows, idf: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Unit-length float32 rows: sublinear tf-idf of each hashed feature, folded into dim
+    buckets with a sign from the hash so colliding features cancel rather than pile up.
+    """
+    hashed = [_hashed(row) for row in rows]
+    matrix = np.zeros((len(hashed), dim), dtype=np.float32)
+    if not hashed:
+        return matrix
+    hashes = np.concatenate([h for h, _ in hashed])
+    owners = np.repeat(np.arange(len(hashed)), [len(h) for h, _ in hashed])
+    signs = np.where(hashes >> 31, 1.0, -1.0)
+    weights = np.sqrt(np.concatenate([tf for _, tf in hashed])) * idf[hashes % IDF_BUCKETS] * signs
+    matrix += np.bincount(owners * dim + hashes % dim, weights=weights, minlength=len(hashed) * dim).reshape(-1, dim)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+
+def _records(pairs) -> bytes:
+    return b"".join(item_id.bytes + restaurant_id.bytes for item_id, restaurant_id in pairs)
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+# Without either, the lock only covers this process's threads (one worker, or a platform with neither)
+_process_locks: dict = {}
+_process_locks_guard = threading.Lock()
+
+
+def _lock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        handle.seek(0)
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK gives up after ~10 s; a build's swap can take longer
+                continue
+
+
+def _unlock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _write_lock(path: str):
+    # Serialises appends from every worker with each other and with a build's swap
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _process_locks_guard:
+        local = _process_locks.setdefault(os.path.abspath(path), threading.Lock())
+    with local, open(path + ".lock", "a+") as handle:
+        _lock_file(handle)
+        try:
+            yield
+        finally:
+            _unlock_file(handle)
+
+
+class SimilarItemsIndex:
+    """
+    Memory-mapped dish vectors behind GET /items/{id}/similar.
+
+    `python -m utils.similar_items build` writes the directory offline: vectors.f32 (one
+    unit-length float32 row per dish), records.bin (item and restaurant id per row),
+    idf.f32 and meta.json. Workers map the files read-only, so the page cache holds one
+    copy for all of them, and remap when an ingest appends rows or a build swaps the
+    directory in. Appends never rewrite rows: a re-parsed dish gets a second row, results
+    keep each dish once, and the next build drops the older row.
+    """
+
+    def __init__(self, path: str = SIMILAR_INDEX_PATH):
+        self.path = path
+        self.dim = 0
+        self.idf = None
+        self.vectors = None
+        self.records = None
+        self._key = None  # (inode, rows) of what's mapped
+        self._lock = threading.Lock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _mapped(self) -> bool:
+        try:
+            stat = os.stat(self._file("vectors.f32"))
+            records_size = os.stat(self._file("records.bin")).st_size
+        except FileNotFoundError:
+            # Not built yet, or a build is swapping directories; the old mapping stays valid
+            return self._key is not None
+        with self._lock:
+            if self._key is None or self._key[0] != stat.st_ino:
+                with open(self._file("meta.json")) as handle:
+                    self.dim = json.load(handle)["dim"]
+                self.idf = np.memmap(self._file("idf.f32"), dtype=np.float32, mode="r")
+            rows = min(stat.st_size // (self.dim * 4), records_size // RECORD.itemsize)
+            if (stat.st_ino, rows) != self._key:
+                if rows:
+                    self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(rows, self.dim))
+                    self.records = np.memmap(self._file("records.bin"), dtype=RECORD, mode="r", shape=(rows,))
+                else:
+                    self.vectors, self.records = np.zeros((0, self.dim), dtype=np.float32), np.zeros(0, dtype=RECORD)
+                self._key = (stat.st_ino, rows)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.records) if self._mapped() else 0
+
+    def similar(self, row, k: int = SIMILAR_LIMIT, exclude_restaurant: Optional[uuid.UUID] = None) -> Optional[list]:
+        """
+        Top-k dishes by cosine similarity to the item mapping `row`, best first; None when
+        no index has been built. The dish itself (row["id"]) and dishes sharing nothing
+        with it (cosine <= 0) are never returned.
+        """
+        if not self._mapped():
+            return None
+        with self._lock:
+            vectors, records, idf, dim = self.vectors, self.records, self.idf, self.dim
+        if not len(vectors):
+            return []
+
+        scores = vectors @ vectorize([row], idf, dim)[0]
+        scores[records["item"] == np.void(row["id"].bytes)] = -np.inf
+        if exclude_restaurant is not None:
+            scores[records["restaurant"] == np.void(exclude_restaurant.bytes)] = -np.inf
+        # Twice k leaves room for the extra rows of re-parsed dishes
+        take = min(len(scores), 2 * k)
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results, seen = [], set()
+        for i in top.tolist():
+            if scores[i] <= 0 or len(results) == k:
+                break
+            item_id = uuid.UUID(bytes=records[i]["item"].tobytes())
+            if item_id not in seen:
+                seen.add(item_id)
+                results.append(Similar(item_id, uuid.UUID(bytes=records[i]["restaurant"].tobytes()), float(scores[i])))
+        return results
+
+
+similar_items_index = SimilarItemsIndex()
+
+
+def index_similar_items(restaurant_id, item_rows, path: str = SIMILAR_INDEX_PATH) -> None:
+    """Appends just-ingested dishes to a built index; without one, the first build includes them."""
+    if not item_rows or not os.path.exists(os.path.join(path, "meta.json")):
+        return
+    with _write_lock(path):
+        with open(os.path.join(path, "meta.json")) as handle:
+            dim = json.load(handle)["dim"]
+        idf = np.fromfile(os.path.join(path, "idf.f32"), dtype=np.float32)
+        vectors = vectorize(item_rows, idf, dim)
+        # Records first: readers only map rows present in both files
+        with open(os.path.join(path, "records.bin"), "ab") as handle:
+            handle.write(_records((row["id"], restaurant_id) for row in item_rows))
+        with open(os.path.join(path, "vectors.f32"), "ab") as handle:
+            handle.write(vectors.tobytes())
+
+
+def _appended_since(path: str, rows: int) -> list:
+    """Item ids index_similar_items appended to the index at path after its first `rows` rows."""
+    try:
+        with open(os.path.join(path, "records.bin"), "rb") as handle:
+            handle.seek(rows * RECORD.itemsize)
+            data = handle.read()
+    except FileNotFoundError:
+        return []
+    records = np.frombuffer(data[:len(data) - len(data) % RECORD.itemsize], dtype=RECORD)
+    return [uuid.UUID(bytes=record.tobytes()) for record in records["item"]]
+
+
+def build(path: str = SIMILAR_INDEX_PATH, dim: int = SIMILAR_DIM, batch_size: int = 10000) -> int:
+    """
+    Writes a fresh index for every stored dish and swaps it in; returns the number of rows.
+
+    The build itself runs without the write lock, so ingest keeps appending to the current
+    index meanwhile. The lock is only held for the swap, which first re-vectorises the
+    dishes appended since the build started and adds them to the new index.
+    """
+    from database.db import SessionLocal
+
+    columns = (MenuItem.id, Category.restaurant_id, MenuItem.name, MenuItem.description, MenuItem.tags, MenuItem.image_prompt)
+    statement = select(*columns).join(Category).execution_options(yield_per=batch_size)
+    staging, retired = path + ".building", path + ".old"
+    # Builds take turns, since they share the staging directory; appends don't wait on this
+    with _write_lock(staging):
+        try:
+            start_rows = os.path.getsize(os.path.join(path, "records.bin")) // RECORD.itemsize
+        except FileNotFoundError:
+            start_rows = 0
+        db = SessionLocal()
+        try:
+            df, count = np.zeros(IDF_BUCKETS, dtype=np.int64), 0
+            for batch in db.execute(statement).mappings().partitions():
+                batch_df, batch_count = document_frequencies(batch)
+                df += batch_df
+                count += batch_count
+            idf = inverse_frequencies(df, count)
+
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            idf.tofile(os.path.join(staging, "idf.f32"))
+            with open(os.path.join(staging, "records.bin"), "wb") as records, \
+                    open(os.path.join(staging, "vectors.f32"), "wb") as vectors:
+                for batch in db.execute(statement).mappings().partitions():
+                    records.write(_records((row["id"], row["restaurant_id"]) for row in batch))
+                    vectors.write(vectorize(batch, idf, dim).tobytes())
+            with open(os.path.join(staging, "meta.json"), "w") as handle:
+                json.dump({"dim": dim, "items": count, "built_at": datetime.now(timezone.utc).isoformat()}, handle)
+
+            with _write_lock(path):
+                # Some of these may be in the build already; similar() skips repeated ids
+                appended = _appended_since(path, start_rows)
+                rows = db.execute(
+                    select(*columns).join(Category).where(MenuItem.id.in_(appended))
+                ).mappings().all() if appended else []
+                if rows:
+                    with open(os.path.join(staging, "records.bin"), "ab") as records:
+                        records.write(_records((row["id"], row["restaurant_id"]) for row in rows))
+                    with open(os.path.join(staging, "vectors.f32"), "ab") as vectors:
+                        vectors.write(vectorize(rows, idf, dim).tobytes())
+                shutil.rmtree(retired, ignore_errors=True)
+                if os.path.exists(path):
+                    os.rename(path, retired)
+                os.rename(staging, path)
+                shutil.rmtree(retired, ignore_errors=True)
+        finally:
+            db.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Similar-dishes index")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--path", default=SIMILAR_INDEX_PATH)
+    parser.add_argument("--dim", type=int, default=SIMILAR_DIM)
+    args = parser.parse_args()
+    count = build(args.path, args.dim)
+    size = os.path.getsize(os.path.join(args.path, "vectors.f32"))
+    print(f"✅ Indexed {count} items into {args.path} ({size / 1024 / 1024:.1f} MB of vectors)")
+
+
+if __name__ == "__main__":
+    main()
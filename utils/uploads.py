@@ -0,0 +1,143 @@
+# utils/uploads.py
+
+import hashlib
+import json
+import os
+from contextlib import aclosing
+
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.routing import APIRoute
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# Per file, and per request body (a multi-page upload carries several files)
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "15")) * 1024 * 1024)
+MAX_REQUEST_BYTES = int(float(os.getenv("MAX_REQUEST_MB", "60")) * 1024 * 1024)
+READ_CHUNK_BYTES = 1024 * 1024
+# Pages per multi-page menu, and their total size once zip archives are unpacked
+MAX_MENU_PAGES = int(os.getenv("MAX_MENU_PAGES", "30"))
+MAX_MENU_PAGES_BYTES = int(float(os.getenv("MAX_MENU_PAGES_MB", "120")) * 1024 * 1024)
+
+# Keep originals on disk only when asked, named by content so identical uploads share a file
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "false").lower() == "true"
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+
+
+class _InMemoryMultiPartParser(MultiPartParser):
+    # Starlette spools multipart files to a temp file past 1MB; anything under our own
+    # limit may as well stay in memory, which keeps the request path free of disk I/O.
+    spool_max_size = max(MultiPartParser.spool_max_size, MAX_UPLOAD_BYTES)
+
+
+class UploadRequest(Request):
+    """Parses multipart bodies with _InMemoryMultiPartParser; everything else as Starlette does."""
+
+    async def _get_form(self, *, max_files=1000, max_fields=1000, max_part_size=1024 * 1024):
+        if self._form is None and self.headers.get("content-type", "").startswith("multipart/form-data"):
+            try:
+                async with aclosing(self.stream()) as stream:
+                    parser = _InMemoryMultiPartParser(
+                        self.headers, stream, max_files=max_files, max_fields=max_fields, max_part_size=max_part_size
+                    )
+                    self._form = await parser.parse()
+            except MultiPartException as exc:
+                raise HTTPException(status_code=400, detail=exc.message)
+        return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+
+class UploadRoute(APIRoute):
+    """Route class for the upload endpoints only, so other apps and routes keep Starlette's spooling."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def upload_handler(request: Request):
+            return await handler(UploadRequest(request.scope, request.receive))
+
+        return upload_handler
+
+
+def _limit_message(limit: int) -> str:
+    return f"Upload exceeds {limit / (1024 * 1024):g} MB limit"
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=_limit_message(limit))
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized request bodies while they stream in, instead of after they're buffered.
+
+    A declared Content-Length over the limit is refused before any body is read; otherwise
+    the received bytes are counted and the request fails with 413 as soon as it crosses the limit.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(send, self.max_bytes)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send, limit: int) -> None:
+        body = json.dumps({"detail": _limit_message(limit)}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Reads an upload from its in-memory spool in chunks, stopping as soon as it passes max_bytes."""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    chunks, total = [], 0
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+def persist_upload(image_bytes: bytes, filename: str, save_dir: str = UPLOAD_DIR) -> str | None:
+    """Stores the original under its sha256 when PERSIST_UPLOADS is on; a no-op otherwise."""
+    if not PERSIST_UPLOADS:
+        return None
+
+    os.makedirs(save_dir, exist_ok=True)
+    extension = os.path.splitext(filename or "")[1].lower() or ".bin"
+    path = os.path.join(save_dir, f"{hashlib.sha256(image_bytes).hexdigest()}{extension}")
+    if not os.path.exists(path):
+        with open(path, "wb") as buffer:
+            buffer.write(image_bytes)
+    return path